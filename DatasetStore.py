@@ -0,0 +1,498 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+
+# Configuration
+CONFIG = {
+    # Source datasets compiled into the store (source name -> JSON file)
+    "SOURCES": {
+        "tasks": os.path.join("dataset", "Tasks&Questions.json"),
+        "multichoice": os.path.join("dataset", "MultichoiceQuestions.json"),
+    },
+    "STORE_FILE": os.path.join("dataset", "questions.sqlite"),
+    "SCHEMA_VERSION": "2",
+}
+
+# Multiple-choice questions mix topics, question types and difficulty in one
+# "categories" list; these values are split out into their own columns.
+MC_CATEGORY_LABELS = {"knowledge", "problem solving", "calculation", "system design", "auditing", "coding"}
+MC_DIFFICULTY_LABELS = {"beginner", "intermediate", "advanced"}
+
+# Expected JSON fields per source (field -> accepted python type)
+SOURCE_SCHEMAS = {
+    "tasks": {"id": str, "question": str, "code": str, "answer": str, "category": str, "topic": list},
+    "multichoice": {"id": str, "question": str, "answer": str, "categories": list},
+}
+
+STORE_DDL = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    qid INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT,
+    difficulty TEXT,
+    tags TEXT NOT NULL,
+    question TEXT NOT NULL,
+    UNIQUE (source, id)
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    qid INTEGER PRIMARY KEY REFERENCES questions(qid),
+    code TEXT NOT NULL,
+    answer TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topics (
+    topic TEXT NOT NULL COLLATE NOCASE,
+    qid INTEGER NOT NULL REFERENCES questions(qid),
+    PRIMARY KEY (topic, qid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS kg_map (
+    node_code TEXT NOT NULL,
+    qid INTEGER NOT NULL REFERENCES questions(qid),
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (node_code, qid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_questions_id ON questions(id);
+CREATE INDEX IF NOT EXISTS idx_questions_category ON questions(category COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions(difficulty COLLATE NOCASE);
+"""
+
+
+def file_sha256(path):
+    """Return the hex sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts):
+    """Return a short, stable hash of the given values, used to detect stale results."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:16]
+
+
+def validate_record(source, index, record):
+    """Check a raw JSON record against the schema of its source."""
+    schema = SOURCE_SCHEMAS[source]
+    if not isinstance(record, dict):
+        raise ValueError(f"{source}[{index}]: expected an object, got {type(record).__name__}")
+    for field, expected_type in schema.items():
+        if field not in record:
+            raise ValueError(f"{source}[{index}] (id={record.get('id', '?')}): missing field '{field}'")
+        if not isinstance(record[field], expected_type):
+            raise ValueError(
+                f"{source}[{index}] (id={record.get('id', '?')}): field '{field}' should be "
+                f"{expected_type.__name__}, got {type(record[field]).__name__}"
+            )
+    for field in ("topic", "categories"):
+        if field in schema and not all(isinstance(item, str) for item in record[field]):
+            raise ValueError(f"{source}[{index}] (id={record['id']}): '{field}' must be a list of strings")
+
+
+def normalize_record(source, record):
+    """Split a raw record into (category, difficulty, topics, tags, code, answer)."""
+    if source == "tasks":
+        tags = record["topic"]
+        return record["category"].lower(), None, list(tags), tags, record["code"], record["answer"]
+
+    tags = record["categories"]
+    category, difficulty, topics = None, None, []
+    for label in tags:
+        lowered = label.lower()
+        if lowered in MC_DIFFICULTY_LABELS:
+            difficulty = label
+        elif lowered in MC_CATEGORY_LABELS and category is None:
+            category = lowered
+        else:
+            topics.append(label)
+    return category, difficulty, topics, tags, record.get("code", ""), record["answer"]
+
+
+def compile_store(store_file=None, sources=None, force=False):
+    """Compile the JSON sources into the SQLite store, skipping unchanged sources."""
+    store_file = store_file or CONFIG["STORE_FILE"]
+    sources = sources or CONFIG["SOURCES"]
+
+    conn = sqlite3.connect(store_file)
+    try:
+        conn.executescript(STORE_DDL)
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("schema_version") not in (None, CONFIG["SCHEMA_VERSION"]):
+            conn.executescript("DROP TABLE IF EXISTS kg_map; DROP TABLE IF EXISTS topics; "
+                               "DROP TABLE IF EXISTS payloads; DROP TABLE IF EXISTS questions; "
+                               "DELETE FROM meta;")
+            conn.executescript(STORE_DDL)
+            meta = {}
+
+        rebuilt = []
+        for source, path in sources.items():
+            digest = file_sha256(path)
+            if not force and meta.get(f"sha256:{source}") == digest:
+                continue
+
+            with open(path, 'r', encoding='utf-8') as file:
+                records = json.load(file)
+            if not isinstance(records, list):
+                raise ValueError(f"{path}: expected a JSON list of questions")
+
+            seen_ids = set()
+            for index, record in enumerate(records):
+                validate_record(source, index, record)
+                if record["id"] in seen_ids:
+                    raise ValueError(f"{source}[{index}]: duplicate id '{record['id']}'")
+                seen_ids.add(record["id"])
+
+            with conn:
+                # Question rowids change on rebuild, so the knowledge-graph mapping must be recomputed
+                conn.execute("DELETE FROM kg_map")
+                conn.execute("DELETE FROM meta WHERE key = 'sha256:knowledge'")
+                stale = "SELECT qid FROM questions WHERE source = ?"
+                conn.execute(f"DELETE FROM topics WHERE qid IN ({stale})", (source,))
+                conn.execute(f"DELETE FROM payloads WHERE qid IN ({stale})", (source,))
+                conn.execute("DELETE FROM questions WHERE source = ?", (source,))
+                for position, record in enumerate(records):
+                    category, difficulty, topics, tags, code, answer = normalize_record(source, record)
+                    cursor = conn.execute(
+                        "INSERT INTO questions (source, id, position, category, difficulty, tags, question) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (source, record["id"], position, category, difficulty,
+                         json.dumps(tags, ensure_ascii=False), record["question"])
+                    )
+                    qid = cursor.lastrowid
+                    conn.execute("INSERT INTO payloads (qid, code, answer) VALUES (?, ?, ?)", (qid, code, answer))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO topics (topic, qid) VALUES (?, ?)",
+                        [(topic, qid) for topic in topics]
+                    )
+                conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"sha256:{source}", digest))
+            rebuilt.append(source)
+            logging.info(f"Compiled {len(records)} questions from {path} into {store_file}")
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (CONFIG["SCHEMA_VERSION"],))
+        return rebuilt
+    finally:
+        conn.close()
+
+
+class QuestionRecord:
+    """A question row; the large code/answer fields are fetched on first access."""
+
+    __slots__ = ("store", "qid", "source", "id", "category", "difficulty", "tags", "question", "_payload")
+
+    def __init__(self, store, qid, source, id, category, difficulty, tags, question, payload=None):
+        self.store = store
+        self.qid = qid
+        self.source = source
+        self.id = id
+        self.category = category
+        self.difficulty = difficulty
+        self.tags = json.loads(tags)
+        self.question = question
+        self._payload = payload
+
+    def _load_payload(self):
+        if self._payload is None:
+            self._payload = self.store.fetch_payloads([self.qid])[self.qid]
+        return self._payload
+
+    @property
+    def code(self):
+        return self._load_payload()[0]
+
+    @property
+    def answer(self):
+        return self._load_payload()[1]
+
+    @property
+    def topics(self):
+        if self.source == "tasks":
+            return list(self.tags)
+        return normalize_record(self.source, {"categories": self.tags, "answer": ""})[2]
+
+    def to_dict(self):
+        """Return the record in the shape of its source JSON file."""
+        if self.source == "tasks":
+            return {
+                "question": self.question,
+                "code": self.code,
+                "answer": self.answer,
+                "topic": list(self.tags),
+                "category": self.category,
+                "id": self.id,
+            }
+        return {
+            "id": self.id,
+            "categories": list(self.tags),
+            "question": self.question,
+            "answer": self.answer,
+        }
+
+    def __repr__(self):
+        return f"QuestionRecord(source={self.source!r}, id={self.id!r}, category={self.category!r})"
+
+
+class DatasetStore:
+    """Indexed, read-mostly view over the compiled question store."""
+
+    def __init__(self, store_file=None, sources=None, auto_compile=True):
+        self.store_file = store_file or CONFIG["STORE_FILE"]
+        self.sources = sources or CONFIG["SOURCES"]
+        if auto_compile:
+            compile_store(self.store_file, self.sources)
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.store_file}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def select(self, source=None, category=None, topic=None, difficulty=None, ids=None,
+               kg_node=None, manifest=None, with_payload=False):
+        """Return the questions matching every given filter, in dataset order.
+
+        ``category``, ``topic`` and ``difficulty`` match case-insensitively and
+        accept either a single value or a list of alternatives. ``ids`` is a
+        list of question ids or of ``(source, id)`` pairs. ``kg_node`` selects
+        questions mapped anywhere in a knowledge-graph subtree, e.g. '1.1.2'.
+        ``manifest`` is a dedup manifest written by Dedup.py whose dropped
+        questions are excluded.
+        """
+        clauses, params = [], []
+
+        def add_in(column, values, nocase=True):
+            values = [values] if isinstance(values, str) else list(values)
+            collate = " COLLATE NOCASE" if nocase else ""
+            clauses.append(f"{column}{collate} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        if source:
+            add_in("q.source", source, nocase=False)
+        if category:
+            add_in("q.category", category)
+        if difficulty:
+            add_in("q.difficulty", difficulty)
+        if topic:
+            topics = [topic] if isinstance(topic, str) else list(topic)
+            clauses.append(
+                f"q.qid IN (SELECT qid FROM topics WHERE topic IN ({', '.join('?' * len(topics))}))"
+            )
+            params.extend(topics)
+        if kg_node:
+            from KnowledgeGraph import ensure_question_map
+            ensure_question_map(self)
+            nodes = [kg_node] if isinstance(kg_node, str) else list(kg_node)
+            clauses.append(
+                "q.qid IN (SELECT qid FROM kg_map WHERE "
+                + " OR ".join("node_code = ? OR node_code LIKE ?" for _ in nodes) + ")"
+            )
+            for node in nodes:
+                params.extend([node, f"{node}.%"])
+        if ids is not None:
+            ids = list(ids)
+            pairs = [item for item in ids if isinstance(item, (tuple, list))]
+            plain = [item for item in ids if not isinstance(item, (tuple, list))]
+            alternatives = []
+            if plain:
+                alternatives.append(f"q.id IN ({', '.join('?' * len(plain))})")
+                params.extend(plain)
+            for pair_source, pair_id in pairs:
+                alternatives.append("(q.source = ? AND q.id = ?)")
+                params.extend([pair_source, pair_id])
+            clauses.append(f"({' OR '.join(alternatives)})" if alternatives else "0")
+
+        columns = "q.qid, q.source, q.id, q.category, q.difficulty, q.tags, q.question"
+        if with_payload:
+            sql = f"SELECT {columns}, p.code, p.answer FROM questions q JOIN payloads p ON p.qid = q.qid"
+        else:
+            sql = f"SELECT {columns} FROM questions q"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY q.source, q.position"
+
+        dropped = load_manifest(manifest) if manifest else set()
+        records = []
+        for row in self.conn.execute(sql, params):
+            if (row[1], row[2]) in dropped:
+                continue
+            payload = (row[7], row[8]) if with_payload else None
+            records.append(QuestionRecord(self, *row[:7], payload=payload))
+        return records
+
+    def get(self, source, question_id):
+        """Return a single question by source and id, or None."""
+        records = self.select(source=source, ids=[question_id])
+        return records[0] if records else None
+
+    def fetch_payloads(self, qids):
+        """Fetch (code, answer) for many questions in one query."""
+        qids = list(qids)
+        payloads = {}
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(qids), 500):
+            chunk = qids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT qid, code, answer FROM payloads WHERE qid IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            payloads.update({qid: (code, answer) for qid, code, answer in rows})
+        return payloads
+
+    def load_payloads(self, records):
+        """Populate code/answer for a batch of records with a single query."""
+        missing = [record for record in records if record._payload is None]
+        payloads = self.fetch_payloads(record.qid for record in missing)
+        for record in missing:
+            record._payload = payloads[record.qid]
+        return records
+
+    def counts(self, column):
+        """Return {value: question count} for category, difficulty, source or topic."""
+        if column == "topic":
+            rows = self.conn.execute("SELECT topic, COUNT(*) FROM topics GROUP BY topic ORDER BY COUNT(*) DESC")
+        elif column in ("category", "difficulty", "source"):
+            rows = self.conn.execute(
+                f"SELECT {column}, COUNT(*) FROM questions GROUP BY {column} ORDER BY COUNT(*) DESC"
+            )
+        else:
+            raise ValueError(f"Unsupported column: {column}")
+        return dict(rows)
+
+
+def load_manifest(path):
+    """Return the (source, id) pairs dropped by a Dedup.py manifest."""
+    with open(path, 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    return {(item["source"], item["id"]) for item in manifest.get("dropped", [])}
+
+
+def resolve_source(file_path, sources=None):
+    """Return the store source name for a dataset path, or None for other files."""
+    sources = sources or CONFIG["SOURCES"]
+    target = os.path.normcase(os.path.abspath(file_path))
+    for source, path in sources.items():
+        if os.path.normcase(os.path.abspath(path)) == target:
+            return source
+    return None
+
+
+def load_question_slice(file_path, **filters):
+    """Load questions from a dataset file as plain dicts, optionally filtered.
+
+    Registered dataset files are served from the indexed store; any other JSON
+    file (for example a slice exported with this module's CLI) is loaded
+    directly and filtered in Python with the same semantics.
+    """
+    filters = {key: value for key, value in filters.items() if value}
+    source = resolve_source(file_path)
+    if source is not None:
+        store = DatasetStore()
+        try:
+            records = store.load_payloads(store.select(source=source, **filters))
+            return [record.to_dict() for record in records]
+        finally:
+            store.close()
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        questions = json.load(file)
+    return [q for q in questions if _matches(q, **filters)]
+
+
+def _matches(question, category=None, topic=None, difficulty=None, ids=None, source=None, kg_node=None,
+             manifest=None):
+    if kg_node or manifest:
+        raise ValueError("The kg_node and manifest filters are only available for registered dataset files")
+
+    def as_set(values):
+        return {v.lower() for v in ([values] if isinstance(values, str) else values)}
+
+    labels = [label.lower() for label in question.get("topic", []) + question.get("categories", [])]
+    if category and (question.get("category") or "").lower() not in as_set(category) \
+            and not as_set(category) & set(labels):
+        return False
+    if topic and not as_set(topic) & set(labels):
+        return False
+    if difficulty and not as_set(difficulty) & set(labels):
+        return False
+    if ids is not None and question.get("id") not in {i[1] if isinstance(i, (tuple, list)) else i for i in ids}:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and slice the CryptoBench question datasets")
+    parser.add_argument("--source", action="append", choices=sorted(CONFIG["SOURCES"]),
+                        help="Restrict to a dataset (repeatable)")
+    parser.add_argument("--category", action="append", help="Question category, e.g. auditing (repeatable)")
+    parser.add_argument("--topic", action="append", help="Topic, e.g. DeFi (repeatable)")
+    parser.add_argument("--difficulty", action="append", help="Difficulty, e.g. Advanced (repeatable)")
+    parser.add_argument("--id", action="append", dest="ids", help="Question id (repeatable)")
+    parser.add_argument("--kg-node", action="append", help="Knowledge graph subtree, e.g. 1.1.2 (repeatable)")
+    parser.add_argument("--manifest", help="Exclude questions dropped by a Dedup.py manifest")
+    parser.add_argument("--format", choices=["ids", "json", "count"], default="ids",
+                        help="Output format (default: ids)")
+    parser.add_argument("--output", help="Write output to this file instead of stdout")
+    parser.add_argument("--rebuild", action="store_true", help="Recompile the store from the JSON sources")
+    parser.add_argument("--stats", action="store_true", help="Print per-category/topic/difficulty counts")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.rebuild:
+        compile_store(force=True)
+    store = DatasetStore()
+
+    if args.stats:
+        for column in ("source", "category", "difficulty", "topic"):
+            print(f"{column}:")
+            for value, count in store.counts(column).items():
+                print(f"  {value}: {count}")
+        return 0
+
+    records = store.select(
+        source=args.source, category=args.category, topic=args.topic,
+        difficulty=args.difficulty, ids=args.ids, kg_node=args.kg_node, manifest=args.manifest,
+        with_payload=args.format == "json"
+    )
+
+    if args.format == "count":
+        text = f"{len(records)}\n"
+    elif args.format == "json":
+        text = json.dumps([record.to_dict() for record in records], indent=2, ensure_ascii=False) + "\n"
+    else:
+        text = "".join(f"{record.source}\t{record.id}\t{record.category or ''}\n" for record in records)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+        logging.info(f"Wrote {len(records)} questions to {args.output}")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import re
+import sys
+import json
+import zlib
+import logging
+import argparse
+from datetime import datetime
+from collections import defaultdict
+
+import numpy as np
+
+from DatasetStore import CONFIG as STORE_CONFIG, DatasetStore
+
+# Configuration
+CONFIG = {
+    "SHINGLE_SIZE": 3,        # words per shingle
+    "NUM_PERM": 128,          # MinHash signature length
+    "THRESHOLD": 0.8,         # Jaccard similarity that counts as a near-duplicate
+    "SEED": 1,
+    "CHUNK_SHINGLES": 1 << 16,  # shingles hashed per vectorised block
+    "MANIFEST_FILE": "dedup_manifest.json",
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingle_hashes(text, size):
+    """Return the sorted unique 32-bit hashes of a text's word shingles."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.array(sorted({zlib.crc32(s.encode('utf-8')) for s in shingles}), dtype=np.uint64)
+
+
+def minhash_signatures(shingle_sets, num_perm, seed, chunk_size):
+    """Compute MinHash signatures for all documents with blocked, vectorised hashing.
+
+    All shingles are concatenated and permuted in blocks; the per-document
+    minimum is taken with a segmented ``minimum.reduceat``.
+    """
+    rng = np.random.RandomState(seed)
+    # 32-bit coefficients and shingle hashes keep a * x below 2**64, so the uint64
+    # arithmetic below is exact and the hashes stay (a * x + b) mod p
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    lengths = np.array([len(s) for s in shingle_sets], dtype=np.intp)
+    signatures = np.full((len(shingle_sets), num_perm), MAX_HASH, dtype=np.uint64)
+    nonempty = np.flatnonzero(lengths)
+    if not nonempty.size:
+        return signatures
+
+    flat = np.concatenate([shingle_sets[i] for i in nonempty])
+    owner = np.repeat(np.arange(nonempty.size), lengths[nonempty])
+    for start in range(0, flat.size, chunk_size):
+        block = flat[start:start + chunk_size] & MAX_HASH
+        block_owner = owner[start:start + chunk_size]
+        # Reduce the product before adding b so no intermediate can wrap around
+        hashed = (((a * block[None, :]) % MERSENNE_PRIME + b) % MERSENNE_PRIME) & MAX_HASH
+        # Segment boundaries of each document inside this block
+        boundaries = np.flatnonzero(np.r_[True, block_owner[1:] != block_owner[:-1]])
+        minima = np.minimum.reduceat(hashed, boundaries, axis=1)
+        docs = nonempty[block_owner[boundaries]]
+        signatures[docs] = np.minimum(signatures[docs], minima.T)
+    return signatures
+
+
+def choose_bands(num_perm, threshold):
+    """Pick (bands, rows) whose LSH S-curve threshold (1/b)^(1/r) is closest to the target."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def lsh_candidates(signatures, bands, rows):
+    """Return candidate pairs (i < j) that collide in at least one band."""
+    candidates = set()
+    for band in range(bands):
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = chunk.view(np.dtype((np.void, chunk.dtype.itemsize * rows))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        # Group documents by bucket with one sort instead of a scan per bucket
+        order = np.argsort(inverse.ravel(), kind='stable')
+        buckets = np.split(order, np.cumsum(counts)[:-1])
+        for bucket in np.flatnonzero(counts > 1):
+            members = buckets[bucket]
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidates.add((int(members[x]), int(members[y])))
+    return candidates
+
+
+def jaccard(left, right):
+    if not left.size and not right.size:
+        return 1.0
+    inter = np.intersect1d(left, right, assume_unique=True).size
+    return inter / (left.size + right.size - inter)
+
+
+def find_clusters(records, shingle_size=None, num_perm=None, threshold=None, seed=None):
+    """Return (clusters, pair similarities) of near-duplicate records."""
+    shingle_size = shingle_size or CONFIG["SHINGLE_SIZE"]
+    num_perm = num_perm or CONFIG["NUM_PERM"]
+    threshold = threshold if threshold is not None else CONFIG["THRESHOLD"]
+    seed = seed if seed is not None else CONFIG["SEED"]
+
+    shingle_sets = [
+        shingle_hashes(" ".join([record.question, record.code, record.answer]), shingle_size)
+        for record in records
+    ]
+    signatures = minhash_signatures(shingle_sets, num_perm, seed, CONFIG["CHUNK_SHINGLES"])
+    bands, rows = choose_bands(num_perm, threshold)
+    candidates = lsh_candidates(signatures, bands, rows)
+    logging.info(f"LSH with {bands} bands x {rows} rows produced {len(candidates)} candidate pairs "
+                 f"for {len(records)} questions")
+
+    # Confirm candidates with the exact Jaccard similarity of the shingle sets
+    parent = list(range(len(records)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    similarities = {}
+    for i, j in candidates:
+        similarity = jaccard(shingle_sets[i], shingle_sets[j])
+        if similarity >= threshold:
+            similarities[(i, j)] = similarity
+            parent[find(j)] = find(i)
+
+    groups = defaultdict(list)
+    for i in range(len(records)):
+        groups[find(i)].append(i)
+    clusters = [sorted(members) for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: members[0])
+    return clusters, similarities
+
+
+def build_manifest(records, clusters, cross_source=False, threshold=None):
+    """Keep the first question of each cluster; list the rest as dropped duplicates."""
+    source_order = {source: i for i, source in enumerate(STORE_CONFIG["SOURCES"])}
+    dropped = []
+    for members in clusters:
+        by_source = defaultdict(list)
+        for i in members:
+            by_source[None if cross_source else records[i].source].append(i)
+        for group in by_source.values():
+            group.sort(key=lambda i: source_order.get(records[i].source, len(source_order)))
+            keep = records[group[0]]
+            for i in group[1:]:
+                dropped.append({
+                    "source": records[i].source,
+                    "id": records[i].id,
+                    "duplicate_of": {"source": keep.source, "id": keep.id},
+                })
+    return {
+        "generated": datetime.now().isoformat(),
+        "threshold": threshold if threshold is not None else CONFIG["THRESHOLD"],
+        "cross_source": cross_source,
+        "dropped": dropped,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate questions with MinHash/LSH")
+    parser.add_argument("--source", action="append", choices=sorted(STORE_CONFIG["SOURCES"]),
+                        help="Restrict to a dataset (repeatable)")
+    parser.add_argument("--threshold", type=float, default=CONFIG["THRESHOLD"],
+                        help=f"Jaccard similarity threshold (default: {CONFIG['THRESHOLD']})")
+    parser.add_argument("--num-perm", type=int, default=CONFIG["NUM_PERM"])
+    parser.add_argument("--shingle-size", type=int, default=CONFIG["SHINGLE_SIZE"])
+    parser.add_argument("--manifest", nargs="?", const=CONFIG["MANIFEST_FILE"],
+                        help=f"Write a deduplicated manifest (default file: {CONFIG['MANIFEST_FILE']})")
+    parser.add_argument("--cross-source", action="store_true",
+                        help="Also drop questions duplicated in another dataset")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = DatasetStore()
+    records = store.select(source=args.source, with_payload=True)
+    clusters, similarities = find_clusters(records, args.shingle_size, args.num_perm, args.threshold)
+
+    for number, members in enumerate(clusters, 1):
+        print(f"Cluster {number} ({len(members)} questions):")
+        for i in members:
+            record = records[i]
+            best = max((similarity for pair, similarity in similarities.items() if i in pair), default=0.0)
+            snippet = " ".join(record.question.split())[:100]
+            print(f"  {record.source}:{record.id} [{record.category or ''}] max_sim={best:.2f} {snippet}")
+    logging.info(f"Found {len(clusters)} near-duplicate clusters covering "
+                 f"{sum(len(members) for members in clusters)} questions")
+
+    if args.manifest:
+        manifest = build_manifest(records, clusters, args.cross_source, args.threshold)
+        with open(args.manifest, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2, ensure_ascii=False)
+        logging.info(f"Manifest with {len(manifest['dropped'])} dropped questions saved to {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
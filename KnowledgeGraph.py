@@ -0,0 +1,385 @@
+import os
+import re
+import csv
+import sys
+import sqlite3
+import logging
+import argparse
+from array import array
+from collections import defaultdict, deque
+
+from DatasetStore import CONFIG as STORE_CONFIG, DatasetStore, compile_store, file_sha256
+
+# Configuration
+CONFIG = {
+    "KNOWLEDGE_FILE": os.path.join("graph", "knowledge.md"),
+    # Patterns shared by more nodes than this are too generic to attribute a question
+    "MAX_PATTERN_NODES": 3,
+    # Single-word patterns shorter than this are ignored unless they are acronyms
+    "MIN_WORD_LENGTH": 4,
+}
+
+LINE_PATTERN = re.compile(r'^(?P<indent> *)(?:(?P<number>\d+)\.|-)\s+(?P<text>.+?)\s*$')
+BRACKET_PATTERN = re.compile(r'^\[(?:(?P<code>\d+(?:\.\d+)*)\s+)?(?P<label>.+)\]$')
+PAREN_PATTERN = re.compile(r'\(([^()]*)\)')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class KnowledgeGraph:
+    """The knowledge tree stored as flat preorder arrays.
+
+    Node ``i``'s subtree is the contiguous index range ``[i, end[i])``, so
+    subtree membership tests and aggregations need no pointer chasing.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.codes = []
+        self.parent = array('i')
+        self.depth = array('i')
+        self.end = array('i')
+        self.line = array('i')
+        self.index = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def find(self, code):
+        """Return the node index for a dotted code such as '1.1.2'."""
+        if code not in self.index:
+            raise KeyError(f"Unknown knowledge node: {code}")
+        return self.index[code]
+
+    def children(self, node):
+        child = node + 1
+        while child < self.end[node]:
+            yield child
+            child = self.end[child]
+
+    def ancestors(self, node):
+        """Yield the node and its ancestors up to the domain root."""
+        while node >= 0:
+            yield node
+            node = self.parent[node]
+
+    def subtree(self, node):
+        return range(node, self.end[node])
+
+    def path(self, node):
+        return " > ".join(self.labels[i] for i in reversed(list(self.ancestors(node))))
+
+    def domain_of(self, node, depth=0):
+        """Return the ancestor of ``node`` at the given depth (0 = domain)."""
+        for ancestor in self.ancestors(node):
+            if self.depth[ancestor] == depth:
+                return ancestor
+        return None
+
+
+def parse_knowledge_file(file_path=None):
+    """Parse the indented Markdown knowledge tree into a KnowledgeGraph."""
+    file_path = file_path or CONFIG["KNOWLEDGE_FILE"]
+    graph = KnowledgeGraph()
+    stack = []  # (indent, node index)
+    child_counts = defaultdict(int)
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line_number, raw_line in enumerate(file, 1):
+            match = LINE_PATTERN.match(raw_line.rstrip('\n'))
+            if not match:
+                continue
+            indent = len(match.group('indent'))
+            text = match.group('text')
+            code, label = None, text
+            bracket = BRACKET_PATTERN.match(text)
+            if bracket:
+                code, label = bracket.group('code'), bracket.group('label')
+            if match.group('number'):
+                code = code or match.group('number')
+
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            parent = stack[-1][1] if stack else -1
+
+            child_counts[parent] += 1
+            if code is None:
+                code = f"{graph.codes[parent]}.{child_counts[parent]}" if parent >= 0 else str(child_counts[parent])
+            if code in graph.index:
+                raise ValueError(f"{file_path}:{line_number}: duplicate knowledge node code {code}")
+
+            node = len(graph.labels)
+            graph.labels.append(label)
+            graph.codes.append(code)
+            graph.parent.append(parent)
+            graph.depth.append(graph.depth[parent] + 1 if parent >= 0 else 0)
+            graph.line.append(line_number)
+            graph.index[code] = node
+            stack.append((indent, node))
+
+    # Preorder layout: a subtree ends where the next node at the same or lower depth begins
+    graph.end = array('i', [len(graph.labels)]) * len(graph.labels)
+    open_nodes = []
+    for node in range(len(graph.labels)):
+        while open_nodes and graph.depth[open_nodes[-1]] >= graph.depth[node]:
+            graph.end[open_nodes.pop()] = node
+        open_nodes.append(node)
+
+    logging.info(f"Parsed {len(graph)} knowledge nodes from {file_path}")
+    return graph
+
+
+def normalize_text(text):
+    """Lowercase, tokenise and lightly stem text into a space-padded token string."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return f" {' '.join(tokens)} "
+
+
+def label_terms(label):
+    """Return the searchable terms for a node label: the label and useful aliases in parentheses."""
+    terms = [PAREN_PATTERN.sub(' ', label)]
+    for group in PAREN_PATTERN.findall(label):
+        group = re.sub(r'^(?:e\.g\.,?|i\.e\.,?)\s*', '', group.strip())
+        for alias in group.split(','):
+            alias = alias.strip()
+            words = alias.split()
+            if not words or not alias[0].isupper():
+                continue
+            uppercase = sum(char.isupper() for char in alias)
+            if uppercase >= 2 or (len(words) >= 2 and all(word[0].isupper() for word in words if len(word) > 3)):
+                terms.append(alias)
+    return terms
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over normalised token strings."""
+
+    def __init__(self, patterns):
+        # patterns: {normalised pattern: payload}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, payload in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(payload)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                candidate = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = candidate if candidate != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """Yield the payload of every (possibly overlapping) pattern occurrence."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield from output[state]
+
+
+def build_matcher(graph):
+    """Build one automaton over every node label; returns (matcher, pattern -> nodes)."""
+    pattern_nodes = defaultdict(set)
+    for node, label in enumerate(graph.labels):
+        for term in label_terms(label):
+            normalized = normalize_text(term)
+            words = normalized.split()
+            if not words:
+                continue
+            is_acronym = sum(char.isupper() for char in term) >= 2
+            if len(words) == 1 and len(words[0]) < CONFIG["MIN_WORD_LENGTH"] and not is_acronym:
+                continue
+            pattern_nodes[normalized].add(node)
+
+    patterns = {
+        pattern: tuple(sorted(nodes))
+        for pattern, nodes in pattern_nodes.items()
+        if len(nodes) <= CONFIG["MAX_PATTERN_NODES"]
+    }
+    logging.info(f"Built knowledge matcher with {len(patterns)} patterns "
+                 f"({len(pattern_nodes) - len(patterns)} generic patterns dropped)")
+    return AhoCorasick(patterns), patterns
+
+
+def question_text(record):
+    """Text used to place a question in the graph (code listings are left out)."""
+    return " ".join([record.question, record.answer, " ".join(record.topics)])
+
+
+def map_questions(graph, records):
+    """Map every record to knowledge nodes in one pass; returns {qid: {node: hits}}."""
+    matcher, _ = build_matcher(graph)
+    mapping = {}
+    for record in records:
+        hits = defaultdict(int)
+        for nodes in matcher.search(normalize_text(question_text(record))):
+            for node in nodes:
+                hits[node] += 1
+        mapping[record.qid] = dict(hits)
+    return mapping
+
+
+def ensure_question_map(store=None, knowledge_file=None, force=False):
+    """Make sure the store's kg_map table reflects the current graph and datasets."""
+    knowledge_file = knowledge_file or CONFIG["KNOWLEDGE_FILE"]
+    store_file = store.store_file if store else STORE_CONFIG["STORE_FILE"]
+    compile_store(store_file, store.sources if store else None)
+
+    digest = file_sha256(knowledge_file)
+    conn = sqlite3.connect(store_file)
+    try:
+        current = conn.execute("SELECT value FROM meta WHERE key = 'sha256:knowledge'").fetchone()
+        if not force and current and current[0] == digest:
+            return False
+
+        graph = parse_knowledge_file(knowledge_file)
+        reader = store or DatasetStore(store_file, auto_compile=False)
+        records = reader.load_payloads(reader.select())
+        mapping = map_questions(graph, records)
+        with conn:
+            conn.execute("DELETE FROM kg_map")
+            conn.executemany(
+                "INSERT INTO kg_map (node_code, qid, hits) VALUES (?, ?, ?)",
+                [(graph.codes[node], qid, hits) for qid, nodes in mapping.items() for node, hits in nodes.items()]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('sha256:knowledge', ?)", (digest,))
+        mapped = sum(1 for nodes in mapping.values() if nodes)
+        logging.info(f"Mapped {mapped}/{len(mapping)} questions onto the knowledge graph")
+        return True
+    finally:
+        conn.close()
+
+
+def load_question_map(store, graph):
+    """Return {qid: [node indices]} from the store's kg_map table."""
+    ensure_question_map(store)
+    mapping = defaultdict(list)
+    for code, qid in store.conn.execute("SELECT node_code, qid FROM kg_map"):
+        if code in graph.index:
+            mapping[qid].append(graph.index[code])
+    return mapping
+
+
+def compute_coverage(graph, store):
+    """Return per-node rows with direct and subtree question counts per source."""
+    mapping = load_question_map(store, graph)
+    sources = {record.qid: record.source for record in store.select()}
+    source_names = sorted(set(sources.values()))
+
+    direct = [defaultdict(int) for _ in range(len(graph))]
+    subtree_members = [set() for _ in range(len(graph))]
+    for qid, nodes in mapping.items():
+        covered = set()
+        for node in nodes:
+            direct[node][sources[qid]] += 1
+            covered.update(graph.ancestors(node))
+        for node in covered:
+            subtree_members[node].add(qid)
+
+    rows = []
+    for node in range(len(graph)):
+        row = {
+            "code": graph.codes[node],
+            "label": graph.labels[node],
+            "depth": graph.depth[node],
+            "direct_questions": sum(direct[node].values()),
+            "subtree_questions": len(subtree_members[node]),
+        }
+        for source in source_names:
+            row[f"subtree_{source}"] = sum(1 for qid in subtree_members[node] if sources[qid] == source)
+        rows.append(row)
+    return rows
+
+
+def write_rows(rows, output=None):
+    """Write dict rows as CSV to a file or stdout."""
+    if not rows:
+        return
+    handle = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if output:
+            handle.close()
+            logging.info(f"Results have been saved to {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Knowledge graph index over graph/knowledge.md")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show = subparsers.add_parser("show", help="Print a knowledge subtree")
+    show.add_argument("code", nargs="?", help="Node code, e.g. 1.1.2 (default: all domains)")
+    show.add_argument("--max-depth", type=int, default=None, help="Deepest level to print")
+
+    mapping = subparsers.add_parser("map", help="Map every question onto knowledge nodes")
+    mapping.add_argument("--force", action="store_true", help="Recompute even if nothing changed")
+    mapping.add_argument("--output", help="CSV file for the question -> node mapping (default: stdout)")
+
+    coverage = subparsers.add_parser("coverage", help="Per-node question coverage")
+    coverage.add_argument("--max-depth", type=int, default=2, help="Deepest level to report (default: 2)")
+    coverage.add_argument("--uncovered", action="store_true", help="Only list nodes without questions")
+    coverage.add_argument("--output", help="CSV output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    graph = parse_knowledge_file()
+
+    if args.command == "show":
+        nodes = graph.subtree(graph.find(args.code)) if args.code else range(len(graph))
+        base_depth = graph.depth[nodes[0]] if nodes else 0
+        for node in nodes:
+            if args.max_depth is not None and graph.depth[node] > args.max_depth:
+                continue
+            print(f"{'    ' * (graph.depth[node] - base_depth)}{graph.codes[node]} {graph.labels[node]}")
+        return 0
+
+    store = DatasetStore()
+    if args.command == "map":
+        ensure_question_map(store, force=args.force)
+        mapping = load_question_map(store, graph)
+        rows = []
+        for record in store.select():
+            nodes = sorted(mapping.get(record.qid, []))
+            rows.append({
+                "source": record.source,
+                "id": record.id,
+                "nodes": " ".join(graph.codes[node] for node in nodes),
+            })
+        write_rows(rows, args.output)
+        return 0
+
+    rows = [row for row in compute_coverage(graph, store) if row["depth"] <= args.max_depth]
+    if args.uncovered:
+        rows = [row for row in rows if row["subtree_questions"] == 0]
+    write_rows(rows, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import csv
+import sys
+import logging
+import argparse
+
+import numpy as np
+
+from DatasetStore import DatasetStore
+from KnowledgeGraph import parse_knowledge_file, load_question_map, write_rows
+
+# Configuration
+CONFIG = {
+    "MC_RESULTS_CSV": None,    # wide per-question matrix, e.g. result/MultiChoice/combined_results.csv
+    "SCORED_CSVS": [],         # long score files written by Scoring.py or MC_Test.py
+    "MAX_DEPTH": 2,            # 0 = domain, 1 = sub-domain, 2 = knowledge area
+    "MIN_QUESTIONS": 5,        # nodes with fewer scored questions are left blank / not reported
+    "WEAKEST_PER_MODEL": 5,
+}
+
+# Columns in combined_results.csv that are not model scores
+WIDE_META_COLUMNS = {"question_id", "category"}
+
+
+class ResultsMatrix:
+    """Per-question scores as a dense models x questions matrix (NaN = not scored)."""
+
+    def __init__(self, models, qids, scores):
+        self.models = models
+        self.qids = qids
+        self.scores = scores
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build the matrix from (model, qid, score) triples; repeated runs are averaged."""
+        models = sorted({model for model, _, _ in entries})
+        qids = sorted({qid for _, qid, _ in entries})
+        model_index = {model: i for i, model in enumerate(models)}
+        qid_index = {qid: j for j, qid in enumerate(qids)}
+
+        rows = np.fromiter((model_index[m] for m, _, _ in entries), dtype=np.intp, count=len(entries))
+        cols = np.fromiter((qid_index[q] for _, q, _ in entries), dtype=np.intp, count=len(entries))
+        values = np.fromiter((s for _, _, s in entries), dtype=np.float64, count=len(entries))
+
+        sums = np.zeros((len(models), len(qids)))
+        counts = np.zeros((len(models), len(qids)))
+        np.add.at(sums, (rows, cols), values)
+        np.add.at(counts, (rows, cols), 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = sums / counts
+        return cls(models, qids, scores)
+
+
+def _question_lookup(store):
+    """Map (source, id) -> qid, also accepting unpadded numeric ids such as '7' for '007'."""
+    lookup = {}
+    for record in store.select():
+        lookup[(record.source, record.id)] = record.qid
+        if record.id.isdigit():
+            lookup[(record.source, str(int(record.id)))] = record.qid
+    return lookup
+
+
+def load_wide_results(path, lookup, source="multichoice", scale=100.0):
+    """Read a question_id x model matrix such as combined_results.csv."""
+    entries = []
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        models = [column for column in reader.fieldnames if column not in WIDE_META_COLUMNS]
+        for row in reader:
+            qid = lookup.get((source, row["question_id"].strip()))
+            if qid is None:
+                continue
+            for model in models:
+                value = row[model].strip()
+                if value:
+                    entries.append((model, qid, float(value) * scale))
+    logging.info(f"Loaded {len(entries)} scores for {len(models)} models from {path}")
+    return entries
+
+
+def load_long_results(path, lookup, source=None):
+    """Read a per-answer score file (Scoring.py output or MC_Test.py report)."""
+    entries = []
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        id_column = "Question ID" if "Question ID" in reader.fieldnames else "Question Number"
+        for row in reader:
+            row_source = source
+            if row_source is None:
+                # MC_Test.py reports carry the question file; Scoring.py output is always the task set
+                row_source = "multichoice" if "Multichoice" in row.get("Question File", "") else "tasks"
+            qid = lookup.get((row_source, str(row[id_column]).strip()))
+            if qid is None or row.get("Score", "") == "":
+                continue
+            score = float(row["Score"])
+            # MC_Test.py scores are 0/1 per question; put every source on the same 0-100 scale
+            if "Question File" in row:
+                score *= 100.0
+            entries.append((row["Model"], qid, score))
+    logging.info(f"Loaded {len(entries)} scores from {path}")
+    return entries
+
+
+def membership_matrix(graph, qids, question_map):
+    """Return a questions x nodes 0/1 matrix where a question belongs to every ancestor of its nodes."""
+    qid_index = {qid: j for j, qid in enumerate(qids)}
+    pairs = [(qid_index[qid], node) for qid, nodes in question_map.items() if qid in qid_index for node in nodes]
+    membership = np.zeros((len(qids), len(graph)), dtype=np.float64)
+    if not pairs:
+        return membership
+
+    rows, nodes = (np.asarray(column, dtype=np.intp) for column in zip(*pairs))
+    parent = np.frombuffer(graph.parent, dtype=np.int32).astype(np.intp)
+    # Walk all (question, node) pairs up the tree one level at a time
+    while rows.size:
+        membership[rows, nodes] = 1.0
+        nodes = parent[nodes]
+        keep = nodes >= 0
+        rows, nodes = rows[keep], nodes[keep]
+    return membership
+
+
+def rollup_scores(results, membership):
+    """Return (mean, count) node matrices (models x nodes) via masked matrix products."""
+    scored = ~np.isnan(results.scores)
+    sums = np.where(scored, results.scores, 0.0) @ membership
+    counts = scored.astype(np.float64) @ membership
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return means, counts
+
+
+def heatmap_rows(graph, results, means, counts, max_depth, min_questions):
+    """One row per node (down to max_depth), one column per model."""
+    depth = np.frombuffer(graph.depth, dtype=np.int32)
+    rows = []
+    for node in np.flatnonzero(depth <= max_depth):
+        row = {
+            "code": graph.codes[node],
+            "label": graph.labels[node],
+            "depth": int(depth[node]),
+            "questions": int(counts[:, node].max()) if counts.size else 0,
+        }
+        for m, model in enumerate(results.models):
+            row[model] = f"{means[m, node]:.2f}" if counts[m, node] >= min_questions else ""
+        rows.append(row)
+    return rows
+
+
+def weakest_subtrees(graph, results, means, counts, max_depth, min_questions, limit):
+    """Rank, per model, the subtrees where it trails the field by more than it does overall."""
+    depth = np.frombuffer(graph.depth, dtype=np.int32)
+    eligible = (counts >= min_questions) & (depth <= max_depth)[None, :] & (depth > 0)[None, :]
+
+    overall = np.nanmean(results.scores, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        field_node = np.where(eligible, means, 0.0).sum(axis=0) / eligible.sum(axis=0)
+    relative_gap = (means - field_node[None, :]) - (overall - overall.mean())[:, None]
+    relative_gap = np.where(eligible, relative_gap, np.inf)
+
+    order = np.argsort(relative_gap, axis=1)[:, :limit]
+    rows = []
+    for m, model in enumerate(results.models):
+        for node in order[m]:
+            if not np.isfinite(relative_gap[m, node]):
+                break
+            rows.append({
+                "model": model,
+                "code": graph.codes[node],
+                "label": graph.labels[node],
+                "questions": int(counts[m, node]),
+                "score": f"{means[m, node]:.2f}",
+                "field_score": f"{field_node[node]:.2f}",
+                "model_overall": f"{overall[m]:.2f}",
+                "relative_gap": f"{relative_gap[m, node]:.2f}",
+            })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll per-question scores up the knowledge graph")
+    parser.add_argument("--mc-results", default=CONFIG["MC_RESULTS_CSV"],
+                        help="Wide multiple-choice matrix, e.g. result/MultiChoice/combined_results.csv")
+    parser.add_argument("--scored", nargs="*", default=CONFIG["SCORED_CSVS"],
+                        help="Score CSVs from Scoring.py or MC_Test.py")
+    parser.add_argument("--max-depth", type=int, default=CONFIG["MAX_DEPTH"])
+    parser.add_argument("--min-questions", type=int, default=CONFIG["MIN_QUESTIONS"])
+    parser.add_argument("--weakest", type=int, default=CONFIG["WEAKEST_PER_MODEL"],
+                        help="Weakest subtrees to report per model")
+    parser.add_argument("--heatmap-output", help="CSV for the node x model table (default: stdout)")
+    parser.add_argument("--weakest-output", help="CSV for the weakest-subtrees report (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.mc_results and not args.scored:
+        parser.error("provide --mc-results and/or --scored")
+
+    store = DatasetStore()
+    graph = parse_knowledge_file()
+    lookup = _question_lookup(store)
+
+    entries = []
+    if args.mc_results:
+        entries.extend(load_wide_results(args.mc_results, lookup))
+    for path in args.scored:
+        entries.extend(load_long_results(path, lookup))
+    if not entries:
+        logging.error("No scores matched any question, exiting.")
+        return 1
+
+    results = ResultsMatrix.from_entries(entries)
+    membership = membership_matrix(graph, results.qids, load_question_map(store, graph))
+    means, counts = rollup_scores(results, membership)
+    logging.info(f"Rolled up {len(results.models)} models x {len(results.qids)} questions "
+                 f"onto {len(graph)} knowledge nodes")
+
+    write_rows(heatmap_rows(graph, results, means, counts, args.max_depth, args.min_questions),
+               args.heatmap_output)
+    if args.weakest > 0:
+        if not args.weakest_output:
+            print()
+        write_rows(weakest_subtrees(graph, results, means, counts, args.max_depth,
+                                    args.min_questions, args.weakest), args.weakest_output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
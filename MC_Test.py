@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from collections import defaultdict
 import matplotlib.pyplot as plt
+from DatasetStore import load_question_slice
 
 # Configure logging
 log_filename = f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -32,6 +33,7 @@ CONFIG = {
     "API_KEY": os.getenv("OPENAI_API_KEY"),  # Load API key from environment variable
     "TEST_RUNS": 1, # testrun number for each model
     "QUESTION_FILES": [os.path.join("dataset", "MultichoiceQuestions.json")], # can be adjusted based on actual enviorment
+    "QUESTION_FILTER": {}, # optional slice, e.g. {"topic": "DeFi", "difficulty": "Advanced"}
     "PROMPTS": [
         "You are an expert in cryptography and blockchain field, Please think carefully and answer the following question by providing only the letter of the correct option (A, B, C, or D). Your response should include no explanation, but ensure you consider all the options before selecting an answer.\n\nThe response should be a JSON object containing the following fields: 'answer': Your chosen answer (A, B, C, or D) . Please ensure your response is in valid JSON format. Here is an example { \"answer\": \"A\"}\nNow, let's look at the question:\n"
     #Output Json format to reduce uncertainty
@@ -42,9 +44,8 @@ async def load_questions(file_paths):
     all_questions = []
     for file_path in file_paths:
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                questions = json.load(file)
-                all_questions.extend([(file_path, q) for q in questions])
+            questions = load_question_slice(file_path, **CONFIG["QUESTION_FILTER"])
+            all_questions.extend([(file_path, q) for q in questions])
             logging.info(f"Successfully loaded {len(questions)} questions from {file_path}")
         except json.JSONDecodeError as e:
             logging.error(f"JSON decoding error in {file_path}: {e}")
@@ -2,12 +2,14 @@ import os
 import csv
 import re
 import asyncio
+import argparse
 import logging
 from datetime import datetime
 import anthropic
 import html
 from asyncio import Semaphore
 from concurrent.futures import ThreadPoolExecutor
+from DatasetStore import fingerprint
 
 # Configure logging
 log_filename = f"log_score_answers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -27,6 +29,11 @@ CONFIG = {
 
     "ANSWERS_CSV": "answers.csv",  # answers CSV that generated by testing engine
     "OUTPUT_CSV": f"scored_answers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+    # Previous scored CSV for incremental runs (or pass --incremental): only answers whose
+    # score fingerprint changed are re-scored, the rest keep their previous score
+    "PREVIOUS_SCORED_CSV": None,
+    # Bump when the scoring prompts or score extraction change so all answers are re-scored
+    "RUBRIC_VERSION": "1",
 
     # Concurrency settings
     "MAX_CONCURRENT_SCORING": 3,    
@@ -313,20 +320,68 @@ def extract_score(score_text):
 
 
 
+def select_prompt_template(answer_data):
+    category = answer_data.get('Category', '').lower()
+    if category == 'auditing':
+        return CONFIG["SCORING_PROMPT_AUDITING"]
+    elif category == 'coding':
+        return CONFIG["SCORING_PROMPT_CODING"]
+    return CONFIG["SCORING_PROMPT_QA"]
+
+
+def score_fingerprint(answer_data):
+    """Fingerprint of everything that determines a score: judge, rubric, question and both answers."""
+    return fingerprint(
+        CONFIG["SCORING_LLM_MODEL"], CONFIG["RUBRIC_VERSION"], select_prompt_template(answer_data),
+        answer_data.get('Fingerprint', ''), answer_data['Question'], answer_data.get('Code', ''),
+        answer_data['Standard Answer'], answer_data['LLM Answer']
+    )
+
+
+def load_previous_scores(filename):
+    """Load a previous scored CSV keyed by (Question ID, Model)."""
+    previous = {}
+    try:
+        with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                previous[(row["Question ID"], row["Model"])] = row
+        logging.info(f"Loaded {len(previous)} previous scores from {filename}")
+    except Exception as e:
+        logging.error(f"Error reading previous scores from {filename}: {e}")
+    return previous
+
+
+def carry_over_score(answer_data, previous):
+    """Copy the previous score into answer_data if its fingerprint still matches.
+
+    Only rows with a numeric score are carried; empty or unparsable scores and
+    failed scoring attempts are scored again. The justification is copied as
+    written, so it is marked as carried to keep save_results_to_csv from
+    unescaping it a second time.
+    """
+    row = previous.get((answer_data.get('Question ID', ''), answer_data.get('Model', '')))
+    if not row or row.get("Score Fingerprint") != answer_data["Score Fingerprint"]:
+        return False
+    try:
+        float(row.get("Score", ""))
+    except ValueError:
+        return False
+    if row.get("Justification", "").startswith("Failed to score"):
+        return False
+    answer_data["Score"] = row["Score"]
+    answer_data["Justification"] = row["Justification"]
+    answer_data["Carried Over"] = True
+    return True
+
+
 async def score_answer(answer_data):
     # Escape braces in answers
     standard_answer = escape_braces(answer_data['Standard Answer'])
     student_answer = escape_braces(answer_data['LLM Answer'])
     question = escape_braces(answer_data['Question'])
     code = escape_braces(answer_data.get('Code', ''))  # Get code if available
-    category = answer_data.get('Category', '').lower()
 
-    if category == 'auditing':
-        prompt_template = CONFIG["SCORING_PROMPT_AUDITING"]
-    elif category == 'coding':
-        prompt_template = CONFIG["SCORING_PROMPT_CODING"]
-    else:
-        prompt_template = CONFIG["SCORING_PROMPT_QA"]
+    prompt_template = select_prompt_template(answer_data)
 
     # Prepare the scoring prompt
     prompt = prompt_template.format(
@@ -347,11 +402,20 @@ async def score_answer(answer_data):
     return score, justification
 
 
-async def process_answers(answers):
+async def process_answers(answers, previous=None):
+    previous = previous or {}
     tasks = []
+    carried = 0
     for answer_data in answers:
-        task = asyncio.create_task(process_single_answer_with_semaphore(answer_data))
+        answer_data["Score Fingerprint"] = score_fingerprint(answer_data)
+        if carry_over_score(answer_data, previous):
+            carried += 1
+            task = asyncio.create_task(asyncio.sleep(0, result=answer_data))
+        else:
+            task = asyncio.create_task(process_single_answer_with_semaphore(answer_data))
         tasks.append(task)
+    if previous:
+        logging.info(f"Incremental run: carried over {carried} scores, scoring {len(answers) - carried}")
     
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
@@ -402,14 +466,17 @@ async def process_single_answer(answer_data):
 def save_results_to_csv(results, filename):
     fieldnames = [
         "Question ID", "Model", "Category", "Topics", "Score", "Justification",
-        "Question", "Code", "Standard Answer", "LLM Answer"
+        "Question", "Code", "Standard Answer", "LLM Answer", "Fingerprint", "Score Fingerprint"
     ]
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL, extrasaction='ignore')
         writer.writeheader()
         for result in results:
-            # Unescape the special characters for writing to CSV
-            for field in ["Question", "Code", "Standard Answer", "LLM Answer", "Justification"]:
+            # Unescape the special characters for writing to CSV (carried-over justifications were never escaped)
+            fields = ["Question", "Code", "Standard Answer", "LLM Answer"]
+            if not result.get("Carried Over"):
+                fields.append("Justification")
+            for field in fields:
                 if field in result:
                     result[field] = html.unescape(result[field]).replace('\\n', '\n').replace('\\r', '\r')
             writer.writerow(result)
@@ -422,7 +489,11 @@ async def main():
             logging.error("No answers loaded, exiting.")
             return
 
-        results = await process_answers(answers)
+        previous = {}
+        if CONFIG["PREVIOUS_SCORED_CSV"]:
+            previous = load_previous_scores(CONFIG["PREVIOUS_SCORED_CSV"])
+
+        results = await process_answers(answers, previous)
 
         # Save results to CSV
         save_results_to_csv(results, CONFIG["OUTPUT_CSV"])
@@ -437,4 +508,8 @@ async def main():
         EXECUTOR.shutdown(wait=True)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score LLM answers with the judge model")
+    parser.add_argument("--incremental", metavar="PREVIOUS_SCORED_CSV", default=CONFIG["PREVIOUS_SCORED_CSV"],
+                        help="Re-score only answers whose fingerprint changed since this scored CSV")
+    CONFIG["PREVIOUS_SCORED_CSV"] = parser.parse_args().incremental
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,228 @@
+import sys
+import logging
+import argparse
+
+import numpy as np
+
+from DatasetStore import DatasetStore
+from KnowledgeGraph import write_rows
+from KnowledgeRollup import ResultsMatrix, _question_lookup, load_wide_results, load_long_results
+
+# Configuration
+CONFIG = {
+    "MC_RESULTS_CSV": None,    # wide per-question matrix, e.g. result/MultiChoice/combined_results.csv
+    "SCORED_CSVS": [],         # long score files written by Scoring.py or MC_Test.py
+    "RESAMPLES": 10000,
+    "ALPHA": 0.05,
+    "TEST": "permutation",     # test that decides significance: "permutation" or "bootstrap"
+    "CORRECTION": "fdr",       # multiple-comparison correction: "fdr" (Benjamini-Hochberg), "holm" or "none"
+    "SEED": 0,
+    "CHUNK_RESAMPLES": 1000,   # resamples per matrix product, bounds memory use
+}
+
+
+def pair_indices(num_models):
+    """Return the (i, j) index arrays of all model pairs with i < j."""
+    return np.triu_indices(num_models, k=1)
+
+
+def paired_differences(scores):
+    """Return per-question differences (questions x pairs) and the mask of questions both models answered."""
+    scored = ~np.isnan(scores)
+    values = np.where(scored, scores, 0.0)
+    left, right = pair_indices(scores.shape[0])
+    mask = (scored[left] & scored[right]).T.astype(np.float64)
+    diffs = (values[left] - values[right]).T * mask
+    return diffs, mask
+
+
+def bootstrap_pairs(diffs, mask, resamples, rng, chunk_size):
+    """Paired bootstrap of the mean difference for every pair at once.
+
+    Each resample is a row of question multiplicities, so a whole chunk of
+    resamples for all pairs is a single (resamples x questions) @ (questions x pairs) product.
+    """
+    num_questions = diffs.shape[0]
+    samples = np.empty((resamples, diffs.shape[1]))
+    uniform = np.full(num_questions, 1.0 / num_questions)
+    for start in range(0, resamples, chunk_size):
+        size = min(chunk_size, resamples - start)
+        weights = rng.multinomial(num_questions, uniform, size=size).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            samples[start:start + size] = (weights @ diffs) / (weights @ mask)
+    return samples
+
+
+def permutation_pairs(diffs, mask, resamples, rng, chunk_size):
+    """Paired sign-flip permutation test; returns two-sided p-values per pair."""
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = np.abs(diffs.sum(axis=0) / counts)
+    exceed = np.zeros(diffs.shape[1])
+    for start in range(0, resamples, chunk_size):
+        size = min(chunk_size, resamples - start)
+        signs = rng.integers(0, 2, size=(size, diffs.shape[0]), dtype=np.int8).astype(np.float64) * 2.0 - 1.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            permuted = np.abs((signs @ diffs) / counts)
+        # Small tolerance so ties with the observed statistic count as "at least as extreme"
+        exceed += (permuted >= observed - 1e-12).sum(axis=0)
+    return (exceed + 1.0) / (resamples + 1.0)
+
+
+def holm_adjust(pvalues):
+    """Holm-Bonferroni adjusted p-values."""
+    order = np.argsort(pvalues)
+    ranked = pvalues[order] * (len(pvalues) - np.arange(len(pvalues)))
+    adjusted = np.empty_like(pvalues)
+    adjusted[order] = np.minimum(np.maximum.accumulate(ranked), 1.0)
+    return adjusted
+
+
+def fdr_adjust(pvalues):
+    """Benjamini-Hochberg adjusted p-values."""
+    order = np.argsort(pvalues)
+    ranked = pvalues[order] * len(pvalues) / np.arange(1, len(pvalues) + 1)
+    adjusted = np.empty_like(pvalues)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return adjusted
+
+
+CORRECTIONS = {
+    "fdr": fdr_adjust,
+    "holm": holm_adjust,
+    "none": lambda pvalues: pvalues,
+}
+
+
+def compare_models(results, resamples=None, alpha=None, test=None, correction=None, seed=None):
+    """Run both paired tests for every model pair and return (leaderboard rows, pair rows)."""
+    resamples = resamples or CONFIG["RESAMPLES"]
+    alpha = alpha if alpha is not None else CONFIG["ALPHA"]
+    test = test or CONFIG["TEST"]
+    correction = correction or CONFIG["CORRECTION"]
+    rng = np.random.default_rng(CONFIG["SEED"] if seed is None else seed)
+    chunk_size = CONFIG["CHUNK_RESAMPLES"]
+
+    scores = results.scores
+    num_models = scores.shape[0]
+    left, right = pair_indices(num_models)
+    diffs, mask = paired_differences(scores)
+    if correction == "holm" and test == "permutation" and len(left) / (resamples + 1) >= alpha:
+        logging.warning(f"{resamples} permutations cannot reach Holm significance for {len(left)} pairs; "
+                        f"use more resamples or --correction fdr")
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = diffs.sum(axis=0) / counts
+
+    boot = bootstrap_pairs(diffs, mask, resamples, rng, chunk_size)
+    ci_low, ci_high = np.nanpercentile(boot, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    p_bootstrap = np.minimum(1.0, 2.0 * np.minimum((boot <= 0).mean(axis=0), (boot >= 0).mean(axis=0)))
+    p_permutation = permutation_pairs(diffs, mask, resamples, rng, chunk_size)
+    p_test = p_permutation if test == "permutation" else p_bootstrap
+    p_adjusted = CORRECTIONS[correction](np.nan_to_num(p_test, nan=1.0))
+    significant = (p_adjusted < alpha) & (counts > 0)
+
+    # Per-model means and bootstrap intervals from the same kind of resampling
+    scored = ~np.isnan(scores)
+    values = np.where(scored, scores, 0.0).T
+    weights_mask = scored.T.astype(np.float64)
+    model_boot = bootstrap_pairs(values, weights_mask, resamples, rng, chunk_size)
+    model_low, model_high = np.nanpercentile(model_boot, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = values.sum(axis=0) / weights_mask.sum(axis=0)
+
+    # better[i, j]: model i is significantly better than model j
+    better = np.zeros((num_models, num_models), dtype=bool)
+    better[left, right] = significant & (observed > 0)
+    better[right, left] = significant & (observed < 0)
+
+    order = np.argsort(-means)
+    tiers = np.zeros(num_models, dtype=int)
+    tier, tier_head = 1, order[0]
+    for model in order:
+        # Start a new tier once a model is significantly behind the head of the current one
+        if better[tier_head, model]:
+            tier += 1
+            tier_head = model
+        tiers[model] = tier
+
+    leaderboard = []
+    for rank, model in enumerate(order, 1):
+        leaderboard.append({
+            "rank": rank,
+            # 1 + number of models significantly better than this one
+            "significance_rank": int(better[:, model].sum()) + 1,
+            "tier": int(tiers[model]),
+            "model": results.models[model],
+            "mean": f"{means[model]:.2f}",
+            "ci_low": f"{model_low[model]:.2f}",
+            "ci_high": f"{model_high[model]:.2f}",
+            "questions": int(weights_mask[:, model].sum()),
+        })
+
+    pairs = []
+    for k in np.argsort(p_adjusted, kind='stable'):
+        pairs.append({
+            "model_a": results.models[left[k]],
+            "model_b": results.models[right[k]],
+            "questions": int(counts[k]),
+            "mean_diff": f"{observed[k]:.3f}",
+            "ci_low": f"{ci_low[k]:.3f}",
+            "ci_high": f"{ci_high[k]:.3f}",
+            "p_bootstrap": f"{p_bootstrap[k]:.4f}",
+            "p_permutation": f"{p_permutation[k]:.4f}",
+            "p_adjusted": f"{p_adjusted[k]:.4f}",
+            "significant": bool(significant[k]),
+        })
+    return leaderboard, pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paired significance tests between leaderboard models")
+    parser.add_argument("--mc-results", default=CONFIG["MC_RESULTS_CSV"],
+                        help="Wide multiple-choice matrix, e.g. result/MultiChoice/combined_results.csv")
+    parser.add_argument("--scored", nargs="*", default=CONFIG["SCORED_CSVS"],
+                        help="Score CSVs from Scoring.py or MC_Test.py")
+    parser.add_argument("--resamples", type=int, default=CONFIG["RESAMPLES"])
+    parser.add_argument("--alpha", type=float, default=CONFIG["ALPHA"], help="Significance level")
+    parser.add_argument("--test", choices=["permutation", "bootstrap"], default=CONFIG["TEST"],
+                        help=f"Test used to decide significance (default: {CONFIG['TEST']})")
+    parser.add_argument("--correction", choices=sorted(CORRECTIONS), default=CONFIG["CORRECTION"],
+                        help=f"Multiple-comparison correction across all pairs (default: {CONFIG['CORRECTION']})")
+    parser.add_argument("--seed", type=int, default=CONFIG["SEED"])
+    parser.add_argument("--output", help="CSV for the grouped leaderboard (default: stdout)")
+    parser.add_argument("--pairs-output", help="CSV with every pairwise comparison")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.mc_results and not args.scored:
+        parser.error("provide --mc-results and/or --scored")
+
+    lookup = _question_lookup(DatasetStore())
+    entries = []
+    if args.mc_results:
+        entries.extend(load_wide_results(args.mc_results, lookup))
+    for path in args.scored:
+        entries.extend(load_long_results(path, lookup))
+    if not entries:
+        logging.error("No scores matched any question, exiting.")
+        return 1
+
+    results = ResultsMatrix.from_entries(entries)
+    if len(results.models) < 2:
+        logging.error("At least two models are needed for a comparison, exiting.")
+        return 1
+
+    leaderboard, pairs = compare_models(results, args.resamples, args.alpha, args.test,
+                                       args.correction, args.seed)
+    logging.info(f"Compared {len(pairs)} model pairs over {len(results.qids)} questions "
+                 f"with {args.resamples} resamples; {sum(p['significant'] for p in pairs)} pairs differ significantly")
+
+    write_rows(leaderboard, args.output)
+    if args.pairs_output:
+        write_rows(pairs, args.pairs_output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ import aiohttp
 import html
 from asyncio import Semaphore
 import sys  
+import argparse
+from DatasetStore import load_question_slice, fingerprint
 
 
 # Configure logging
@@ -29,8 +31,14 @@ CONFIG = {
     "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),  # OpenAI API KEY
     "OPENAI_API_URL": "https://api.openai.com/v1/chat/completions",# or replace with 3rd party URL
 
-    "QUESTION_FILE": os.path.join("dataset", "newtasks.json"),
+    "QUESTION_FILE": os.path.join("dataset", "Tasks&Questions.json"),
+    # Optional slice of the question file, e.g. {"category": "auditing", "topic": "DeFi"} or {"kg_node": "1.1.2"};
+    # add "manifest": "dedup_manifest.json" to skip near-duplicates found by Dedup.py
+    "QUESTION_FILTER": {},
     "OUTPUT_CSV": f"answers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+    # Previous answers CSV for incremental runs (or pass --incremental): only (question, model)
+    # pairs whose fingerprint changed are regenerated, the rest are carried over
+    "PREVIOUS_ANSWERS_CSV": None,
 
     # Concurrency settings
     "MAX_CONCURRENT_QUESTIONS": 3,  
@@ -103,8 +111,7 @@ MODEL_SEMAPHORE = Semaphore(CONFIG["MAX_CONCURRENT_MODELS"])
 
 async def load_questions(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            questions = json.load(file)
+        questions = load_question_slice(file_path, **CONFIG["QUESTION_FILTER"])
         logging.info(f"Successfully loaded {len(questions)} questions from {file_path}")
         return questions
     except json.JSONDecodeError as e:
@@ -150,9 +157,9 @@ async def call_openai_api(session, model, messages, max_retries=6, delay=8):
                 await asyncio.sleep(delay)
     return None
 
-async def generate_answer(session, question_data):
+async def generate_answer(session, question_data, models=None):
     tasks = []
-    for model in CONFIG["TESTING_LLM_MODEL"]:
+    for model in models or CONFIG["TESTING_LLM_MODEL"]:
         task = asyncio.create_task(generate_single_answer_with_semaphore(session, question_data, model))
         tasks.append(task)
     
@@ -160,25 +167,31 @@ async def generate_answer(session, question_data):
     return answers
 
 
-async def generate_single_answer_with_semaphore(session, question_data, model):
-    async with MODEL_SEMAPHORE:
-        if question_data.get("category") == "auditing":
-            code = question_data.get('code') or "Code is included in the question."
-            prompt = CONFIG["AUDITING_PROMPT"].format(
-                code=code
-            )
-        elif question_data.get("category") == "coding":
-            prompt = CONFIG["CODING_PROMPT"].format(
-                question=question_data['question']
-            )
-        else:
-            prompt = CONFIG["TESTING_PROMPT"].format(question=question_data['question'])
+def build_messages(question_data):
+    if question_data.get("category") == "auditing":
+        code = question_data.get('code') or "Code is included in the question."
+        prompt = CONFIG["AUDITING_PROMPT"].format(
+            code=code
+        )
+    elif question_data.get("category") == "coding":
+        prompt = CONFIG["CODING_PROMPT"].format(
+            question=question_data['question']
+        )
+    else:
+        prompt = CONFIG["TESTING_PROMPT"].format(question=question_data['question'])
+
+    return [
+        {"role": "system", "content": "You are a helpful assistant specialized in blockchain and smart contract security."},
+        {"role": "user", "content": prompt.strip()}
+    ]
 
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant specialized in blockchain and smart contract security."},
-            {"role": "user", "content": prompt.strip()}
-        ]
+def answer_fingerprint(question_data, model):
+    """Fingerprint of everything that determines an answer: model, rendered prompt (template + question)."""
+    return fingerprint(model, json.dumps(build_messages(question_data), sort_keys=True))
 
+async def generate_single_answer_with_semaphore(session, question_data, model):
+    async with MODEL_SEMAPHORE:
+        messages = build_messages(question_data)
         answer = await call_openai_api(session, model, messages)
         return {"model": model, "answer": answer}
 
@@ -186,26 +199,72 @@ def escape_special_chars(text):
     """Escape special characters in the text."""
     return html.escape(text).replace('\n', '\\n').replace('\r', '\\r')
 
-async def process_questions(questions):
+def load_previous_answers(filename):
+    """Load a previous answers CSV keyed by (Question ID, Model)."""
+    previous = {}
+    try:
+        with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                previous[(row["Question ID"], row["Model"])] = row
+        logging.info(f"Loaded {len(previous)} previous answers from {filename}")
+    except Exception as e:
+        logging.error(f"Error reading previous answers from {filename}: {e}")
+    return previous
+
+def carry_over_answer(question_data, model, previous):
+    """Return the previous answer row if it is still valid for this question and model, else None."""
+    row = previous.get((question_data.get("id", ""), model))
+    if not row or row.get("Fingerprint") != answer_fingerprint(question_data, model):
+        return None
+    if row.get("LLM Answer") in ("", "No answer generated."):
+        return None
+    # The standard answer and labels are not part of the prompt, so refresh them from the dataset
+    return {
+        "Question ID": question_data.get("id", ""),
+        "Model": model,
+        "Question": escape_special_chars(question_data.get("question", "")),
+        "Code": escape_special_chars(question_data.get("code", "")),
+        "Standard Answer": escape_special_chars(question_data.get("answer", "")),
+        "LLM Answer": escape_special_chars(row["LLM Answer"]),
+        "Category": question_data.get("category", ""),
+        "Topics": ", ".join(question_data.get("topic", [])),
+        "Fingerprint": row["Fingerprint"],
+        "Carried Over": True,
+    }
+
+async def process_questions(questions, previous=None):
+    previous = previous or {}
     async with aiohttp.ClientSession() as session:
         tasks = []
         for question in questions:
-            task = asyncio.create_task(process_single_question_with_semaphore(session, question))
+            task = asyncio.create_task(process_single_question_with_semaphore(session, question, previous))
             tasks.append(task)
         
         results = await asyncio.gather(*tasks)
     
     return [item for sublist in results for item in sublist]
 
-async def process_single_question_with_semaphore(session, question_data):
+async def process_single_question_with_semaphore(session, question_data, previous=None):
     async with QUESTION_SEMAPHORE:
-        return await process_single_question(session, question_data)
+        return await process_single_question(session, question_data, previous)
+
+async def process_single_question(session, question_data, previous=None):
+    carried = []
+    stale_models = []
+    for model in CONFIG["TESTING_LLM_MODEL"]:
+        row = carry_over_answer(question_data, model, previous or {})
+        if row:
+            carried.append(row)
+        else:
+            stale_models.append(model)
+    if not stale_models:
+        logging.info(f"Question {question_data.get('id', '')} unchanged, carried over {len(carried)} answers")
+        return carried
 
-async def process_single_question(session, question_data):
     start_time = asyncio.get_event_loop().time()
     logging.info(f"Started processing Question {question_data.get('id', '')} at {start_time}")
     
-    llm_answers = await generate_answer(session, question_data)
+    llm_answers = await generate_answer(session, question_data, stale_models)
 
     results = []
     for llm_result in llm_answers:
@@ -226,18 +285,19 @@ async def process_single_question(session, question_data):
             "Standard Answer": escape_special_chars(question_data.get("answer", "")),
             "LLM Answer": escape_special_chars(llm_answer),
             "Category": question_data.get("category", ""),
-            "Topics": ", ".join(question_data.get("topic", []))
+            "Topics": ", ".join(question_data.get("topic", [])),
+            "Fingerprint": answer_fingerprint(question_data, model)
         }
         results.append(result)
 
     end_time = asyncio.get_event_loop().time()
     logging.info(f"Finished processing Question {question_data.get('id', '')} at {end_time}. Took {end_time - start_time} seconds.")
-    return results
+    return carried + results
 
 def save_results_to_csv(results, filename):
     fieldnames = [
         "Question ID", "Model", "Category", "Topics",
-        "Question", "Code", "Standard Answer", "LLM Answer"
+        "Question", "Code", "Standard Answer", "LLM Answer", "Fingerprint"
     ]
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
@@ -257,7 +317,14 @@ async def main():
             logging.error("No questions loaded, exiting.")
             return
 
-        results = await process_questions(questions)
+        previous = {}
+        if CONFIG["PREVIOUS_ANSWERS_CSV"]:
+            previous = load_previous_answers(CONFIG["PREVIOUS_ANSWERS_CSV"])
+
+        results = await process_questions(questions, previous)
+        carried = sum(1 for r in results if r.pop("Carried Over", False))
+        if previous:
+            logging.info(f"Incremental run: carried over {carried} answers, generated {len(results) - carried}")
 
         # Save results to CSV
         save_results_to_csv(results, CONFIG["OUTPUT_CSV"])
@@ -270,4 +337,8 @@ async def main():
         logging.error(traceback.format_exc())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate LLM answers for the CryptoBench questions")
+    parser.add_argument("--incremental", metavar="PREVIOUS_ANSWERS_CSV", default=CONFIG["PREVIOUS_ANSWERS_CSV"],
+                        help="Regenerate only answers whose question or prompt changed since this answers CSV")
+    CONFIG["PREVIOUS_ANSWERS_CSV"] = parser.parse_args().incremental
     asyncio.run(main())
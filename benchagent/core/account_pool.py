@@ -0,0 +1,82 @@
+import logging
+from dataclasses import replace
+from typing import List
+
+from eth_account import Account
+from web3 import Web3
+
+from .config import BlockchainConfig
+
+
+class AccountPool:
+    """Account pool - gives every worker its own funded account so concurrent tasks never share a nonce sequence"""
+
+    def __init__(self, blockchain_config: BlockchainConfig, size: int):
+        self.config = blockchain_config
+        self.logger = logging.getLogger(__name__)
+        self.accounts = self._load_accounts(size)
+
+    def _load_accounts(self, size: int) -> List:
+        """Load worker accounts from the configured key list or derive them from the mnemonic"""
+        if self.config.worker_private_keys:
+            accounts = [Account.from_key(key) for key in self.config.worker_private_keys[:size]]
+        elif self.config.mnemonic:
+            Account.enable_unaudited_hdwallet_features()
+            accounts = [
+                Account.from_mnemonic(self.config.mnemonic, account_path=f"m/44'/60'/0'/0/{index}")
+                for index in range(size)
+            ]
+        else:
+            accounts = []
+
+        if len(accounts) < size:
+            self.logger.warning(
+                f"Requested {size} workers but only {len(accounts)} worker accounts are configured"
+            )
+        return accounts
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def worker_configs(self) -> List[BlockchainConfig]:
+        """Return one blockchain configuration per worker account"""
+        return [
+            replace(self.config, private_key=Web3.to_hex(account.key), sender_address=account.address)
+            for account in self.accounts
+        ]
+
+    def fund_workers(self, web3: Web3) -> None:
+        """Top up worker accounts from the main account up to worker_funding_eth"""
+        target = Web3.to_wei(self.config.worker_funding_eth, "ether")
+        if target <= 0:
+            return
+
+        funder = web3.eth.account.from_key(self.config.private_key)
+        nonce = web3.eth.get_transaction_count(funder.address, "pending")
+        gas_price = int(web3.eth.gas_price * self.config.gas_price_multiplier)
+
+        tx_hashes = []
+        for account in self.accounts:
+            if account.address.lower() == funder.address.lower():
+                continue
+            balance = web3.eth.get_balance(account.address)
+            if balance >= target:
+                continue
+
+            signed_txn = funder.sign_transaction({
+                "to": account.address,
+                "value": target - balance,
+                "gas": 21000,
+                "gasPrice": gas_price,
+                "nonce": nonce,
+                "chainId": self.config.chain_id
+            })
+            tx_hashes.append(web3.eth.send_raw_transaction(signed_txn.raw_transaction))
+            self.logger.info(f"Funding worker account {account.address} with {Web3.from_wei(target - balance, 'ether')} ETH")
+            nonce += 1
+
+        # Send all top-ups first, then wait for them together
+        for tx_hash in tx_hashes:
+            receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            if receipt.status != 1:
+                raise RuntimeError(f"Worker funding transaction {tx_hash.hex()} reverted")
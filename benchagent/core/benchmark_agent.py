@@ -1,23 +1,38 @@
+import time
+import queue
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional
+from dataclasses import replace
 from pathlib import Path
+from web3 import Web3
 
 from .config import BenchmarkConfig
 from .types import BenchmarkTask, TaskPlan, ExecutionResult
 from .task_manager import TaskManager
 from .task_planner import TaskPlanner
+from .plan_cache import PlanCache
 from .step_executor import StepExecutor
 from .code_generator import CodeGenerator
 from .llm_client import LLMClient
+from .llm_cassette import LLMCassette
 from .environment_checker import EnvironmentChecker
+from .account_pool import AccountPool
+from .rpc_proxy import RPCProxy, NonceManager
+from .receipt_tracker import ReceiptTracker
+from .preflight import PreflightChecker
 from executors.solidity_executor import SolidityExecutor
+from executors.evm_backend import InProcessChain
+from executors.compile_cache import CompileCache
+from executors.compiler_service import CompilerService
 from executors.python_executor import PythonExecutor
+from executors.python_worker_pool import PythonWorkerPool
 
 
 class BenchmarkAgent:
     """Main benchmark testing agent - coordinates all components to complete task execution"""
     
-    def __init__(self, config: BenchmarkConfig):
+    def __init__(self, config: BenchmarkConfig, replan: bool = False):
         self.config = config
         self.logger = logging.getLogger(__name__)
         
@@ -26,13 +41,34 @@ class BenchmarkAgent:
         
         # Initialize components
         self.task_manager = TaskManager(config.output_dir)
-        self.llm_client = LLMClient(config.llm, self.task_manager)
-        self.task_planner = TaskPlanner(self.llm_client)
-        self.code_generator = CodeGenerator(self.llm_client)
+        self.cassette = LLMCassette.from_run_id(config.replay_run, config.output_dir) if config.replay_run else None
+        self.llm_client = LLMClient(config.llm, self.task_manager, self.cassette)
+        self.plan_cache = PlanCache(config.cache_dir) if config.plan_cache else None
+        self.task_planner = TaskPlanner(self.llm_client, self.plan_cache, replan)
+        self.code_generator = CodeGenerator(self.llm_client, config.context_token_budget)
+        
+        # Start the embedded chain first; it replaces the endpoint and accounts in the configuration
+        self.inprocess_chain = None
+        if config.blockchain.backend == "inprocess":
+            self.inprocess_chain = InProcessChain(config.blockchain, config.blockchain.inprocess_port)
+            config.blockchain = self.inprocess_chain.blockchain_config
+        
+        # Executors and generated scripts share one proxied connection to the node
+        self.rpc_proxy = None
+        if config.blockchain.backend == "rpc" and config.blockchain.rpc_proxy:
+            self.rpc_proxy = RPCProxy(config.blockchain.rpc_url)
+            config.blockchain = replace(config.blockchain, rpc_url=self.rpc_proxy.url)
         
         # Initialize executors
-        self.solidity_executor = SolidityExecutor(config.blockchain, config.solc_version, self.task_manager)
-        self.python_executor = PythonExecutor(config.timeout, self.task_manager)
+        self.compile_cache = CompileCache(config.cache_dir) if config.compile_cache else None
+        self.compiler = CompilerService(config.compiler_workers, config.compiler_queue_size, config.compile_timeout)
+        self.solidity_executor = SolidityExecutor(config.blockchain, config.solc_version, self.task_manager,
+                                                  self._chain_web3(), self.compile_cache, self.compiler,
+                                                  self._nonce_manager())
+        self.python_worker_pool = PythonWorkerPool(config.python_workers) if config.python_workers else None
+        self.python_executor = PythonExecutor(config.timeout, self.task_manager, self.python_worker_pool,
+                                              config.python_idle_timeout, config.python_kill_on_traceback)
+        self.preflight = PreflightChecker(self.compiler, config.solc_version) if config.preflight else None
         
         # Initialize step executor
         self.step_executor = StepExecutor(
@@ -40,7 +76,11 @@ class BenchmarkAgent:
             self.solidity_executor,
             self.python_executor,
             config.max_retries,
-            self.task_manager
+            self.task_manager,
+            config.speculative_attempts,
+            config.speculative_temperature_step,
+            config.anvil_path,
+            self.preflight
         )
         
         self.logger.info("BenchmarkAgent initialized successfully")
@@ -52,7 +92,7 @@ class BenchmarkAgent:
         # Run environment check
         if not skip_env_check:
             self.logger.info("Running environment check...")
-            env_checker = EnvironmentChecker()
+            env_checker = EnvironmentChecker(inprocess_chain=self.inprocess_chain is not None)
             env_success, env_issues = env_checker.run_full_check()
             
             if not env_success:
@@ -76,74 +116,154 @@ class BenchmarkAgent:
         tasks = self.task_manager.load_tasks(tasks_file)
         
         # Execute all tasks
-        results = []
-        for task in tasks:
-            result = self.execute_task(task)
-            results.append(result)
-            
-            # Save task results
-            self.task_manager.save_task_result(task.id, result)
+        start_time = time.time()
+        if self.config.max_workers > 1 and len(tasks) > 1:
+            results = self._run_tasks_parallel(tasks)
+        else:
+            results = []
+            for task in tasks:
+                result = self.execute_task(task)
+                results.append(result)
+                
+                # Save task results
+                self.task_manager.save_task_result(task.id, result)
+        self.logger.info(f"Executed {len(tasks)} tasks in {time.time() - start_time:.1f} seconds")
         
         # Generate summary
-        summary = self.task_manager.generate_summary(results)
+        metrics = {}
+        if self.plan_cache:
+            metrics["plan_cache"] = self.plan_cache.stats()
+            self.logger.info(f"Plan cache: {metrics['plan_cache']['hits']} hits, "
+                             f"{metrics['plan_cache']['misses']} misses")
+        if self.compile_cache:
+            metrics["compile_cache"] = self.compile_cache.stats()
+            self.logger.info(f"Compile cache: {metrics['compile_cache']['hits']} hits, "
+                             f"{metrics['compile_cache']['misses']} misses")
+        metrics["compiler"] = self.compiler.stats()
+        self.logger.info(f"Compiler pool: {metrics['compiler']['utilization']:.1f}% utilised, "
+                         f"{metrics['compiler']['avg_queue_wait_ms']:.1f} ms average queue wait")
+        if self.python_worker_pool:
+            metrics["python_workers"] = self.python_worker_pool.stats()
+            self.logger.info(f"Python workers: {metrics['python_workers']['warm_runs']} warm runs "
+                             f"({metrics['python_workers']['avg_warm_start_ms']} ms), interpreter spawn takes "
+                             f"{metrics['python_workers']['avg_spawn_ms']} ms")
+        receipt_tracker = ReceiptTracker.existing(self.config.blockchain.rpc_url)
+        if receipt_tracker:
+            metrics["receipt_tracker"] = receipt_tracker.stats()
+            self.logger.info(f"Receipt tracker: {metrics['receipt_tracker']['mined']} receipts from "
+                             f"{metrics['receipt_tracker']['receipt_batches']} batches, "
+                             f"{metrics['receipt_tracker']['stuck']} stuck transactions")
+        if self.preflight:
+            metrics["preflight"] = self.preflight.stats()
+            self.logger.info(f"Pre-flight checks: {metrics['preflight']['rejected']} of "
+                             f"{metrics['preflight']['checked']} attempts rejected, "
+                             f"{metrics['preflight']['executions_avoided']} executions avoided")
+        if self.rpc_proxy:
+            metrics["rpc_proxy"] = self.rpc_proxy.stats()
+            self.logger.info(f"RPC proxy: {metrics['rpc_proxy']['calls']} calls, "
+                             f"{metrics['rpc_proxy']['saved_calls']} answered without the node")
+        if self.cassette:
+            metrics["replay"] = self.cassette.stats()
+            self.logger.info(f"Replay: {metrics['replay']['served'] + metrics['replay']['served_loose']} "
+                             f"recorded responses served, {metrics['replay']['unmatched']} unmatched")
+        summary = self.task_manager.generate_summary(results, metrics)
         
         self.logger.info(f"Benchmark completed. Success rate: {summary['success_rate']:.2f}%")
         return summary
     
-    def execute_task(self, task: BenchmarkTask) -> Dict[str, Any]:
+    def _chain_web3(self) -> Optional[Web3]:
+        """A Web3 instance on the in-process chain, or None to connect to rpc_url"""
+        if self.inprocess_chain is None:
+            return None
+        # One instance per executor, since each sets its own default account
+        return Web3(self.inprocess_chain.provider)
+    
+    def close(self) -> None:
+        """Shut down the LLM client, worker processes and local endpoints"""
+        self.llm_client.close()
+        if self.python_worker_pool:
+            self.python_worker_pool.close()
+        self.compiler.close()
+        if self.rpc_proxy:
+            self.rpc_proxy.close()
+        if self.inprocess_chain:
+            self.inprocess_chain.close()
+    
+    def _nonce_manager(self) -> Optional[NonceManager]:
+        """The RPC proxy's nonce manager, so deployments and scripts on one account never share a nonce"""
+        return self.rpc_proxy.nonces if self.rpc_proxy else None
+    
+    def _create_worker_step_executors(self) -> List[StepExecutor]:
+        """Create one step executor per worker, each bound to its own blockchain account"""
+        account_pool = AccountPool(self.config.blockchain, self.config.max_workers)
+        if len(account_pool) < 2:
+            self.logger.warning("Parallel execution needs at least two worker accounts (mnemonic or "
+                                "worker_private_keys); running tasks sequentially")
+            return [self.step_executor]
+        
+        account_pool.fund_workers(self.solidity_executor.web3)
+        
+        step_executors = []
+        for blockchain_config in account_pool.worker_configs():
+            solidity_executor = SolidityExecutor(blockchain_config, self.config.solc_version, self.task_manager,
+                                                 self._chain_web3(), self.compile_cache, self.compiler,
+                                                 self._nonce_manager())
+            step_executors.append(StepExecutor(
+                self.code_generator,
+                solidity_executor,
+                self.python_executor,
+                self.config.max_retries,
+                self.task_manager,
+                self.config.speculative_attempts,
+                self.config.speculative_temperature_step,
+                self.config.anvil_path,
+                self.preflight
+            ))
+        return step_executors
+    
+    def _run_tasks_parallel(self, tasks: List[BenchmarkTask]) -> List[Dict[str, Any]]:
+        """Run tasks on a worker pool; each in-flight task holds one worker's step executor"""
+        step_executors = self._create_worker_step_executors()
+        self.logger.info(f"Running {len(tasks)} tasks with {len(step_executors)} workers")
+        
+        idle_executors = queue.Queue()
+        for step_executor in step_executors:
+            idle_executors.put(step_executor)
+        
+        def run_task(task: BenchmarkTask) -> Dict[str, Any]:
+            step_executor = idle_executors.get()
+            try:
+                self.logger.info(f"Task {task.id} assigned to worker account "
+                                 f"{step_executor.solidity_executor.account.address}")
+                result = self.execute_task(task, step_executor)
+            finally:
+                idle_executors.put(step_executor)
+            
+            # Save task results
+            self.task_manager.save_task_result(task.id, result)
+            return result
+        
+        with ThreadPoolExecutor(max_workers=len(step_executors), thread_name_prefix="task-worker") as pool:
+            # map() keeps results in task order
+            return list(pool.map(run_task, tasks))
+    
+    def execute_task(self, task: BenchmarkTask, step_executor: Optional[StepExecutor] = None) -> Dict[str, Any]:
         """Execute single task"""
         self.logger.info(f"Executing task {task.id}: {task.description}")
+        step_executor = step_executor or self.step_executor
         
         try:
             # 1. Task planning
             plan = self.task_planner.plan_task(task)
             self.logger.info(f"Task {task.id} planned with {len(plan.steps)} steps")
             
-            # 2. Execute steps
-            step_results = []
+            # 2. Execute steps in dependency order; independent steps run in parallel
             context = {
                 "deployed_contracts": {},
                 "previous_outputs": {}
             }
-            
-            for step in plan.steps:
-                # Check dependencies
-                if not self._check_dependencies(step, step_results):
-                    step_result = ExecutionResult(
-                        success=False,
-                        step_id=step.id,
-                        error="Dependencies not satisfied"
-                    )
-                else:
-                    # Execute step
-                    step_result = self.step_executor.execute_step(step, task.id, context)
-                    
-                    # Update context
-                    if step_result.success:
-                        self._update_context(context, step, step_result)
-                
-                step_results.append(step_result)
-                
-                # Save step execution log
-                self.task_manager.save_execution_log(
-                    task.id, 
-                    step.id, 
-                    {
-                        "step_description": step.description,
-                        "step_type": step.step_type.value,
-                        "success": step_result.success,
-                        "code": step_result.code,
-                        "output": step_result.output,
-                        "error": step_result.error,
-                        "attempt": step_result.attempt
-                    }
-                )
-                
-                # If step fails, log and continue (or decide whether to stop based on strategy)
-                if not step_result.success:
-                    self.logger.error(f"Step {step.id} failed: {step_result.error}")
-                    # Continue executing remaining steps despite failure
-                    # Execution continues with failed step marked in results
+            results_by_step = self._run_step_graph(plan, task.id, context, step_executor)
+            step_results = [results_by_step[step.id] for step in plan.steps]
             
             # 3. Evaluate overall task success
             successful_steps = sum(1 for r in step_results if r.success)
@@ -188,13 +308,86 @@ class BenchmarkAgent:
                 "failed_steps": 0
             }
     
-    def _check_dependencies(self, step, completed_steps: List[ExecutionResult]) -> bool:
-        """Check if step dependencies are satisfied"""
-        if not step.dependencies:
-            return True
+    def _run_step_graph(self, plan: TaskPlan, task_id: str, context: Dict[str, Any],
+                        step_executor: StepExecutor) -> Dict[str, ExecutionResult]:
+        """Run plan steps as a DAG: each step starts as soon as all of its dependencies have succeeded"""
+        steps = {step.id: step for step in plan.steps}
+        pending = [step.id for step in plan.steps]
+        results = {}
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=self.config.max_parallel_steps,
+                                thread_name_prefix=f"task-{task_id}-step") as pool:
+            while pending or running:
+                # Launch every ready step (plan order keeps scheduling deterministic)
+                pending_before = len(pending)
+                for step_id in list(pending):
+                    dependencies = steps[step_id].dependencies
+                    if any(dep in results and not results[dep].success for dep in dependencies):
+                        pending.remove(step_id)
+                        results[step_id] = ExecutionResult(
+                            success=False,
+                            step_id=step_id,
+                            error="Dependencies not satisfied"
+                        )
+                        self._record_step_result(task_id, steps[step_id], results[step_id])
+                    elif all(dep in results for dep in dependencies):
+                        pending.remove(step_id)
+                        # Each step works on a snapshot; updates are merged here as steps complete
+                        future = pool.submit(step_executor.execute_step, steps[step_id], task_id,
+                                             self._snapshot_context(context))
+                        running[future] = step_id
+                
+                if not running:
+                    if len(pending) == pending_before:
+                        # validate_plan rules this out; never spin on a plan that bypassed it
+                        raise ValueError(f"Task {task_id}: steps {pending} can never run; "
+                                         f"their dependencies are missing or cyclic")
+                    # Only dependency failures were resolved in this pass; schedule again
+                    continue
+                if len(running) > 1:
+                    self.logger.info(f"Task {task_id}: running steps {sorted(running.values())} in parallel")
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    try:
+                        step_result = future.result()
+                    except Exception as e:
+                        step_result = ExecutionResult(success=False, step_id=step_id, error=str(e))
+                    
+                    # Update context
+                    if step_result.success:
+                        self._update_context(context, steps[step_id], step_result)
+                    
+                    results[step_id] = step_result
+                    self._record_step_result(task_id, steps[step_id], step_result)
+        
+        return results
+    
+    def _snapshot_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy the context so a running step is not affected by concurrent updates"""
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in context.items()}
+    
+    def _record_step_result(self, task_id: str, step, step_result: ExecutionResult):
+        """Save step execution log"""
+        self.task_manager.save_execution_log(
+            task_id, 
+            step.id, 
+            {
+                "step_description": step.description,
+                "step_type": step.step_type.value,
+                "success": step_result.success,
+                "code": step_result.code,
+                "output": step_result.output,
+                "error": step_result.error,
+                "attempt": step_result.attempt
+            }
+        )
         
-        completed_step_ids = {r.step_id for r in completed_steps if r.success}
-        return all(dep in completed_step_ids for dep in step.dependencies)
+        # If step fails, log and continue (dependent steps are skipped, independent ones still run)
+        if not step_result.success:
+            self.logger.error(f"Step {step.id} failed: {step_result.error}")
     
     def _update_context(self, context: Dict[str, Any], step, step_result: ExecutionResult):
         """Update execution context"""
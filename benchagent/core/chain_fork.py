@@ -0,0 +1,69 @@
+import time
+import socket
+import shutil
+import logging
+import subprocess
+from typing import Optional
+
+from web3 import Web3
+
+
+class ChainFork:
+    """Chain fork - a throwaway anvil fork of the benchmark chain for running an attempt in isolation"""
+
+    def __init__(self, rpc_url: str, anvil_path: str = "anvil", startup_timeout: float = 30):
+        self.rpc_url = rpc_url
+        self.anvil_path = anvil_path
+        self.startup_timeout = startup_timeout
+        self.logger = logging.getLogger(__name__)
+        self.process = None
+        self.url = None
+
+    @staticmethod
+    def find_anvil(anvil_path: str = "anvil") -> Optional[str]:
+        """Return the anvil executable, or None if it is not installed"""
+        return shutil.which(anvil_path)
+
+    def __enter__(self) -> 'ChainFork':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self) -> None:
+        """Start the fork on a free local port and wait until it answers"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [self.anvil_path, "--fork-url", self.rpc_url, "--port", str(port), "--silent"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.process = process
+
+        web3 = Web3(Web3.HTTPProvider(self.url))
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"anvil fork exited with code {process.returncode}")
+            if web3.is_connected():
+                self.logger.debug(f"Forked {self.rpc_url} at {self.url}")
+                return
+            time.sleep(0.1)
+        self.stop()
+        raise TimeoutError(f"anvil fork did not start within {self.startup_timeout} seconds")
+
+    def stop(self) -> None:
+        """Stop the fork; safe to call from another thread to abort whatever runs on it"""
+        process, self.process = self.process, None
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
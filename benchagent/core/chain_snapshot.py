@@ -0,0 +1,104 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from web3 import Web3
+
+# anvil/hardhat use 31337, ganache 1337
+DEV_CHAIN_IDS = {31337, 1337}
+DEV_CLIENT_NAMES = ("anvil", "hardhat", "ganache", "ethereumtester")
+
+
+@dataclass
+class ChainSnapshot:
+    """A snapshot taken before one attempt"""
+    snapshot_id: Any
+    generation: int
+    commits: int
+    overlapped: bool
+    snapshot_seconds: float
+
+
+class ChainSnapshots:
+    """Chain snapshots - evm_snapshot before each attempt and evm_revert after a failed one on local dev chains.
+
+    Reverting would also undo transactions of attempts running concurrently on the
+    same chain (parallel steps or workers), so a revert only happens when no other
+    attempt was running when the snapshot was taken, and none started or
+    committed since.
+    """
+
+    _instances: Dict[str, 'ChainSnapshots'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, web3: Web3):
+        self.web3 = web3
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._generation = 0
+        self._commits = 0
+
+    @classmethod
+    def for_chain(cls, web3: Web3, rpc_url: str) -> Optional['ChainSnapshots']:
+        """Return the shared snapshot manager for a dev chain, or None for other chains"""
+        with cls._instances_lock:
+            if rpc_url not in cls._instances:
+                cls._instances[rpc_url] = cls(web3) if cls.is_dev_chain(web3) else None
+            return cls._instances[rpc_url]
+
+    @staticmethod
+    def is_dev_chain(web3: Web3) -> bool:
+        """Check whether the node is a local development chain that supports snapshots"""
+        try:
+            if web3.eth.chain_id in DEV_CHAIN_IDS:
+                return True
+            client = web3.client_version.lower()
+            return any(name in client for name in DEV_CLIENT_NAMES)
+        except Exception:
+            return False
+
+    def take(self) -> Optional[ChainSnapshot]:
+        """Snapshot the chain before an attempt"""
+        start = time.perf_counter()
+        with self._lock:
+            self._active += 1
+            self._generation += 1
+            generation = self._generation
+            overlapped = self._active > 1
+            try:
+                snapshot_id = self.web3.provider.make_request("evm_snapshot", [])["result"]
+            except Exception as e:
+                self._active -= 1
+                self.logger.warning(f"evm_snapshot failed, attempt runs without a snapshot: {e}")
+                return None
+            commits = self._commits
+        return ChainSnapshot(snapshot_id, generation, commits, overlapped, time.perf_counter() - start)
+
+    def release(self, snapshot: Optional[ChainSnapshot], revert: bool) -> Dict[str, Any]:
+        """Finish an attempt, reverting its changes if requested; returns timings for the step log"""
+        if snapshot is None:
+            return {"snapshot": False}
+
+        timings = {"snapshot": True, "snapshot_ms": round(snapshot.snapshot_seconds * 1000, 2), "reverted": False}
+        with self._lock:
+            self._active -= 1
+            if not revert:
+                self._commits += 1
+                return timings
+            if (snapshot.overlapped or self._active or self._generation != snapshot.generation
+                    or self._commits != snapshot.commits):
+                timings["revert_skipped"] = "concurrent attempts on the same chain"
+                return timings
+
+            start = time.perf_counter()
+            try:
+                response = self.web3.provider.make_request("evm_revert", [snapshot.snapshot_id])
+                # anvil/hardhat answer true, eth-tester answers null
+                timings["reverted"] = "error" not in response and response.get("result") is not False
+            except Exception as e:
+                self.logger.warning(f"evm_revert failed: {e}")
+            timings["revert_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return timings
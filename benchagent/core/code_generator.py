@@ -1,31 +1,99 @@
+import re
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple
 from pathlib import Path
 from .types import TaskStep, StepType, ExecutionResult
 from .llm_client import LLMClient
+from executors.solidity_sources import FILE_MARKER_PATTERN
+
+# Rough prompt size estimate used for the context budget
+CHARS_PER_TOKEN = 4
+OMITTED_NOTE_TOKENS = 12
+
+CONTRACTS_SECTION = 0
+OUTPUTS_SECTION = 1
+
+
+class _ContextBlock(NamedTuple):
+    """One line of prompt context: a contract header, an ABI entry or a step output"""
+    priority: int   # lower is kept first when the budget is tight
+    section: int    # CONTRACTS_SECTION or OUTPUTS_SECTION
+    group: int      # contract or output index within the section
+    order: int      # 0 for a contract's header line, then its ABI entries
+    text: str
+
+    @property
+    def is_contract_header(self) -> bool:
+        return self.section == CONTRACTS_SECTION and self.order == 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _format_abi_type(param: Dict[str, Any]) -> str:
+    """Render an ABI parameter type, expanding tuples into their components"""
+    abi_type = param.get('type', '')
+    if abi_type.startswith('tuple'):
+        components = ", ".join(_format_abi_param(c) for c in param.get('components', []))
+        return f"({components}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def _format_abi_param(param: Dict[str, Any]) -> str:
+    parts = [_format_abi_type(param)]
+    if param.get('indexed'):
+        parts.append("indexed")
+    if param.get('name'):
+        parts.append(param['name'])
+    return " ".join(parts)
+
+
+def format_abi_signature(item: Dict[str, Any]) -> str:
+    """Render one ABI entry as a Solidity-style signature"""
+    kind = item.get('type', 'function')
+    params = ", ".join(_format_abi_param(p) for p in item.get('inputs', []))
+    if kind in ('fallback', 'receive'):
+        return f"{kind}() {item.get('stateMutability', '')}".rstrip()
+    if kind == 'constructor':
+        return f"constructor({params})"
+    
+    signature = f"{kind} {item.get('name', '')}({params})"
+    if kind == 'function':
+        mutability = item.get('stateMutability')
+        if mutability and mutability != 'nonpayable':
+            signature += f" {mutability}"
+        outputs = item.get('outputs') or []
+        if outputs:
+            signature += f" returns ({', '.join(_format_abi_param(p) for p in outputs)})"
+    elif kind == 'event' and item.get('anonymous'):
+        signature += " anonymous"
+    return signature
 
 
 class CodeGenerator:
     """Code generator - responsible for generating Solidity and Python code"""
     
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, context_token_budget: int = 2000):
         self.llm_client = llm_client
+        self.context_token_budget = context_token_budget  # 0 disables the budget
         self.logger = logging.getLogger(__name__)
         self._available_libraries = self._detect_available_libraries()
     
     def generate_code(self, step: TaskStep, context: Dict[str, Any] = None, 
-                     previous_error: Optional[str] = None) -> str:
-        """Generate code"""
+                     previous_error: Optional[str] = None, **llm_kwargs) -> str:
+        """Generate code; llm_kwargs (e.g. temperature, cancel_token) are passed to the LLM call"""
         if context is None:
             context = {}
             
         if step.step_type == StepType.SOLIDITY:
-            return self._generate_solidity_code(step, context, previous_error)
+            return self._generate_solidity_code(step, context, previous_error, **llm_kwargs)
         else:
-            return self._generate_python_code(step, context, previous_error)
+            return self._generate_python_code(step, context, previous_error, **llm_kwargs)
     
     def _generate_solidity_code(self, step: TaskStep, context: Dict[str, Any], 
-                               previous_error: Optional[str] = None) -> str:
+                               previous_error: Optional[str] = None, **llm_kwargs) -> str:
         """Generate Solidity code"""
         self.logger.info(f"Generating Solidity code for step {step.id}")
         
@@ -49,14 +117,18 @@ IMPORTANT OpenZeppelin v5 Breaking Changes:
 - Use msg.sender as the initial owner: constructor() Ownable(msg.sender) {{}}
 - If using Ownable, ALWAYS include proper constructor with initial owner
 
+If the contracts are split across several files, start each file with a line `// File: Name.sol` and import sibling files as "./Name.sol".
+
 Only return the Solidity code wrapped in ```solidity code blocks. Do not include deployment instructions or explanations unless specifically asked."""
 
+        context_text, context_stats = self._format_context(context, step)
+        
         user_prompt = f"""Generate a Solidity smart contract for the following requirement:
 
 {step.description}
 
 Context information:
-{self._format_context(context)}"""
+{context_text}"""
 
         if previous_error:
             user_prompt += f"""
@@ -69,11 +141,12 @@ Please fix the issues and generate corrected code."""
         response = self.llm_client.chat_completion([
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
-        ], context={
+        ], code_language="solidity", context={
             "step_id": step.id,
             "step_type": "solidity",
-            "step_description": step.description
-        })
+            "step_description": step.description,
+            **context_stats
+        }, **llm_kwargs)
         
         # Extract Solidity code
         code_blocks = self.llm_client.extract_code_blocks(response, "solidity")
@@ -87,6 +160,11 @@ Please fix the issues and generate corrected code."""
             
             raise ValueError("No valid Solidity code found in LLM response")
         
+        # Files of a multi-file answer may come in separate blocks
+        file_blocks = [code for code in code_blocks if FILE_MARKER_PATTERN.search(code)]
+        if len(file_blocks) > 1:
+            return "\n\n".join(file_blocks)
+        
         return code_blocks[0]
     
     def _detect_available_libraries(self) -> Dict[str, str]:
@@ -175,7 +253,7 @@ Please fix the issues and generate corrected code."""
         return "\n".join(library_info)
     
     def _generate_python_code(self, step: TaskStep, context: Dict[str, Any],
-                             previous_error: Optional[str] = None) -> str:
+                             previous_error: Optional[str] = None, **llm_kwargs) -> str:
         """Generate Python code"""
         self.logger.info(f"Generating Python code for step {step.id}")
         
@@ -208,9 +286,11 @@ CRITICAL: NEVER use geth_poa_middleware - it has been REMOVED in newer web3.py v
 
 TRANSACTION BEST PRACTICES:
 - NONCE MANAGEMENT: Get nonce ONCE per step, reuse for retries within same step
+- PENDING NONCE: Other steps may send transactions from the same account at the same time, so use web3.eth.get_transaction_count(address, 'pending')
 - RETRY STRATEGY: For timeout errors, check if transaction is still pending before retry
 - GAS OPTIMIZATION: Use web3.eth.gas_price * 1.1 for faster confirmation
 - TIMEOUT HANDLING: Use timeout of at least 120 seconds for transaction confirmation
+- INDEPENDENT TRANSACTIONS: Send them all first (consecutive nonces), then wait for their receipts, instead of waiting after each one
 - TRANSACTION REPLACEMENT: Increase gas price by 10% when replacing pending transactions
 - ERROR HANDLING: Distinguish between nonce conflicts and actual transaction failures
 
@@ -228,12 +308,14 @@ CRITICAL NONCE RULES:
 
 Only return the Python code wrapped in ```python code blocks. The code should be complete and ready to execute."""
 
+        context_text, context_stats = self._format_context(context, step)
+        
         user_prompt = f"""Generate a Python script for the following blockchain task:
 
 {step.description}
 
 Context information:
-{self._format_context(context)}"""
+{context_text}"""
 
         if previous_error:
             user_prompt += f"""
@@ -246,11 +328,12 @@ Please analyze the error and generate corrected code that addresses these issues
         response = self.llm_client.chat_completion([
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
-        ], context={
+        ], code_language="python", context={
             "step_id": step.id,
             "step_type": "python",
-            "step_description": step.description
-        })
+            "step_description": step.description,
+            **context_stats
+        }, **llm_kwargs)
         
         # Extract Python code
         code_blocks = self.llm_client.extract_code_blocks(response, "python")
@@ -260,8 +343,113 @@ Please analyze the error and generate corrected code that addresses these issues
         
         return code_blocks[0]
     
-    def _format_context(self, context: Dict[str, Any]) -> str:
-        """Format context information"""
+    def _format_context(self, context: Dict[str, Any], step: Optional[TaskStep] = None) -> Tuple[str, Dict[str, int]]:
+        """Format context compactly within the token budget.
+
+        Blocks are ranked by relevance to the step and added until the budget is
+        used up; returns the text and token statistics for the interaction log.
+        """
+        if not context:
+            return "No additional context provided.", {"context_tokens": 0, "context_tokens_saved": 0}
+        
+        description = step.description.lower() if step else ""
+        dependencies = set(step.dependencies) if step else set()
+        
+        def mentioned(name: str) -> bool:
+            return bool(name) and re.search(rf'\b{re.escape(name.lower())}\b', description) is not None
+        
+        # Lower priority is kept first
+        blocks = []
+        contracts = context.get("deployed_contracts") or {}
+        for group, (contract_name, contract_info) in enumerate(contracts.items()):
+            relevant = mentioned(contract_name) or contract_info.get("step_id") in dependencies
+            base = 1 if relevant else 3
+            blocks.append(_ContextBlock(base, CONTRACTS_SECTION, group, 0,
+                                        f"Contract: {contract_name} at {contract_info.get('address', 'N/A')} "
+                                        f"(deployed in step {contract_info.get('step_id', 'N/A')})"))
+            for order, item in enumerate(contract_info.get('abi', []), 1):
+                if item.get('type') == 'constructor':
+                    continue
+                if item.get('type') == 'function':
+                    priority = base if mentioned(item.get('name')) else base + 1
+                else:
+                    priority = base + 2
+                blocks.append(_ContextBlock(priority, CONTRACTS_SECTION, group, order,
+                                            f"  {format_abi_signature(item)}"))
+        
+        outputs = context.get("previous_outputs") or {}
+        for group, (step_id, output) in enumerate(outputs.items()):
+            priority = 2 if step_id in dependencies else 4
+            blocks.append(_ContextBlock(priority, OUTPUTS_SECTION, group, 0,
+                                        f"Step {step_id} output: {str(output)[:200]}..."))
+        
+        # Other context entries are always kept
+        extra = [f"{key}: {value}" for key, value in context.items()
+                 if key not in ["deployed_contracts", "previous_outputs"]]
+        
+        # Blocks are taken in priority order while they fit. A contract's ABI entries are only
+        # considered once its name and address line is in, so a contract is dropped whole, and a
+        # kept contract reserves room for its omission note. Section titles, the final note and
+        # the other entries are charged up front, so the estimate never exceeds the budget
+        sections = {CONTRACTS_SECTION: "=== DEPLOYED CONTRACTS ===", OUTPUTS_SECTION: "=== PREVIOUS STEP OUTPUTS ==="}
+        selected = []
+        kept_contracts = set()
+        omitted = {}
+        omitted_elsewhere = 0
+        used = (sum(estimate_tokens(title) + 2 for title in sections.values()) + 2 * OMITTED_NOTE_TOKENS
+                + estimate_tokens("\n".join(extra)) + 2)
+        budget = self.context_token_budget
+        for block in sorted(blocks, key=lambda b: (b.priority, b.section, b.group, b.order)):
+            in_dropped_contract = (block.section == CONTRACTS_SECTION and not block.is_contract_header
+                                   and block.group not in kept_contracts)
+            cost = estimate_tokens(block.text) + 1
+            if block.is_contract_header:
+                cost += OMITTED_NOTE_TOKENS
+            if in_dropped_contract or (budget and used + cost > budget):
+                if block.section == CONTRACTS_SECTION and block.group in kept_contracts:
+                    omitted[block.group] = omitted.get(block.group, 0) + 1
+                else:
+                    omitted_elsewhere += 1
+                continue
+            selected.append(block)
+            used += cost
+            if block.is_contract_header:
+                kept_contracts.add(block.group)
+        
+        formatted = []
+        last_section = last_group = None
+        for block in sorted(selected, key=lambda b: (b.section, b.group, b.order)):
+            if block.section != last_section:
+                if last_section is not None:
+                    formatted.append("")
+                formatted.append(sections[block.section])
+                last_section, last_group = block.section, None
+            if block.group != last_group and last_group is not None and block.section == CONTRACTS_SECTION:
+                self._append_omitted(formatted, omitted.get(last_group, 0))
+            formatted.append(block.text)
+            last_group = block.group
+        if last_section == CONTRACTS_SECTION:
+            self._append_omitted(formatted, omitted.get(last_group, 0))
+        if omitted_elsewhere:
+            formatted.append(f"({omitted_elsewhere} lower-priority context entries omitted to fit the context budget)")
+        if formatted and extra:
+            formatted.append("")
+        formatted.extend(extra)
+        
+        text = "\n".join(formatted) if formatted else "No additional context provided."
+        tokens = estimate_tokens(text)
+        saved = max(0, estimate_tokens(self._format_full_context(context)) - tokens)
+        if step:
+            self.logger.info(f"Context for step {step.id}: {tokens} tokens ({saved} saved by compact rendering)")
+        return text, {"context_tokens": tokens, "context_tokens_saved": saved}
+    
+    @staticmethod
+    def _append_omitted(formatted: List[str], count: int) -> None:
+        if count:
+            formatted.append(f"  ... {count} more ABI entries omitted")
+    
+    def _format_full_context(self, context: Dict[str, Any]) -> str:
+        """Format context with full ABIs (baseline for reporting compact context savings)"""
         if not context:
             return "No additional context provided."
         
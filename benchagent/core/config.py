@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import json
 
 
@@ -13,17 +13,33 @@ class LLMConfig:
     temperature: float = 0.1
     max_tokens: int = 4000
     timeout: int = 60
+    deadline: Optional[float] = None  # overall limit per call, including client-side retries
+    max_connections: int = 20         # concurrent requests sharing the client's connection pool
+    stream_code: bool = True          # stream code generation and stop at the first closed code block
+    stop_at_fence: bool = True        # also send a closing-fence stop sequence (disable for providers without stop support)
+    stream_usage: bool = True         # ask streamed completions for token usage (stream_options.include_usage)
+    replay_fallthrough: bool = False  # in replay mode, send unmatched requests to the live API instead of failing
 
 
 @dataclass
 class BlockchainConfig:
     """Blockchain configuration"""
-    rpc_url: str
-    private_key: str
-    sender_address: str
+    rpc_url: Optional[str] = None
+    private_key: Optional[str] = None
+    sender_address: Optional[str] = None
     chain_id: int = 1
     gas_limit: int = 8000000
     gas_price_multiplier: float = 1.1
+    # Worker accounts for parallel task execution (explicit keys take precedence over the mnemonic)
+    mnemonic: Optional[str] = None
+    worker_private_keys: Optional[List[str]] = None
+    worker_funding_eth: float = 0.0
+    snapshot_attempts: bool = False   # evm_snapshot/evm_revert around attempts on local dev chains
+    backend: str = "rpc"              # "rpc" for a node at rpc_url, "inprocess" for an embedded eth-tester chain
+    inprocess_port: int = 0           # JSON-RPC port of the in-process chain for generated scripts (0 = any free port)
+    rpc_proxy: bool = False           # route rpc-backend traffic through a local proxy (nonces, caching, batching)
+    receipt_stuck_blocks: int = 50    # fail a deployment not included within this many new blocks (0 = off)
+    receipt_stuck_seconds: int = 180  # fail pending deployments when no block arrives for this long (0 = off)
 
 
 @dataclass
@@ -35,6 +51,23 @@ class BenchmarkConfig:
     timeout: int = 300
     output_dir: str = "outputs"
     solc_version: str = "0.8.20"
+    max_workers: int = 1
+    max_parallel_steps: int = 4
+    cache_dir: str = "cache"
+    plan_cache: bool = True
+    compile_cache: bool = True
+    compiler_workers: int = 4         # solc processes running concurrently
+    compiler_queue_size: int = 64     # compilations waiting for a worker before callers block
+    compile_timeout: int = 120        # seconds per compilation, and the longest a caller waits for queue space
+    python_workers: int = 0           # pre-warmed interpreters for generated scripts (0 = fresh process per run)
+    python_idle_timeout: int = 0      # kill a script after this many seconds without output (0 = off)
+    python_kill_on_traceback: bool = False  # kill a script that prints a traceback but keeps running
+    preflight: bool = False  # reject code with known mistakes before executing it
+    context_token_budget: int = 2000  # approximate prompt tokens for execution context, 0 for no limit
+    speculative_attempts: int = 1     # candidates generated in parallel for a step's first attempt (1 = off)
+    speculative_temperature_step: float = 0.3
+    anvil_path: str = "anvil"         # used to fork the chain so speculative candidates run in isolation
+    replay_run: Optional[str] = None  # serve LLM responses recorded in this run instead of calling the API
     
     @classmethod
     def from_env(cls) -> 'BenchmarkConfig':
@@ -45,18 +78,49 @@ class BenchmarkConfig:
                 api_key=os.getenv("OPENAI_API_KEY"),
                 base_url=os.getenv("LLM_BASE_URL"),
                 temperature=float(os.getenv("LLM_TEMPERATURE", "0.1")),
-                max_tokens=int(os.getenv("LLM_MAX_TOKENS", "4000"))
+                max_tokens=int(os.getenv("LLM_MAX_TOKENS", "4000")),
+                deadline=float(os.getenv("LLM_DEADLINE")) if os.getenv("LLM_DEADLINE") else None,
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+                stream_code=os.getenv("STREAM_CODE", "true").lower() == "true",
+                stop_at_fence=os.getenv("STOP_AT_FENCE", "true").lower() == "true",
+                stream_usage=os.getenv("STREAM_USAGE", "true").lower() == "true",
+                replay_fallthrough=os.getenv("LLM_REPLAY_FALLTHROUGH", "false").lower() == "true"
             ),
             blockchain=BlockchainConfig(
                 rpc_url=os.getenv("RPC_URL"),
+                backend=os.getenv("CHAIN_BACKEND", "rpc"),
+                inprocess_port=int(os.getenv("INPROCESS_RPC_PORT", "0")),
+                rpc_proxy=os.getenv("RPC_PROXY", "false").lower() == "true",
                 private_key=os.getenv("PRIVATE_KEY"),
                 sender_address=os.getenv("SENDER_ADDRESS"),
-                chain_id=int(os.getenv("CHAIN_ID", "1"))
+                chain_id=int(os.getenv("CHAIN_ID", "1")),
+                mnemonic=os.getenv("MNEMONIC"),
+                worker_private_keys=[key.strip() for key in os.getenv("WORKER_PRIVATE_KEYS", "").split(",") if key.strip()] or None,
+                worker_funding_eth=float(os.getenv("WORKER_FUNDING_ETH", "0")),
+                snapshot_attempts=os.getenv("SNAPSHOT_ATTEMPTS", "false").lower() == "true",
+                receipt_stuck_blocks=int(os.getenv("RECEIPT_STUCK_BLOCKS", "50")),
+                receipt_stuck_seconds=int(os.getenv("RECEIPT_STUCK_SECONDS", "180"))
             ),
             max_retries=int(os.getenv("MAX_RETRIES", "3")),
             timeout=int(os.getenv("TIMEOUT", "300")),
             output_dir=os.getenv("OUTPUT_DIR", "outputs"),
-            solc_version=os.getenv("SOLC_VERSION", "0.8.20")
+            solc_version=os.getenv("SOLC_VERSION", "0.8.20"),
+            max_workers=int(os.getenv("MAX_WORKERS", "1")),
+            max_parallel_steps=int(os.getenv("MAX_PARALLEL_STEPS", "4")),
+            cache_dir=os.getenv("CACHE_DIR", "cache"),
+            plan_cache=os.getenv("PLAN_CACHE", "true").lower() == "true",
+            compile_cache=os.getenv("COMPILE_CACHE", "true").lower() == "true",
+            compiler_workers=int(os.getenv("COMPILER_WORKERS", "4")),
+            compiler_queue_size=int(os.getenv("COMPILER_QUEUE_SIZE", "64")),
+            compile_timeout=int(os.getenv("COMPILE_TIMEOUT", "120")),
+            python_workers=int(os.getenv("PYTHON_WORKERS", "0")),
+            python_idle_timeout=int(os.getenv("PYTHON_IDLE_TIMEOUT", "0")),
+            python_kill_on_traceback=os.getenv("PYTHON_KILL_ON_TRACEBACK", "false").lower() == "true",
+            preflight=os.getenv("PREFLIGHT", "false").lower() == "true",
+            context_token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000")),
+            speculative_attempts=int(os.getenv("SPECULATIVE_ATTEMPTS", "1")),
+            speculative_temperature_step=float(os.getenv("SPECULATIVE_TEMPERATURE_STEP", "0.3")),
+            anvil_path=os.getenv("ANVIL_PATH", "anvil")
         )
     
     @classmethod
@@ -71,16 +135,51 @@ class BenchmarkConfig:
             max_retries=config_data.get("max_retries", 3),
             timeout=config_data.get("timeout", 300),
             output_dir=config_data.get("output_dir", "outputs"),
-            solc_version=config_data.get("solc_version", "0.8.20")
+            solc_version=config_data.get("solc_version", "0.8.20"),
+            max_workers=config_data.get("max_workers", 1),
+            max_parallel_steps=config_data.get("max_parallel_steps", 4),
+            cache_dir=config_data.get("cache_dir", "cache"),
+            plan_cache=config_data.get("plan_cache", True),
+            compile_cache=config_data.get("compile_cache", True),
+            compiler_workers=config_data.get("compiler_workers", 4),
+            compiler_queue_size=config_data.get("compiler_queue_size", 64),
+            compile_timeout=config_data.get("compile_timeout", 120),
+            python_workers=config_data.get("python_workers", 0),
+            python_idle_timeout=config_data.get("python_idle_timeout", 0),
+            python_kill_on_traceback=config_data.get("python_kill_on_traceback", False),
+            preflight=config_data.get("preflight", False),
+            context_token_budget=config_data.get("context_token_budget", 2000),
+            speculative_attempts=config_data.get("speculative_attempts", 1),
+            speculative_temperature_step=config_data.get("speculative_temperature_step", 0.3),
+            anvil_path=config_data.get("anvil_path", "anvil")
         )
     
     def validate(self) -> None:
         """Validate configuration"""
-        if not self.llm.api_key:
+        # A pure replay never reaches the API
+        if not self.llm.api_key and not (self.replay_run and not self.llm.replay_fallthrough):
             raise ValueError("LLM API key is required")
-        if not self.blockchain.rpc_url:
-            raise ValueError("RPC URL is required")
-        if not self.blockchain.private_key:
-            raise ValueError("Private key is required")
-        if not self.blockchain.sender_address:
-            raise ValueError("Sender address is required")
\ No newline at end of file
+        if self.blockchain.backend not in ("rpc", "inprocess"):
+            raise ValueError("blockchain backend must be 'rpc' or 'inprocess'")
+        # The in-process chain provides its own endpoint and a funded default account
+        if self.blockchain.backend == "rpc":
+            if not self.blockchain.rpc_url:
+                raise ValueError("RPC URL is required")
+            if not self.blockchain.private_key:
+                raise ValueError("Private key is required")
+            if not self.blockchain.sender_address:
+                raise ValueError("Sender address is required")
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if self.max_parallel_steps < 1:
+            raise ValueError("max_parallel_steps must be at least 1")
+        if self.context_token_budget < 0:
+            raise ValueError("context_token_budget must not be negative")
+        if self.speculative_attempts < 1:
+            raise ValueError("speculative_attempts must be at least 1")
+        if self.compiler_workers < 1:
+            raise ValueError("compiler_workers must be at least 1")
+        if self.python_workers < 0:
+            raise ValueError("python_workers must not be negative")
+        if self.blockchain.receipt_stuck_blocks < 0 or self.blockchain.receipt_stuck_seconds < 0:
+            raise ValueError("receipt_stuck_blocks and receipt_stuck_seconds must not be negative")
\ No newline at end of file
@@ -14,8 +14,10 @@ import solcx
 class EnvironmentChecker:
     """Environment checker, ensures all necessary components are correctly configured"""
     
-    def __init__(self):
+    def __init__(self, inprocess_chain: bool = False):
         self.logger = logging.getLogger(__name__)
+        # With the in-process chain there is no node to reach and no account to configure
+        self.inprocess_chain = inprocess_chain
         
         # Define required environment variables
         self.required_env_vars = [
@@ -24,6 +26,8 @@ class EnvironmentChecker:
             "SENDER_ADDRESS",
             "OPENAI_API_KEY"
         ]
+        if inprocess_chain:
+            self.required_env_vars = ["OPENAI_API_KEY"]
         
         # Define required Python packages (pip package name -> import name)
         self.required_packages = {
@@ -32,6 +36,9 @@ class EnvironmentChecker:
             'openai': 'openai',
             'py-solc-x': 'solcx'
         }
+        if inprocess_chain:
+            self.required_packages['eth-tester'] = 'eth_tester'
+            self.required_packages['py-evm'] = 'eth'
         
         # Define recommended Solidity version
         self.solc_version = '0.8.20'
@@ -124,6 +131,10 @@ class EnvironmentChecker:
     
     def _check_network_connection(self) -> List[str]:
         """Check blockchain network connection"""
+        if self.inprocess_chain:
+            self.logger.info("Using the in-process chain, skipping network connection check")
+            return []
+        
         self.logger.info("Testing blockchain network connection...")
         issues = []
         
@@ -159,14 +170,12 @@ class EnvironmentChecker:
                 self.logger.info(f"Installing Solidity compiler version {self.solc_version}...")
                 solcx.install_solc(self.solc_version)
             
-            # Set version
-            solcx.set_solc_version(self.solc_version)
-            current_version = solcx.get_solc_version()
-            
-            if str(current_version) != self.solc_version:
-                issues.append(f"Solidity compiler version mismatch: expected {self.solc_version}, got {current_version}")
-            else:
-                self.logger.info(f"✓ Solidity compiler {current_version} is ready")
+            # Compilations pin their version per request, so only check that it is installed
+            try:
+                solcx.get_executable(self.solc_version)
+                self.logger.info(f"✓ Solidity compiler {self.solc_version} is ready")
+            except Exception:
+                issues.append(f"Solidity compiler {self.solc_version} is not installed")
             
             # Validate compiler functionality
             test_contract = """
@@ -177,7 +186,7 @@ class EnvironmentChecker:
             """
             
             try:
-                solcx.compile_source(test_contract)
+                solcx.compile_source(test_contract, solc_version=self.solc_version)
                 self.logger.debug("✓ Solidity compiler test compilation successful")
             except Exception as e:
                 issues.append(f"Solidity compiler test failed: {e}")
@@ -271,7 +280,8 @@ class EnvironmentChecker:
         # Solidity information
         try:
             summary["solidity_info"]["installed_versions"] = [str(v) for v in solcx.get_installed_solc_versions()]
-            summary["solidity_info"]["current_version"] = str(solcx.get_solc_version()) if solcx.get_installed_solc_versions() else None
+            installed = [str(v) for v in solcx.get_installed_solc_versions()]
+            summary["solidity_info"]["current_version"] = self.solc_version if self.solc_version in installed else None
         except Exception:
             summary["solidity_info"]["error"] = "Failed to get Solidity info"
         
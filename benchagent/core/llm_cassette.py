@@ -0,0 +1,98 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional
+
+# Addresses and transaction hashes differ between chains, so they are masked for the loose match
+HEX_VALUE_PATTERN = re.compile(r'0x[0-9a-fA-F]{40,}')
+
+
+class LLMReplayMissError(Exception):
+    """Raised in replay mode when a request has no recorded response"""
+
+
+class LLMCassette:
+    """LLM cassette - serves recorded responses from a previous run's llm_interactions"""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = Path(run_dir)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        self._stats = {"recorded": 0, "served": 0, "served_loose": 0, "unmatched": 0}
+        self._load()
+
+    @classmethod
+    def from_run_id(cls, run_id: str, output_dir: str = "outputs") -> 'LLMCassette':
+        """Locate a recorded run by id (e.g. run_20250101_120000) or by path"""
+        for candidate in (Path(run_id), Path(output_dir) / run_id):
+            if (candidate / "llm_interactions").is_dir():
+                return cls(str(candidate))
+        raise FileNotFoundError(f"No llm_interactions found for run {run_id}")
+
+    @staticmethod
+    def request_key(messages: List[Dict[str, str]], loose: bool = False) -> str:
+        """Hash the request messages; loose keys ignore addresses and hashes"""
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        if loose:
+            payload = HEX_VALUE_PATTERN.sub("0x_", payload)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        """Index successful interactions in recording order"""
+        # Filenames start with the timestamp and end with a sequence number, so they sort in order
+        for interaction_file in sorted((self.run_dir / "llm_interactions").glob("interaction_*.json")):
+            try:
+                with open(interaction_file, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except Exception as e:
+                self.logger.warning(f"Skipping unreadable interaction {interaction_file}: {e}")
+                continue
+
+            if not record.get("success") or record["response"].get("content") is None:
+                continue
+            messages = record["request"]["messages"]
+            entry = {"file": interaction_file.name, "record": record}
+            self._exact[self.request_key(messages)].append(entry)
+            self._loose[self.request_key(messages, loose=True)].append(entry)
+            self._stats["recorded"] += 1
+
+        self.logger.info(f"Loaded {self._stats['recorded']} recorded LLM responses from {self.run_dir}")
+
+    def match(self, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Pop the next recorded interaction for these messages, or None.
+
+        Identical requests (e.g. retries) are answered in the order they were recorded.
+        """
+        with self._lock:
+            entry = self._pop(self._exact[self.request_key(messages)])
+            if entry:
+                self._stats["served"] += 1
+            else:
+                entry = self._pop(self._loose[self.request_key(messages, loose=True)])
+                if entry:
+                    self._stats["served_loose"] += 1
+                else:
+                    self._stats["unmatched"] += 1
+                    return None
+            entry["used"] = True
+            return entry
+
+    @staticmethod
+    def _pop(entries: deque) -> Optional[Dict[str, Any]]:
+        # An entry sits in both indexes, so skip those already served through the other one
+        while entries:
+            entry = entries.popleft()
+            if not entry.get("used"):
+                return entry
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return replay statistics for the run summary"""
+        with self._lock:
+            return {"run_dir": str(self.run_dir), **self._stats}
@@ -1,44 +1,223 @@
+import re
 import openai
+import asyncio
 import logging
+import threading
+import concurrent.futures
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from .config import LLMConfig
+from .llm_cassette import LLMCassette, LLMReplayMissError
+
+
+class LLMCancelledError(Exception):
+    """Raised when an LLM call is cancelled through its CancellationToken"""
+
+
+class CancellationToken:
+    """Cooperative cancellation shared by sibling LLM calls (e.g. competing attempts)"""
+    
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self) -> None:
+        """Cancel every call that uses this token"""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+    
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback run on cancellation; returns a function that unregisters it"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+    
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+class CodeFenceParser:
+    """Incremental parser that detects when the first fenced block of a language is closed"""
+    
+    STOP_SEQUENCE = "\n```\n"
+    
+    def __init__(self, language: str):
+        self.open_pattern = re.compile(rf'```{re.escape(language)}[ \t]*\n')
+        self.close_pattern = re.compile(r'\n```[ \t]*(?:\n|$)')
+        self.buffer = ""
+        self.code_start = None
+        self.end = None
+        self._scan_from = 0
+    
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+    
+    def feed(self, text: str) -> bool:
+        """Add streamed text; return True once the first target block is complete"""
+        if self.complete:
+            return True
+        self.buffer += text
+        if self.code_start is None:
+            match = self.open_pattern.search(self.buffer, self._scan_from)
+            if not match:
+                # A fence can straddle chunks, so rescan a short tail next time
+                self._scan_from = max(0, len(self.buffer) - 32)
+                return False
+            self.code_start = match.end()
+            self._scan_from = self.code_start - 1
+        
+        # Only accept a closing fence once its line is terminated
+        match = self.close_pattern.search(self.buffer, self._scan_from)
+        if match and match.group().endswith("\n"):
+            self.end = match.end()
+            return True
+        self._scan_from = max(self.code_start - 1, len(self.buffer) - 8)
+        return False
+    
+    def finish(self, stopped: bool = False) -> str:
+        """Return the text up to and including the first closing fence.
+
+        ``stopped`` means generation ended on the stop sequence, which the API
+        strips from the output, so an open block is closed here.
+        """
+        if not self.complete and self.code_start is not None:
+            match = self.close_pattern.search(self.buffer, self.code_start - 1)
+            if match:
+                self.end = match.end()
+            elif stopped:
+                self.buffer += "\n```\n"
+                self.end = len(self.buffer)
+        return self.buffer[:self.end] if self.complete else self.buffer
 
 
 class LLMClient:
     """LLM client - wrapper for large language model calls"""
     
-    def __init__(self, config: LLMConfig, task_manager=None):
+    def __init__(self, config: LLMConfig, task_manager=None, cassette: Optional[LLMCassette] = None):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.task_manager = task_manager
+        self.cassette = cassette
         
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(
-            api_key=config.api_key,
-            base_url=config.base_url
-        )
+        # All requests run on one background event loop through one async client, so
+        # concurrent tasks/steps share its connection pool instead of a thread per call
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True)
+        self._loop_thread.start()
+        self._request_slots = asyncio.Semaphore(config.max_connections)
+        # Turned off for the rest of the run once the provider rejects stream_options
+        self._stream_usage = config.stream_usage
+        # History files are written off the loop thread, one at a time, so slow disks never stall requests
+        self._history_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-history")
+        
+        # Initialize OpenAI client (not needed when every response comes from a cassette)
+        self.client = None
+        if cassette is None or config.replay_fallthrough:
+            self.client = openai.AsyncOpenAI(
+                api_key=config.api_key,
+                base_url=config.base_url
+            )
     
-    def chat_completion(self, messages: list, **kwargs) -> str:
-        """Send chat completion request"""
+    def chat_completion(self, messages: list, cancel_token: Optional[CancellationToken] = None, **kwargs) -> str:
+        """Send chat completion request (blocking wrapper around the async client)"""
+        return self.submit(messages, cancel_token=cancel_token, **kwargs).result()
+    
+    def submit(self, messages: list, cancel_token: Optional[CancellationToken] = None,
+               **kwargs) -> concurrent.futures.Future:
+        """Start a chat completion on the client loop and return a future for its content"""
+        return asyncio.run_coroutine_threadsafe(self._request(messages, cancel_token, **kwargs), self._loop)
+    
+    async def achat_completion(self, messages: list, cancel_token: Optional[CancellationToken] = None,
+                               **kwargs) -> str:
+        """Send chat completion request from async code"""
+        if asyncio.get_running_loop() is self._loop:
+            return await self._request(messages, cancel_token, **kwargs)
+        # The pooled connections belong to the client loop; hop over to it
+        return await asyncio.wrap_future(self.submit(messages, cancel_token=cancel_token, **kwargs))
+    
+    def close(self) -> None:
+        """Close pooled connections and stop the client loop"""
+        if self._loop.is_closed():
+            return
+        if self.client is not None:
+            asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+        # Finalise streams that were abandoned at an early closing fence
+        asyncio.run_coroutine_threadsafe(self._loop.shutdown_asyncgens(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self._history_writer.shutdown(wait=True)
+    
+    async def _request(self, messages: list, cancel_token: Optional[CancellationToken] = None, **kwargs) -> str:
+        """Run one chat completion with a deadline and cooperative cancellation"""
+        current_task = asyncio.current_task()
+        remove_callback = lambda: None
+        if cancel_token is not None:
+            if cancel_token.cancelled:
+                raise LLMCancelledError("LLM call cancelled before it started")
+            remove_callback = cancel_token.add_callback(
+                lambda: self._loop.call_soon_threadsafe(current_task.cancel)
+            )
+        
+        deadline = kwargs.get('deadline', self.config.deadline)
         try:
+            if self.cassette is not None:
+                recorded = self.cassette.match(messages)
+                if recorded is not None:
+                    return self._replay(messages, recorded, **kwargs)
+                if not self.config.replay_fallthrough:
+                    raise LLMReplayMissError("No recorded response matches this request")
+                self.logger.info("No recorded response matches this request, calling the live API")
+            
             # Record request start time
             request_start = datetime.now()
             
-            response = self.client.chat.completions.create(
-                model=self.config.model,
-                messages=messages,
-                temperature=kwargs.get('temperature', self.config.temperature),
-                max_tokens=kwargs.get('max_tokens', self.config.max_tokens),
-                timeout=kwargs.get('timeout', self.config.timeout)
-            )
+            code_language = kwargs.get('code_language') if self.config.stream_code else None
+            async with self._request_slots:
+                if code_language:
+                    content, usage_info = await asyncio.wait_for(
+                        self._stream_code_block(messages, code_language, **kwargs),
+                        timeout=deadline
+                    )
+                else:
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.config.model,
+                            messages=messages,
+                            temperature=kwargs.get('temperature', self.config.temperature),
+                            max_tokens=kwargs.get('max_tokens', self.config.max_tokens),
+                            timeout=kwargs.get('timeout', self.config.timeout)
+                        ),
+                        timeout=deadline
+                    )
+                    content = response.choices[0].message.content
+                    usage_info = {
+                        "completion_tokens": response.usage.completion_tokens,
+                        "prompt_tokens": response.usage.prompt_tokens, 
+                        "total_tokens": response.usage.total_tokens
+                    } if response.usage else None
             
             # Record response time
             request_end = datetime.now()
             response_time = (request_end - request_start).total_seconds()
             
-            content = response.choices[0].message.content
             self.logger.debug(f"LLM response: {content[:200]}...")
             
             # Save interaction history
@@ -51,16 +230,31 @@ class LLMClient:
                     'temperature': kwargs.get('temperature', self.config.temperature),
                     'max_tokens': kwargs.get('max_tokens', self.config.max_tokens)
                 },
-                usage_info={
-                    "completion_tokens": response.usage.completion_tokens,
-                    "prompt_tokens": response.usage.prompt_tokens, 
-                    "total_tokens": response.usage.total_tokens
-                } if response.usage else None,
+                usage_info=usage_info,
                 context=kwargs.get('context', {})
             )
             
             return content
             
+        except asyncio.CancelledError:
+            if cancel_token is None or not cancel_token.cancelled:
+                raise
+            self.logger.info("LLM request cancelled")
+            self._save_interaction_history(
+                messages=messages,
+                error="cancelled",
+                context=kwargs.get('context', {})
+            )
+            raise LLMCancelledError("LLM call cancelled")
+        except asyncio.TimeoutError:
+            error = f"LLM request exceeded deadline of {deadline} seconds"
+            self.logger.error(error)
+            self._save_interaction_history(
+                messages=messages,
+                error=error,
+                context=kwargs.get('context', {})
+            )
+            raise TimeoutError(error)
         except Exception as e:
             self.logger.error(f"LLM request failed: {e}")
             # Save failed interaction record
@@ -70,6 +264,91 @@ class LLMClient:
                 context=kwargs.get('context', {})
             )
             raise
+        finally:
+            remove_callback()
+    
+    def _replay(self, messages: list, recorded: Dict[str, Any], **kwargs) -> str:
+        """Serve a recorded response and log it like a live one"""
+        record = recorded["record"]
+        content = record["response"]["content"]
+        context = dict(kwargs.get('context', {}))
+        context["replayed_from"] = recorded["file"]
+        self._save_interaction_history(
+            messages=messages,
+            response_content=content,
+            response_time=0.0,
+            model_config=record["request"].get("model_config"),
+            usage_info=record["response"].get("usage"),
+            context=context
+        )
+        return content
+    
+    async def _stream_code_block(self, messages: list, language: str, **kwargs):
+        """Stream a completion and stop as soon as the first ```language block is closed"""
+        # The stop sequence ends generation server-side at the first closing fence; if no
+        # ```language block came out before it, retry once without it
+        for use_stop in ([True, False] if self.config.stop_at_fence else [False]):
+            parser = CodeFenceParser(language)
+            request = {
+                "model": self.config.model,
+                "messages": messages,
+                "temperature": kwargs.get('temperature', self.config.temperature),
+                "max_tokens": kwargs.get('max_tokens', self.config.max_tokens),
+                "timeout": kwargs.get('timeout', self.config.timeout),
+                "stream": True
+            }
+            if self._stream_usage:
+                # Token counts arrive in a final chunk with no choices
+                request["stream_options"] = {"include_usage": True}
+            if use_stop:
+                request["stop"] = [CodeFenceParser.STOP_SEQUENCE]
+            
+            finish_reason = None
+            usage = None
+            stream = await self._open_stream(request)
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content and parser.feed(choice.delta.content) and not use_stop:
+                        # Closing the stream stops paying for prose after the block; with the
+                        # stop sequence generation ends there anyway, so read on for the usage
+                        break
+            finally:
+                await stream.close()
+            
+            content = parser.finish(stopped=use_stop and finish_reason == "stop")
+            if use_stop and not parser.complete:
+                # The stop sequence also matches an unlabelled opening fence or the end of some
+                # other block, so the reply may have been cut before any code
+                self.logger.info(f"No ```{language} block before the stop sequence, retrying without it")
+                continue
+            usage_info = {
+                "streamed": True,
+                "stopped_at_fence": parser.complete,
+                "completion_chars": len(content),
+                # None when the stream was closed before the usage chunk arrived
+                "completion_tokens": usage.completion_tokens if usage else None,
+                "prompt_tokens": usage.prompt_tokens if usage else None,
+                "total_tokens": usage.total_tokens if usage else None
+            }
+            return content, usage_info
+    
+    async def _open_stream(self, request: Dict[str, Any]):
+        """Start a streamed completion, retrying once without stream_options if the provider rejects it"""
+        try:
+            return await self.client.chat.completions.create(**request)
+        except (openai.BadRequestError, openai.UnprocessableEntityError) as e:
+            if "stream_options" not in request:
+                raise
+            self.logger.warning(f"Provider rejected stream_options, streaming without token usage: {e}")
+            self._stream_usage = False
+            request = {key: value for key, value in request.items() if key != "stream_options"}
+            return await self.client.chat.completions.create(**request)
     
     def extract_code_blocks(self, text: str, language: str = None) -> list:
         """Extract code blocks from text"""
@@ -137,17 +416,20 @@ class LLMClient:
         
         return results
     
-    def _save_interaction_history(self, messages: List[Dict[str, str]], 
-                                 response_content: str = None, 
-                                 response_time: float = None,
-                                 model_config: Dict[str, Any] = None,
-                                 usage_info: Dict[str, Any] = None,
-                                 context: Dict[str, Any] = None,
-                                 error: str = None):
-        """Save LLM interaction history"""
+    def _save_interaction_history(self, **kwargs):
+        """Queue an LLM interaction record for the history writer thread"""
         if not self.task_manager:
             return
-            
+        self._history_writer.submit(self._write_interaction_history, **kwargs)
+    
+    def _write_interaction_history(self, messages: List[Dict[str, str]], 
+                                   response_content: str = None, 
+                                   response_time: float = None,
+                                   model_config: Dict[str, Any] = None,
+                                   usage_info: Dict[str, Any] = None,
+                                   context: Dict[str, Any] = None,
+                                   error: str = None):
+        """Save LLM interaction history"""
         try:
             # Build interaction record
             interaction_record = {
@@ -0,0 +1,115 @@
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+
+from .types import TaskStep, StepType
+
+# Bump when the cached plan format changes
+PLAN_CACHE_VERSION = 1
+
+
+class PlanCache:
+    """Plan cache - persists task plans keyed by everything that determines the planning request"""
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.cache_dir = Path(cache_dir) / "plans"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalid": 0, "writes": 0, "bypassed": 0}
+
+    @staticmethod
+    def make_key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+        """Hash the planning request inputs into a cache key"""
+        payload = json.dumps({
+            "version": PLAN_CACHE_VERSION,
+            "model": model,
+            "temperature": temperature,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, validate: Optional[Callable[[List[TaskStep]], None]] = None) -> Optional[List[TaskStep]]:
+        """Return the cached steps for a key, or None on a miss.
+
+        ``validate`` is called with the loaded steps and should raise if they
+        are no longer acceptable; such entries are discarded.
+        """
+        cache_file = self.cache_dir / f"{key}.json"
+        if not cache_file.exists():
+            self._count("misses")
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            steps = [
+                TaskStep(
+                    id=step["id"],
+                    description=step["description"],
+                    step_type=StepType(step["step_type"]),
+                    dependencies=list(step.get("dependencies", []))
+                ) for step in data["steps"]
+            ]
+            if validate:
+                validate(steps)
+        except Exception as e:
+            self.logger.warning(f"Discarding invalid cached plan {cache_file}: {e}")
+            self.invalidate(key)
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return steps
+
+    def put(self, key: str, steps: List[TaskStep], metadata: Dict[str, Any] = None) -> None:
+        """Store the steps of a freshly planned task"""
+        cache_file = self.cache_dir / f"{key}.json"
+        data = {
+            "version": PLAN_CACHE_VERSION,
+            "created": datetime.now().isoformat(),
+            "metadata": metadata or {},
+            "steps": [
+                {
+                    "id": step.id,
+                    "description": step.description,
+                    "step_type": step.step_type.value,
+                    "dependencies": step.dependencies
+                } for step in steps
+            ]
+        }
+        try:
+            # Write then rename so parallel workers never read a partial file
+            tmp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            tmp_file.replace(cache_file)
+            self._count("writes")
+        except Exception as e:
+            self.logger.warning(f"Failed to write plan cache {cache_file}: {e}")
+
+    def invalidate(self, key: str) -> None:
+        """Drop a cached plan that failed to load or validate"""
+        self._count("invalid")
+        (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def record_bypass(self) -> None:
+        """Count a lookup skipped because replanning was requested"""
+        self._count("bypassed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics for the run summary"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups * 100) if lookups else 0
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
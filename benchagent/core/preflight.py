@@ -0,0 +1,179 @@
+import re
+import ast
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from .types import StepType
+from executors.compiler_service import CompilerService, CompilerError
+from executors.solidity_sources import LibraryIndex, split_sources
+
+# web3.py v5 names that no longer exist, with their replacements
+RENAMED_ATTRIBUTES = {
+    "rawTransaction": "raw_transaction",
+    "isConnected": "is_connected",
+    "toWei": "to_wei",
+    "fromWei": "from_wei",
+    "toChecksumAddress": "to_checksum_address",
+    "getTransactionCount": "get_transaction_count",
+    "getBalance": "get_balance",
+    "sendRawTransaction": "send_raw_transaction",
+    "waitForTransactionReceipt": "wait_for_transaction_receipt",
+    "buildTransaction": "build_transaction",
+    "signTransaction": "sign_transaction",
+}
+# Renamed attributes are only web3.py's when read from these names or from `.eth`
+WEB3_RECEIVERS = ("w3", "web3", "Web3", "Account")
+# Contract functions keep their Solidity names (getBalance, isConnected, ...)
+CONTRACT_FUNCTION_ATTRIBUTES = ("functions", "caller")
+REMOVED_NAMES = {
+    "geth_poa_middleware": "it was removed from web3.py; do not use it",
+}
+SIGNING_ATTRIBUTES = ("sign_transaction", "send_raw_transaction", "send_transaction")
+# Calls that connect to a node; scripts without them (e.g. report post-processing) need no RPC_URL
+PROVIDER_CALLS = ("Web3", "HTTPProvider", "AsyncWeb3", "AsyncHTTPProvider", "WebsocketProvider")
+EXIT_FUNCTIONS = ("exit", "_exit", "quit")
+BROAD_EXCEPTIONS = ("Exception", "BaseException")
+
+OWNABLE_SOURCE = "@openzeppelin/contracts/access/Ownable.sol"
+OWNABLE_INHERITANCE = re.compile(r'\bis\b[^{;]*\bOwnable(?:2Step)?\b')
+OWNABLE_CONSTRUCTOR_CALL = re.compile(r'\bOwnable\s*\(')
+
+
+class PreflightChecker:
+    """Pre-flight checker - rejects generated code with known mistakes before it is executed.
+
+    Python scripts get AST checks (syntax, removed web3.py APIs, configuration
+    read from the environment, non-zero exit on failure); Solidity sources get
+    a parse-only solc run. Rejected code goes straight back to the LLM.
+    """
+
+    def __init__(self, compiler: Optional[CompilerService] = None, solc_version: str = "0.8.20"):
+        self.compiler = compiler
+        self.solc_version = solc_version
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "rejected": 0, "rules": {}}
+
+    def check(self, step_type: StepType, code: str) -> List[str]:
+        """Return the violations found in the code (empty if it may run)"""
+        if step_type == StepType.SOLIDITY:
+            violations = self.check_solidity(code)
+        else:
+            violations = self.check_python(code)
+        with self._lock:
+            self._stats["checked"] += 1
+            if violations:
+                self._stats["rejected"] += 1
+            for violation in violations:
+                rule = violation.split(":", 1)[0]
+                self._stats["rules"][rule] = self._stats["rules"].get(rule, 0) + 1
+        return violations
+
+    def check_python(self, code: str) -> List[str]:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return [f"Syntax error: {e.msg} (line {e.lineno})"]
+
+        violations = []
+        attributes = set()
+        strings = set()
+        calls = set()
+        has_failure_exit = False
+        broad_handlers = 0
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute):
+                attributes.add(node.attr)
+                if node.attr in RENAMED_ATTRIBUTES and self._is_web3_receiver(node.value):
+                    violations.append(f"Removed web3.py API: `.{node.attr}` (line {node.lineno}) "
+                                      f"is `.{RENAMED_ATTRIBUTES[node.attr]}` in web3.py v6+")
+            elif isinstance(node, ast.Name) and node.id in REMOVED_NAMES:
+                violations.append(f"Removed web3.py API: `{node.id}` (line {node.lineno}): {REMOVED_NAMES[node.id]}")
+            elif isinstance(node, ast.alias) and node.name.split(".")[-1] in REMOVED_NAMES:
+                name = node.name.split(".")[-1]
+                violations.append(f"Removed web3.py API: import of `{name}`: {REMOVED_NAMES[name]}")
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                strings.add(node.value)
+            elif isinstance(node, ast.Raise):
+                has_failure_exit = True
+            elif isinstance(node, ast.Call):
+                calls.add(self._call_name(node))
+                if self._is_failure_exit(node):
+                    has_failure_exit = True
+            elif isinstance(node, ast.ExceptHandler):
+                if node.type is None or (isinstance(node.type, ast.Name) and node.type.id in BROAD_EXCEPTIONS):
+                    broad_handlers += 1
+
+        if any(name in calls for name in PROVIDER_CALLS) and "RPC_URL" not in strings:
+            violations.append("Missing environment read: the node URL must come from the RPC_URL environment variable")
+        if any(name in attributes for name in SIGNING_ATTRIBUTES) and "PRIVATE_KEY" not in strings:
+            violations.append("Missing environment read: the signing key must come from the PRIVATE_KEY environment variable")
+        if broad_handlers and not has_failure_exit:
+            violations.append("Missing failure exit: errors are caught but the script never calls sys.exit(1) "
+                              "or re-raises, so a failed run would look successful")
+        return violations
+
+    @staticmethod
+    def _is_web3_receiver(node: ast.AST) -> bool:
+        """w3, web3, Web3, Account or anything under `.eth`, but not a contract's `.functions`/`.caller`"""
+        attributes = set()
+        while True:
+            if isinstance(node, ast.Attribute):
+                attributes.add(node.attr)
+                node = node.value
+            elif isinstance(node, ast.Call):
+                node = node.func
+            elif isinstance(node, ast.Subscript):
+                node = node.value
+            else:
+                break
+        if attributes.intersection(CONTRACT_FUNCTION_ATTRIBUTES):
+            return False
+        return "eth" in attributes or (isinstance(node, ast.Name) and node.id in WEB3_RECEIVERS)
+
+    @staticmethod
+    def _call_name(node: ast.Call) -> Optional[str]:
+        """The called name: `Web3` for Web3(...), `exit` for sys.exit(...)"""
+        function = node.func
+        return function.attr if isinstance(function, ast.Attribute) else getattr(function, "id", None)
+
+    @classmethod
+    def _is_failure_exit(cls, node: ast.Call) -> bool:
+        """sys.exit(1), exit("message") and the like; sys.exit(0) and sys.exit() are not failures"""
+        if cls._call_name(node) not in EXIT_FUNCTIONS:
+            return False
+        if not node.args:
+            return False
+        argument = node.args[0]
+        return not (isinstance(argument, ast.Constant) and argument.value in (0, None, False))
+
+    def check_solidity(self, code: str) -> List[str]:
+        violations = []
+        index = LibraryIndex.shared()
+
+        ownable = index.files.get(OWNABLE_SOURCE)
+        if (ownable and "initialOwner" in ownable.content and OWNABLE_INHERITANCE.search(code)
+                and not OWNABLE_CONSTRUCTOR_CALL.search(code)):
+            violations.append("Ownable constructor: OpenZeppelin v5 Ownable needs an initial owner, "
+                              "e.g. constructor() Ownable(msg.sender) {}")
+
+        if self.compiler is None:
+            return violations
+        standard_input, _ = index.standard_input(split_sources(code), {"*": {"": ["ast"]}})
+        standard_input["settings"]["stopAfter"] = "parsing"
+        try:
+            self.compiler.compile(standard_input, self.solc_version)
+        except CompilerError as e:
+            violations.append(f"Solidity parse error: {e}")
+        except Exception as e:
+            # A compiler problem is not the code's fault; let the real compilation report it
+            self.logger.debug(f"Parse-only check skipped: {e}")
+        return violations
+
+    def stats(self) -> Dict[str, Any]:
+        """Return check counts for the run summary; every rejection is an execution avoided"""
+        with self._lock:
+            stats = {**self._stats, "rules": dict(self._stats["rules"])}
+        stats["executions_avoided"] = stats["rejected"]
+        return stats
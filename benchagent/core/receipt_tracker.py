@@ -0,0 +1,231 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+POLL_INTERVAL = 0.2     # seconds between block checks
+STUCK_BLOCKS = 50       # blocks mined without the transaction before it counts as stuck (0 = never)
+STUCK_SECONDS = 180     # seconds without any new block before pending transactions count as stuck (0 = never)
+
+
+class TransactionStuckError(Exception):
+    """A transaction is not being mined; ``transaction`` is the node's view of it (None if dropped)"""
+
+    def __init__(self, tx_hash: HexBytes, reason: str, transaction: Optional[Dict[str, Any]] = None):
+        super().__init__(f"Transaction {tx_hash.hex()} is stuck: {reason}")
+        self.tx_hash = tx_hash
+        self.reason = reason
+        self.transaction = transaction
+
+
+@dataclass
+class _PendingTransaction:
+    future: Future
+    first_block: Optional[int] = None
+    checked: bool = False
+    since: float = field(default_factory=time.time)
+
+
+class ReceiptTracker:
+    """Receipt tracker - follows new blocks and resolves every pending transaction from them.
+
+    One tracker serves all waiters on a chain. Each new block is fetched once
+    and the receipts of the tracked transactions it contains are requested in
+    a single batch. Transactions that stop making progress fail early with
+    TransactionStuckError instead of waiting out the caller's full timeout.
+    Public chains can leave a valid transaction out of many blocks, so the
+    thresholds are conservative and configurable.
+    """
+
+    _instances: Dict[str, 'ReceiptTracker'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, poll_interval: float = POLL_INTERVAL,
+                 stuck_blocks: int = STUCK_BLOCKS, stuck_seconds: float = STUCK_SECONDS):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.stuck_blocks = stuck_blocks
+        self.stuck_seconds = stuck_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending: Dict[HexBytes, _PendingTransaction] = {}
+        self._wakeup = threading.Event()
+        self._block_filter = None
+        self._last_block = None
+        self._last_block_time = time.time()
+        self._stats = {"tracked": 0, "mined": 0, "stuck": 0, "blocks": 0, "receipt_batches": 0}
+        self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_chain(cls, web3: Web3, rpc_url: str, stuck_blocks: int = STUCK_BLOCKS,
+                  stuck_seconds: float = STUCK_SECONDS) -> 'ReceiptTracker':
+        """Return the shared tracker for a chain; the thresholds apply when it is first created"""
+        with cls._instances_lock:
+            if rpc_url not in cls._instances:
+                cls._instances[rpc_url] = cls(web3, stuck_blocks=stuck_blocks, stuck_seconds=stuck_seconds)
+            return cls._instances[rpc_url]
+
+    @classmethod
+    def existing(cls, rpc_url: str) -> Optional['ReceiptTracker']:
+        """Return the chain's tracker if anything has waited on it"""
+        with cls._instances_lock:
+            return cls._instances.get(rpc_url)
+
+    def track(self, tx_hash) -> Future:
+        """Start tracking a sent transaction; the future resolves to its receipt"""
+        tx_hash = HexBytes(tx_hash)
+        with self._lock:
+            if tx_hash not in self._pending:
+                self._pending[tx_hash] = _PendingTransaction(Future())
+                self._stats["tracked"] += 1
+            future = self._pending[tx_hash].future
+        self._wakeup.set()
+        return future
+
+    def wait(self, tx_hashes: List[Any], timeout: float) -> Dict[HexBytes, Any]:
+        """Wait for several transactions together: {hash: receipt, TransactionStuckError or None on timeout}"""
+        futures = {HexBytes(tx_hash): self.track(tx_hash) for tx_hash in tx_hashes}
+        deadline = time.time() + timeout
+        results = {}
+        for tx_hash, future in futures.items():
+            try:
+                results[tx_hash] = future.result(timeout=max(0, deadline - time.time()))
+            except TransactionStuckError as e:
+                results[tx_hash] = e
+            except TimeoutError:
+                results[tx_hash] = None
+        return results
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                idle = not self._pending
+            if idle:
+                continue
+            try:
+                blocks = self._new_blocks()
+                self._check_new_transactions()
+                for block_number in blocks:
+                    self._process_block(block_number)
+                self._detect_stuck()
+            except Exception as e:
+                self.logger.warning(f"Receipt tracking failed, retrying: {e}")
+
+    def _check_new_transactions(self) -> None:
+        """Look up transactions once when tracking starts; they may be mined in a block already seen"""
+        with self._lock:
+            new = [tx_hash for tx_hash, pending in self._pending.items() if not pending.checked]
+            for tx_hash in new:
+                self._pending[tx_hash].checked = True
+                self._pending[tx_hash].first_block = self._last_block
+        for tx_hash in new:
+            try:
+                self._resolve(tx_hash, self.web3.eth.get_transaction_receipt(tx_hash))
+            except TransactionNotFound:
+                pass
+
+    def _new_blocks(self) -> List[int]:
+        """Block numbers mined since the last check, from a block filter or by polling the head"""
+        if self._last_block is None:
+            self._last_block = self.web3.eth.block_number
+            try:
+                self._block_filter = self.web3.eth.filter("latest")
+            except Exception as e:
+                self.logger.debug(f"Block filters unavailable, polling the block number: {e}")
+            return []
+
+        if self._block_filter is not None:
+            try:
+                if not self._block_filter.get_new_entries():
+                    return []
+            except Exception as e:
+                self.logger.debug(f"Block filter failed, polling the block number: {e}")
+                self._block_filter = None
+
+        head = self.web3.eth.block_number
+        blocks = list(range(self._last_block + 1, head + 1))
+        if head < self._last_block:
+            # The chain was reverted to a snapshot
+            self._last_block = head
+        elif blocks:
+            self._last_block = head
+            self._last_block_time = time.time()
+            self._stats["blocks"] += len(blocks)
+        return blocks
+
+    def _process_block(self, block_number: int) -> None:
+        block = self.web3.eth.get_block(block_number)
+        with self._lock:
+            included = [HexBytes(tx_hash) for tx_hash in block["transactions"] if HexBytes(tx_hash) in self._pending]
+        if not included:
+            return
+        for tx_hash, receipt in zip(included, self._fetch_receipts(included)):
+            self._resolve(tx_hash, receipt)
+
+    def _fetch_receipts(self, tx_hashes: List[HexBytes]) -> List[Any]:
+        """Fetch receipts of mined transactions, in one batch request where the provider supports it"""
+        with self._lock:
+            self._stats["receipt_batches"] += 1
+        if len(tx_hashes) > 1:
+            try:
+                with self.web3.batch_requests() as batch:
+                    for tx_hash in tx_hashes:
+                        batch.add(self.web3.eth.get_transaction_receipt(tx_hash))
+                    return batch.execute()
+            except Exception as e:
+                self.logger.debug(f"Batch receipt request failed, fetching one by one: {e}")
+        return [self.web3.eth.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes]
+
+    def _resolve(self, tx_hash: HexBytes, receipt: Any) -> None:
+        with self._lock:
+            pending = self._pending.pop(tx_hash, None)
+            if pending is None:
+                return
+            self._stats["mined"] += 1
+        pending.future.set_result(receipt)
+
+    def _detect_stuck(self) -> None:
+        now = time.time()
+        with self._lock:
+            candidates = []
+            for tx_hash, pending in self._pending.items():
+                if pending.first_block is None or not pending.checked:
+                    continue
+                blocks_waited = self._last_block - pending.first_block
+                if self.stuck_blocks and blocks_waited >= self.stuck_blocks:
+                    candidates.append((tx_hash, f"not included in {blocks_waited} blocks"))
+                elif self.stuck_seconds and now - max(pending.since, self._last_block_time) >= self.stuck_seconds:
+                    candidates.append((tx_hash, f"no new block for {self.stuck_seconds} seconds"))
+
+        for tx_hash, reason in candidates:
+            try:
+                transaction = self.web3.eth.get_transaction(tx_hash)
+                if transaction.get("blockNumber") is not None:
+                    # Mined after all, in a block we have not processed yet
+                    self._resolve(tx_hash, self.web3.eth.get_transaction_receipt(tx_hash))
+                    continue
+            except TransactionNotFound:
+                transaction, reason = None, "dropped by the node"
+            with self._lock:
+                pending = self._pending.pop(tx_hash, None)
+                if pending is None:
+                    continue
+                self._stats["stuck"] += 1
+            self.logger.warning(f"Transaction {tx_hash.hex()} is stuck: {reason}")
+            pending.future.set_exception(TransactionStuckError(tx_hash, reason, transaction))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return tracked, mined and stuck counts for the run summary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
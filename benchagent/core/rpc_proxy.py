@@ -0,0 +1,432 @@
+import json
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import rlp
+import requests
+from eth_account import Account
+from eth_account.typed_transactions import TypedTransaction
+
+# Never change for a given node
+IMMUTABLE_METHODS = ("eth_chainId", "net_version", "web3_clientVersion")
+# Change at most once per block
+PER_BLOCK_METHODS = ("eth_gasPrice", "eth_blockNumber", "eth_maxPriorityFeePerGas")
+# Final once the transaction is mined
+MINED_METHODS = ("eth_getTransactionReceipt", "eth_getTransactionByHash")
+# Position of the block parameter; results at an explicit block number never change
+BLOCK_PARAM_METHODS = {"eth_call": 1, "eth_getBalance": 1, "eth_getCode": 1, "eth_getStorageAt": 2,
+                       "eth_getTransactionCount": 1, "eth_getBlockByNumber": 0}
+BLOCK_TAGS = ("latest", "pending", "safe", "finalized", "earliest")
+SEND_METHODS = ("eth_sendRawTransaction", "eth_sendTransaction")
+# Dev-chain methods that can rewrite chain state (snapshots, reverts, mining, impersonation)
+STATE_CHANGING_PREFIXES = ("evm_", "anvil_", "hardhat_")
+# Each call changes filter state on the node, so identical calls must all reach it
+FILTER_METHODS = ("eth_newFilter", "eth_newBlockFilter", "eth_newPendingTransactionFilter",
+                  "eth_getFilterChanges", "eth_getFilterLogs", "eth_uninstallFilter")
+
+BLOCK_POLL_INTERVAL = 0.25      # seconds between block number checks that invalidate per-block results
+NONCE_LEASE_SECONDS = 30        # a nonce handed to a pending-count read and not sent within this time is handed out again
+NONCE_RESERVATION_SECONDS = 60  # a reserved nonce not sent within this time is handed out again
+BATCH_WINDOW = 0.002            # seconds to collect concurrent upstream calls into one batch
+MAX_BATCH_SIZE = 50
+UPSTREAM_CONNECTIONS = 8        # batches in flight to the node at once
+
+
+def decode_raw_transaction(raw_transaction: str) -> Tuple[str, int]:
+    """Return (sender, nonce) of a signed transaction"""
+    data = bytes.fromhex(raw_transaction[2:] if raw_transaction.startswith("0x") else raw_transaction)
+    if data[0] <= 0x7f:
+        nonce = TypedTransaction.from_bytes(data).as_dict()["nonce"]
+    else:
+        nonce = int.from_bytes(rlp.decode(data)[0], "big")
+    return Account.recover_transaction(data).lower(), nonce
+
+
+class NonceManager:
+    """Nonce manager - hands out nonces per sender to the clients of the proxy.
+
+    A pending transaction count read leases the lowest nonce that has been
+    neither sent nor reserved, so concurrent readers never get the same one.
+    Clients that send several transactions back to back reserve a block of
+    nonces. A lease or reservation ends when its nonce is sent, released after
+    a failed send, or expires; an expired nonce is handed out again.
+    """
+
+    def __init__(self, reservation_seconds: float = NONCE_RESERVATION_SECONDS,
+                 lease_seconds: float = NONCE_LEASE_SECONDS):
+        self.reservation_seconds = reservation_seconds
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._sent: Dict[str, Set[int]] = {}
+        # Reserved nonce -> time its reservation expires
+        self._reserved: Dict[str, Dict[int, float]] = {}
+
+    def assign(self, sender: str, chain_pending: int) -> int:
+        """Lease the lowest nonce that is neither sent nor reserved"""
+        return self._reserve(sender, chain_pending, 1, self.lease_seconds)[0]
+
+    def reserve(self, sender: str, chain_pending: int, count: int) -> List[int]:
+        """Reserve the lowest block of ``count`` consecutive free nonces"""
+        return self._reserve(sender, chain_pending, count, self.reservation_seconds)
+
+    def _reserve(self, sender: str, chain_pending: int, count: int, seconds: float) -> List[int]:
+        expires = time.time() + seconds
+        with self._lock:
+            sent, reserved = self._prune(sender, chain_pending)
+            nonce = chain_pending
+            while any(n in sent or n in reserved for n in range(nonce, nonce + count)):
+                nonce += 1
+            nonces = list(range(nonce, nonce + count))
+            for n in nonces:
+                reserved[n] = expires
+            return nonces
+
+    def release(self, sender: str, nonces: List[int]) -> None:
+        """Give back reserved nonces that will not be sent"""
+        with self._lock:
+            reserved = self._reserved.get(sender, {})
+            for nonce in nonces:
+                reserved.pop(nonce, None)
+
+    def confirm(self, sender: str, nonce: int) -> None:
+        with self._lock:
+            self._reserved.get(sender, {}).pop(nonce, None)
+            self._sent.setdefault(sender, set()).add(nonce)
+
+    def resync(self, sender: str, nonce: int) -> None:
+        """Forget local state for one nonce the node rejected; the next chain count decides its fate"""
+        with self._lock:
+            self._reserved.get(sender, {}).pop(nonce, None)
+            self._sent.get(sender, set()).discard(nonce)
+
+    def reset(self, sender: Optional[str] = None) -> None:
+        """Forget local state and trust the node again, for one sender or all"""
+        with self._lock:
+            if sender is None:
+                self._sent.clear()
+                self._reserved.clear()
+            else:
+                self._sent.pop(sender, None)
+                self._reserved.pop(sender, None)
+
+    def _prune(self, sender: str, chain_pending: int) -> Tuple[Set[int], Dict[int, float]]:
+        """Drop nonces the node already counts and reservations that expired; caller holds the lock"""
+        now = time.time()
+        sent = {nonce for nonce in self._sent.get(sender, ()) if nonce >= chain_pending}
+        reserved = {nonce: expires for nonce, expires in self._reserved.get(sender, {}).items()
+                    if nonce >= chain_pending and now < expires}
+        self._sent[sender] = sent
+        self._reserved[sender] = reserved
+        return sent, reserved
+
+
+class _UpstreamBatcher:
+    """Sends calls to the upstream node, combining concurrent ones into JSON-RPC batches"""
+
+    def __init__(self, upstream_url: str, timeout: float = 60):
+        self.upstream_url = upstream_url
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self.batching = True
+        self.batches = 0
+        self.batched_calls = 0
+        self._session = requests.Session()
+        self._queue: "queue.Queue[Tuple[Dict[str, Any], Future]]" = queue.Queue()
+        self._next_id = 0
+        # One slow batch must not hold up the calls queued behind it, up to this many in flight
+        self._senders = ThreadPoolExecutor(max_workers=UPSTREAM_CONNECTIONS, thread_name_prefix="rpc-proxy-send")
+        self._thread = threading.Thread(target=self._run, name="rpc-proxy-upstream", daemon=True)
+        self._thread.start()
+
+    def call(self, method: str, params: List[Any]) -> Dict[str, Any]:
+        """Forward one call and return the upstream response ({"result"} or {"error"})"""
+        future = Future()
+        self._queue.put(({"jsonrpc": "2.0", "method": method, "params": params}, future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.perf_counter() + BATCH_WINDOW
+            while len(pending) < MAX_BATCH_SIZE:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for request, _ in pending:
+                self._next_id += 1
+                request["id"] = self._next_id
+            try:
+                self._senders.submit(self._send, pending)
+            except RuntimeError:
+                # Closed; fail the calls instead of leaving their callers waiting
+                for _, future in pending:
+                    future.set_result({"error": {"code": -32603, "message": "RPC proxy is closed"}})
+
+    def _send(self, pending: List[Tuple[Dict[str, Any], Future]]) -> None:
+        try:
+            if len(pending) > 1 and self.batching:
+                responses = self._post([request for request, _ in pending])
+                if isinstance(responses, list):
+                    self.batches += 1
+                    self.batched_calls += len(pending)
+                    by_id = {response.get("id"): response for response in responses}
+                    for request, future in pending:
+                        future.set_result(by_id.get(request["id"]) or
+                                          {"error": {"code": -32603, "message": "Missing batch response"}})
+                    return
+                self.logger.warning("Upstream node does not support JSON-RPC batches; sending calls one by one")
+                self.batching = False
+            for request, future in pending:
+                future.set_result(self._post(request))
+        except Exception as e:
+            error = {"error": {"code": -32603, "message": f"Upstream request failed: {e}"}}
+            for _, future in pending:
+                if not future.done():
+                    future.set_result(error)
+
+    def _post(self, payload: Any) -> Any:
+        response = self._session.post(self.upstream_url, json=payload, timeout=self.timeout)
+        return response.json()
+
+    def close(self) -> None:
+        self._senders.shutdown(wait=False, cancel_futures=True)
+
+
+class _ProxyRequestHandler(BaseHTTPRequestHandler):
+    """JSON-RPC over HTTP; batches from clients are answered element by element"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            return self._send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+
+        if isinstance(payload, list):
+            return self._send([self.server.proxy.handle_rpc(request) for request in payload])
+        return self._send(self.server.proxy.handle_rpc(payload))
+
+    def _send(self, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RPCProxy:
+    """RPC proxy - a local JSON-RPC endpoint in front of the benchmark node.
+
+    The executors and generated scripts all talk to ``url``. The proxy assigns
+    nonces per sender, answers repeated reads from a cache, lets identical
+    concurrent reads share one upstream call, and batches upstream traffic.
+    Per-block results are dropped as soon as a watcher sees a new block.
+    """
+
+    def __init__(self, upstream_url: str, port: int = 0):
+        self.upstream_url = upstream_url
+        self.logger = logging.getLogger(__name__)
+        self.nonces = NonceManager()
+        self._upstream = _UpstreamBatcher(upstream_url)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Per-block results with the block number they were read at
+        self._block_cache: Dict[str, Tuple[Optional[int], Dict[str, Any]]] = {}
+        self._block_number: Optional[int] = None
+        # Bumped whenever the caches are cleared; reads that started before must not be stored
+        self._epoch = 0
+        self._inflight: Dict[str, Future] = {}
+        self._methods: Dict[str, Dict[str, Any]] = {}
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _ProxyRequestHandler)
+        self._server.daemon_threads = True
+        self._server.proxy = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="rpc-proxy", daemon=True)
+        self._thread.start()
+        self._closed = threading.Event()
+        self._watcher = threading.Thread(target=self._watch_blocks, name="rpc-proxy-blocks", daemon=True)
+        self._watcher.start()
+        self.logger.info(f"RPC proxy for {upstream_url} listening at {self.url}")
+
+    def handle_rpc(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one JSON-RPC request"""
+        start = time.perf_counter()
+        method = request.get("method")
+        params = request.get("params") or []
+        try:
+            response, source = self._dispatch(method, params)
+        except Exception as e:
+            response, source = {"error": {"code": -32603, "message": str(e)}}, "upstream"
+        self._record(method, source, time.perf_counter() - start, "error" in response)
+
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        if "error" in response:
+            reply["error"] = response["error"]
+        else:
+            reply["result"] = response.get("result")
+        return reply
+
+    def _dispatch(self, method: str, params: List[Any]) -> Tuple[Dict[str, Any], str]:
+        if method == "eth_getTransactionCount" and len(params) > 1 and params[1] == "pending":
+            return self._assign_nonce(params[0]), "nonce_manager"
+        if method in SEND_METHODS:
+            return self._send_transaction(method, params), "upstream"
+        if method in FILTER_METHODS:
+            return self._upstream.call(method, params), "upstream"
+        if method and method.startswith(STATE_CHANGING_PREFIXES):
+            response = self._upstream.call(method, params)
+            # Reverts can drop mined receipts and blocks, so even "permanent" results go
+            with self._lock:
+                self._cache.clear()
+                self._block_cache.clear()
+                self._block_number = None
+                self._epoch += 1
+            self.nonces.reset()
+            return response, "upstream"
+
+        key = json.dumps([method, params], sort_keys=True)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key], "cache"
+            cached = self._block_cache.get(key)
+            if cached and cached[0] is not None and cached[0] == self._block_number:
+                return cached[1], "cache"
+
+            # Identical reads in flight share one upstream call
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            epoch = self._epoch
+            block_number = self._block_number
+        if not owner:
+            return future.result(), "coalesced"
+
+        try:
+            response = self._upstream.call(method, params)
+            self._store(key, method, params, response, epoch, block_number)
+            future.set_result(response)
+            return response, "upstream"
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _store(self, key: str, method: str, params: List[Any], response: Dict[str, Any], epoch: int,
+               block_number: Optional[int]) -> None:
+        if "error" in response:
+            return
+        result = response.get("result")
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            if method in IMMUTABLE_METHODS:
+                self._cache[key] = response
+            elif method in PER_BLOCK_METHODS:
+                # Only if no new block was seen while the read was in flight
+                if block_number is not None and block_number == self._block_number:
+                    self._block_cache[key] = (block_number, response)
+            elif method in MINED_METHODS:
+                if isinstance(result, dict) and result.get("blockNumber"):
+                    self._cache[key] = response
+            elif method in BLOCK_PARAM_METHODS:
+                position = BLOCK_PARAM_METHODS[method]
+                block = params[position] if len(params) > position else "latest"
+                if isinstance(block, str) and block not in BLOCK_TAGS and result is not None:
+                    self._cache[key] = response
+
+    def _assign_nonce(self, address: str) -> Dict[str, Any]:
+        response = self._upstream.call("eth_getTransactionCount", [address, "pending"])
+        if "error" in response:
+            return response
+        nonce = self.nonces.assign(address.lower(), int(response["result"], 16))
+        return {"result": hex(nonce)}
+
+    def _send_transaction(self, method: str, params: List[Any]) -> Dict[str, Any]:
+        sender, nonce = None, None
+        if method == "eth_sendRawTransaction" and params:
+            try:
+                sender, nonce = decode_raw_transaction(params[0])
+            except Exception as e:
+                self.logger.debug(f"Could not decode raw transaction: {e}")
+        response = self._upstream.call(method, params)
+        with self._lock:
+            # Dev chains mine on send; per-block results wait until the watcher sees the new block
+            self._block_cache.clear()
+            self._block_number = None
+        if sender is not None:
+            if "error" in response:
+                if "nonce" in str(response["error"].get("message", "")).lower():
+                    # The node disagrees about this nonce; the next chain count decides whether it is free
+                    self.nonces.resync(sender, nonce)
+                else:
+                    # Not sent, so the nonce is free for the next client
+                    self.nonces.release(sender, [nonce])
+            else:
+                self.nonces.confirm(sender, nonce)
+        return response
+
+    def _watch_blocks(self) -> None:
+        """Drop per-block results whenever the node reports a new block number"""
+        while not self._closed.wait(BLOCK_POLL_INTERVAL):
+            try:
+                response = self._upstream.call("eth_blockNumber", [])
+                block_number = int(response["result"], 16)
+            except Exception as e:
+                self.logger.debug(f"Block number check failed: {e}")
+                block_number = None
+            with self._lock:
+                if block_number != self._block_number:
+                    self._block_number = block_number
+                    self._block_cache.clear()
+
+    def _record(self, method: str, source: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._methods.setdefault(method, {
+                "calls": 0, "upstream": 0, "cache": 0, "coalesced": 0, "nonce_manager": 0,
+                "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0
+            })
+            stats["calls"] += 1
+            stats[source] += 1
+            stats["errors"] += int(failed)
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-method call counts and latency for the run summary"""
+        with self._lock:
+            methods = {method: dict(stats) for method, stats in self._methods.items()}
+        for stats in methods.values():
+            stats["avg_ms"] = round(stats.pop("total_seconds") / stats["calls"] * 1000, 2)
+            stats["max_ms"] = round(stats.pop("max_seconds") * 1000, 2)
+        return {
+            "calls": sum(stats["calls"] for stats in methods.values()),
+            "saved_calls": sum(stats["cache"] + stats["coalesced"] for stats in methods.values()),
+            "upstream_batches": self._upstream.batches,
+            "batched_calls": self._upstream.batched_calls,
+            "methods": methods
+        }
+
+    def close(self) -> None:
+        """Stop the proxy"""
+        self._closed.set()
+        self._server.shutdown()
+        self._server.server_close()
+        self._watcher.join()
+        self._upstream.close()
@@ -1,7 +1,14 @@
+import time
 import logging
-from typing import Dict, Any, Optional
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, Tuple
 from .types import TaskStep, StepType, ExecutionResult, ExecutionStatus
 from .code_generator import CodeGenerator
+from .llm_client import CancellationToken, LLMCancelledError
+from .chain_fork import ChainFork
+from .chain_snapshot import ChainSnapshots
+from .preflight import PreflightChecker
 from executors.solidity_executor import SolidityExecutor
 from executors.python_executor import PythonExecutor
 
@@ -13,13 +20,28 @@ class StepExecutor:
                  solidity_executor: SolidityExecutor,
                  python_executor: PythonExecutor,
                  max_retries: int = 3,
-                 task_manager=None):
+                 task_manager=None,
+                 speculative_attempts: int = 1,
+                 speculative_temperature_step: float = 0.3,
+                 anvil_path: Optional[str] = None,
+                 preflight: Optional[PreflightChecker] = None):
         self.code_generator = code_generator
         self.solidity_executor = solidity_executor
         self.python_executor = python_executor
         self.max_retries = max_retries
         self.task_manager = task_manager
+        # Candidates generated at once for the first attempt (1 disables speculation)
+        self.speculative_attempts = speculative_attempts
+        self.speculative_temperature_step = speculative_temperature_step
+        # Candidates run on anvil forks; without anvil there is no speculation
+        self.anvil_path = anvil_path
+        # Rejects code with known mistakes before paying for its execution (None disables the check)
+        self.preflight = preflight
         self.logger = logging.getLogger(__name__)
+        self._snapshots = None
+        self._snapshots_checked = False
+        self._anvil = None
+        self._anvil_checked = False
     
     def execute_step(self, step: TaskStep, task_id: str, context: Dict[str, Any] = None) -> ExecutionResult:
         """Execute single step (including retry logic)"""
@@ -29,9 +51,26 @@ class StepExecutor:
         self.logger.info(f"Executing step {step.id}: {step.description}")
         
         previous_error = None
+        first_attempt = 1
+        last_attempt = self.max_retries
         
-        for attempt in range(1, self.max_retries + 1):
-            self.logger.info(f"Step {step.id} - Attempt {attempt}/{self.max_retries}")
+        anvil = self._speculation_anvil()
+        if anvil:
+            result, previous_error, attempts_used = self._execute_speculative(step, task_id, context, anvil)
+            if result is not None:
+                return result
+            # Speculative candidates count against the retry budget
+            first_attempt = attempts_used + 1
+            if first_attempt > last_attempt:
+                return ExecutionResult(
+                    success=False,
+                    step_id=step.id,
+                    error=previous_error or "All speculative candidates failed",
+                    attempt=attempts_used
+                )
+        
+        for attempt in range(first_attempt, last_attempt + 1):
+            self.logger.info(f"Step {step.id} - Attempt {attempt}/{last_attempt}")
             
             try:
                 # Generate code
@@ -60,22 +99,11 @@ class StepExecutor:
                 else:
                     # Execution failed, prepare error message for next retry
                     error_msg = self._format_error_message(execution_result)
-                    
-                    # Handle timeout errors with pending transactions
-                    if "timeout" in error_msg.lower() or "not in the chain" in error_msg.lower():
-                        self.logger.warning(f"Step {step.id} attempt {attempt}: Transaction timeout detected")
-                        # For timeout errors, add special instructions
-                        previous_error = f"{error_msg}\n\nTransaction timeout detected. Verify transaction status before retry to avoid nonce conflicts."
-                    elif "Transaction pending" in execution_result.get("stdout", ""):
-                        # If stdout contains "Transaction pending", also treat as timeout situation
-                        self.logger.warning(f"Step {step.id} attempt {attempt}: Transaction pending detected in output")
-                        previous_error = f"{error_msg}\n\nPending transaction detected. Verify status before retry."
-                    else:
-                        previous_error = error_msg
+                    previous_error = self._retry_feedback(step, attempt, error_msg, execution_result)
                     
                     self.logger.warning(f"Step {step.id} failed on attempt {attempt}: {error_msg}")
                     
-                    if attempt == self.max_retries:
+                    if attempt == last_attempt:
                         # Last attempt failed
                         return ExecutionResult(
                             success=False,
@@ -91,7 +119,7 @@ class StepExecutor:
                 previous_error = error_msg
                 self.logger.error(f"Step {step.id} attempt {attempt} failed with exception: {e}")
                 
-                if attempt == self.max_retries:
+                if attempt == last_attempt:
                     return ExecutionResult(
                         success=False,
                         step_id=step.id,
@@ -105,17 +133,210 @@ class StepExecutor:
             success=False,
             step_id=step.id,
             error="Unexpected execution path",
-            attempt=self.max_retries
+            attempt=last_attempt
         )
     
-    def _execute_code(self, step: TaskStep, code: str, task_id: str, attempt: int) -> tuple[bool, Dict[str, Any]]:
-        """Execute code (choose executor based on step type)"""
+    def _speculation_anvil(self) -> Optional[str]:
+        """The anvil binary for speculative candidates, or None to run attempts one at a time.
+
+        Candidates need isolated chains; on the shared chain they would see each
+        other's transactions, so without anvil there is no speculation.
+        """
+        if self.speculative_attempts <= 1:
+            return None
+        if not self._anvil_checked:
+            self._anvil = ChainFork.find_anvil(self.anvil_path) if self.anvil_path else None
+            if self._anvil is None:
+                self.logger.warning("Speculative attempts need anvil to fork the chain; running attempts serially")
+            self._anvil_checked = True
+        return self._anvil
+    
+    def _execute_speculative(self, step: TaskStep, task_id: str, context: Dict[str, Any],
+                             anvil: str) -> Tuple[Optional[ExecutionResult], Optional[str], int]:
+        """Generate several candidates at once and keep the first that succeeds.
+
+        Each candidate uses a different temperature and runs on its own anvil
+        fork; once one succeeds the other forks are stopped, which aborts the
+        losing executions. The winner is then re-run on the real chain rather
+        than replaying its fork transactions: later steps read the deployed
+        addresses and output of the real run, and the fork's signed
+        transactions only replay cleanly if nothing else touched the chain.
+        The cost of that second run is logged and recorded with the result.
+        Returns (result or None, feedback for the serial loop, attempts used).
+        """
+        count = min(self.speculative_attempts, self.max_retries)
+        base_temperature = self.code_generator.llm_client.config.temperature
+        cancel_token = CancellationToken()
+        self.logger.info(f"Step {step.id} - generating {count} speculative candidates on anvil forks")
+        
+        def run_candidate(attempt: int):
+            temperature = min(1.0, base_temperature + (attempt - 1) * self.speculative_temperature_step)
+            code = self.code_generator.generate_code(step, context, temperature=temperature, cancel_token=cancel_token)
+            fork = ChainFork(self.solidity_executor.config.rpc_url, anvil)
+            # Losing candidates are aborted by stopping their fork under them
+            unregister = cancel_token.add_callback(fork.stop)
+            started = time.monotonic()
+            try:
+                fork.start()
+                success, execution_result = self._execute_code(step, code, task_id, attempt, fork.url)
+            except Exception:
+                if cancel_token.cancelled:
+                    raise LLMCancelledError(f"Speculative candidate {attempt} was stopped")
+                raise
+            finally:
+                unregister()
+                fork.stop()
+            if cancel_token.cancelled and not success:
+                raise LLMCancelledError(f"Speculative candidate {attempt} was stopped")
+            execution_result["speculative"] = {
+                "temperature": temperature,
+                "forked": True,
+                "fork_ms": round((time.monotonic() - started) * 1000, 1)
+            }
+            if success:
+                # First success wins; stop the other generations and forks
+                cancel_token.cancel()
+            if self.task_manager:
+                self.task_manager.save_step_attempt_log(task_id, step.id, attempt, success, code, execution_result)
+            return attempt, code, success, execution_result
+        
+        winner = None
+        failures = {}
+        pool = ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"speculative-{step.id}")
+        try:
+            futures = [pool.submit(run_candidate, attempt) for attempt in range(1, count + 1)]
+            for future in as_completed(futures):
+                try:
+                    attempt, code, success, execution_result = future.result()
+                except LLMCancelledError:
+                    continue
+                except Exception as e:
+                    self.logger.error(f"Step {step.id} speculative candidate failed with exception: {e}")
+                    failures[futures.index(future) + 1] = f"Code generation/execution error: {str(e)}"
+                    continue
+                if success:
+                    winner = (attempt, code, execution_result)
+                    break
+                error_msg = self._format_error_message(execution_result)
+                failures[attempt] = self._retry_feedback(step, attempt, error_msg, execution_result)
+                self.logger.warning(f"Step {step.id} speculative candidate {attempt} failed: {error_msg}")
+        finally:
+            # Stops pending generations and the forks of losing candidates
+            cancel_token.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        attempts_used = count
+        if winner:
+            attempt, code, fork_result = winner
+            # Commit the winning program to the real chain
+            attempts_used = count + 1
+            self.logger.info(f"Step {step.id} - candidate {attempt} succeeded on its fork "
+                             f"in {fork_result['speculative']['fork_ms']} ms, re-running it on the real chain")
+            started = time.monotonic()
+            success, execution_result = self._execute_code(step, code, task_id, attempts_used)
+            commit_ms = round((time.monotonic() - started) * 1000, 1)
+            execution_result["speculative"] = dict(fork_result["speculative"], candidate=attempt, commit_ms=commit_ms)
+            self.logger.info(f"Step {step.id} - re-running the winning candidate cost {commit_ms} ms")
+            if self.task_manager:
+                self.task_manager.save_step_attempt_log(
+                    task_id, step.id, attempts_used, success, code, execution_result
+                )
+            if not success:
+                error_msg = self._format_error_message(execution_result)
+                self.logger.warning(f"Step {step.id} winning candidate failed on the real chain: {error_msg}")
+                return None, self._retry_feedback(step, attempts_used, error_msg, execution_result), attempts_used
+            
+            self.logger.info(f"Step {step.id} completed successfully with speculative candidate {attempt}")
+            return ExecutionResult(
+                success=True,
+                step_id=step.id,
+                code=code,
+                output=execution_result.get("output", ""),
+                attempt=attempts_used,
+                error_details=execution_result
+            ), None, attempts_used
+        
+        # Feed back the error of the most conservative (lowest temperature) candidate
+        previous_error = failures[min(failures)] if failures else None
+        return None, previous_error, attempts_used
+    
+    def _retry_feedback(self, step: TaskStep, attempt: int, error_msg: str,
+                        execution_result: Dict[str, Any]) -> str:
+        """Build the error feedback for the next attempt"""
+        # Handle timeout errors with pending transactions
+        if "timeout" in error_msg.lower() or "not in the chain" in error_msg.lower():
+            self.logger.warning(f"Step {step.id} attempt {attempt}: Transaction timeout detected")
+            # For timeout errors, add special instructions
+            return f"{error_msg}\n\nTransaction timeout detected. Verify transaction status before retry to avoid nonce conflicts."
+        if "Transaction pending" in execution_result.get("stdout", ""):
+            # If stdout contains "Transaction pending", also treat as timeout situation
+            self.logger.warning(f"Step {step.id} attempt {attempt}: Transaction pending detected in output")
+            return f"{error_msg}\n\nPending transaction detected. Verify status before retry."
+        return error_msg
+    
+    def _chain_snapshots(self) -> Optional[ChainSnapshots]:
+        """Snapshot manager of the benchmark chain, if it is a local dev chain"""
+        if not self._snapshots_checked:
+            if self.solidity_executor.config.snapshot_attempts:
+                self._snapshots = ChainSnapshots.for_chain(
+                    self.solidity_executor.web3, self.solidity_executor.config.rpc_url
+                )
+            self._snapshots_checked = True
+        return self._snapshots
+    
+    def _execute_code(self, step: TaskStep, code: str, task_id: str, attempt: int,
+                      rpc_url: Optional[str] = None) -> tuple[bool, Dict[str, Any]]:
+        """Execute code; on a local dev chain a failed attempt is reverted to the state before it"""
+        if self.preflight:
+            violations = self.preflight.check(step.step_type, code)
+            if violations:
+                self.logger.warning(f"Step {step.id} attempt {attempt} failed pre-flight checks, execution avoided "
+                                    f"({self.preflight.stats()['executions_avoided']} so far): {violations}")
+                return False, {
+                    "type": "preflight",
+                    "error": "Pre-flight check failed, the code was not executed",
+                    "violations": violations
+                }
+        
+        snapshots = None if rpc_url else self._chain_snapshots()
+        if snapshots is None:
+            return self._run_code(step, code, task_id, attempt, rpc_url)
+        
+        snapshot = snapshots.take()
+        try:
+            success, execution_result = self._run_code(step, code, task_id, attempt, rpc_url)
+        except Exception:
+            snapshots.release(snapshot, revert=True)
+            self.solidity_executor.reset_nonce()
+            raise
+        
+        timings = snapshots.release(snapshot, revert=not success)
+        if timings.get("reverted"):
+            # Nonces handed out during the attempt were rolled back with it
+            self.solidity_executor.reset_nonce()
+        execution_result["chain_snapshot"] = timings
+        self.logger.info(f"Step {step.id} attempt {attempt}: snapshot {timings.get('snapshot_ms', 0)} ms"
+                         + (f", reverted in {timings['revert_ms']} ms" if "revert_ms" in timings else ""))
+        return success, execution_result
+    
+    def _run_code(self, step: TaskStep, code: str, task_id: str, attempt: int,
+                  rpc_url: Optional[str] = None) -> tuple[bool, Dict[str, Any]]:
+        """Run code with the executor for its step type; rpc_url redirects it to another node"""
         if step.step_type == StepType.SOLIDITY:
-            return self.solidity_executor.execute(code, step.id, task_id, attempt)
+            if rpc_url:
+                solidity_executor = SolidityExecutor(
+                    replace(self.solidity_executor.config, rpc_url=rpc_url),
+                    self.solidity_executor.solc_version,
+                    self.task_manager,
+                    compile_cache=self.solidity_executor.compile_cache,
+                    compiler=self.solidity_executor.compiler
+                )
+                return solidity_executor.execute(code, step.id, task_id, attempt, step.description)
+            return self.solidity_executor.execute(code, step.id, task_id, attempt, step.description)
         else:
             # For Python code, pass in necessary environment variables
             env_vars = {
-                "RPC_URL": self.solidity_executor.config.rpc_url,
+                "RPC_URL": rpc_url or self.solidity_executor.config.rpc_url,
                 "PRIVATE_KEY": self.solidity_executor.config.private_key,
                 "SENDER_ADDRESS": self.solidity_executor.config.sender_address,
                 "CHAIN_ID": str(self.solidity_executor.config.chain_id)
@@ -131,7 +352,11 @@ class StepExecutor:
             error_parts.append(f"Error: {execution_result['error']}")
         
         # Execution type-specific error information
-        if execution_result.get("type") == "solidity_execution":
+        if execution_result.get("type") == "preflight":
+            error_parts.append("Fix these problems:")
+            error_parts.extend(f"- {violation}" for violation in execution_result["violations"])
+            
+        elif execution_result.get("type") == "solidity_execution":
             error_parts.append("Solidity compilation/deployment failed.")
             
         elif execution_result.get("type") == "python_execution":
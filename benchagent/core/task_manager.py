@@ -1,7 +1,8 @@
 import json
 import logging
+import itertools
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from .types import BenchmarkTask
@@ -35,6 +36,9 @@ class TaskManager:
         self.contracts_dir = self.output_dir / "contracts"
         self.contracts_dir.mkdir(exist_ok=True)
         
+        # Sequence number keeps interaction filenames unique when tasks run in parallel
+        self._interaction_counter = itertools.count(1)
+        
     def load_tasks(self, tasks_file: str) -> List[BenchmarkTask]:
         """Load tasks from file"""
         try:
@@ -136,8 +140,8 @@ class TaskManager:
         task_contracts_dir.mkdir(exist_ok=True)
         return task_contracts_dir
     
-    def generate_summary(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Generate execution summary"""
+    def generate_summary(self, results: List[Dict[str, Any]], metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate execution summary, including any run-level metrics"""
         total_tasks = len(results)
         successful_tasks = sum(1 for r in results if r.get("success", False))
         failed_tasks = total_tasks - successful_tasks
@@ -157,6 +161,8 @@ class TaskManager:
                 } for r in results
             }
         }
+        if metrics:
+            summary.update(metrics)
         
         # Save summary
         summary_file = self.output_dir / "summary.json"
@@ -176,9 +182,10 @@ class TaskManager:
             interactions_dir = self.current_run_dir / "llm_interactions"
             interactions_dir.mkdir(exist_ok=True)
             
-            # Generate filename (use timestamp to ensure uniqueness)
+            # Generate filename (timestamp plus sequence number to ensure uniqueness)
             timestamp = interaction_record["timestamp"].replace(":", "-").replace(".", "-")
-            interaction_file = interactions_dir / f"interaction_{timestamp}.json"
+            sequence = next(self._interaction_counter)
+            interaction_file = interactions_dir / f"interaction_{timestamp}_{sequence:05d}.json"
             
             # Save interaction record
             with open(interaction_file, 'w', encoding='utf-8') as f:
@@ -1,38 +1,91 @@
 import logging
-from typing import List
+from typing import List, Optional, Tuple
 from .types import BenchmarkTask, TaskPlan, TaskStep, StepType
 from .llm_client import LLMClient
+from .plan_cache import PlanCache
 
 
 class TaskPlanner:
     """Task planner - responsible for decomposing complex tasks into executable steps"""
     
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, plan_cache: Optional[PlanCache] = None, replan: bool = False):
         self.llm_client = llm_client
+        self.plan_cache = plan_cache
+        self.replan = replan
         self.logger = logging.getLogger(__name__)
     
     def plan_task(self, task: BenchmarkTask) -> TaskPlan:
         """Decompose task into execution steps"""
         self.logger.info(f"Planning task {task.id}: {task.description}")
         
+        system_prompt = self._get_system_prompt()
         prompt = self._create_planning_prompt(task)
+        
+        cache_key = None
+        if self.plan_cache:
+            cache_key = PlanCache.make_key(
+                self.llm_client.config.model, self.llm_client.config.temperature, system_prompt, prompt
+            )
+            if self.replan:
+                self.plan_cache.record_bypass()
+            else:
+                cached_steps = self.plan_cache.get(
+                    cache_key,
+                    validate=lambda steps: self.validate_plan(TaskPlan(task.id, task.description, steps))
+                )
+                if cached_steps is not None:
+                    self.logger.info(f"Task {task.id} plan loaded from cache ({len(cached_steps)} steps)")
+                    return TaskPlan(task_id=task.id, description=task.description, steps=cached_steps)
+        
         response = self.llm_client.chat_completion([
-            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ])
         
         # Parse the plan returned by LLM
-        steps = self._parse_plan_response(response, task.id)
+        steps, is_fallback = self._parse_plan_response(response, task.id)
         
         plan = TaskPlan(
             task_id=task.id,
             description=task.description,
             steps=steps
         )
+        self.validate_plan(plan)
+        
+        # Only cache plans the LLM actually produced
+        if cache_key and not is_fallback:
+            self.plan_cache.put(cache_key, steps, {"task_id": task.id, "model": self.llm_client.config.model})
         
         self.logger.info(f"Task {task.id} planned with {len(steps)} steps")
         return plan
     
+    def validate_plan(self, plan: TaskPlan) -> None:
+        """Check that step ids are unique and dependencies form a DAG of known steps"""
+        step_ids = [step.id for step in plan.steps]
+        duplicates = sorted({step_id for step_id in step_ids if step_ids.count(step_id) > 1})
+        if duplicates:
+            raise ValueError(f"Plan for task {plan.task_id} has duplicate step ids: {duplicates}")
+        
+        known = set(step_ids)
+        for step in plan.steps:
+            unknown = [dep for dep in step.dependencies if dep not in known]
+            if unknown:
+                raise ValueError(f"Step {step.id} depends on unknown steps: {unknown}")
+        
+        # Kahn's algorithm: any step left over is part of a cycle
+        remaining = {step.id: set(step.dependencies) for step in plan.steps}
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        while ready:
+            done = ready.pop()
+            del remaining[done]
+            for step_id, deps in remaining.items():
+                if done in deps:
+                    deps.discard(done)
+                    if not deps:
+                        ready.append(step_id)
+        if remaining:
+            raise ValueError(f"Plan for task {plan.task_id} has a dependency cycle between steps: {sorted(remaining)}")
+    
     def _get_system_prompt(self) -> str:
         """Get system prompt"""
         return """You are a blockchain development expert. Your task is to analyze a given blockchain task and break it down into executable steps.
@@ -86,8 +139,8 @@ Additional context:
 
 Please provide a detailed execution plan."""
 
-    def _parse_plan_response(self, response: str, task_id: str) -> List[TaskStep]:
-        """Parse the plan returned by LLM"""
+    def _parse_plan_response(self, response: str, task_id: str) -> Tuple[List[TaskStep], bool]:
+        """Parse the plan returned by LLM; the flag is True when the fallback plan was used"""
         try:
             # Try to extract JSON
             json_blocks = self.llm_client.extract_json_blocks(response)
@@ -107,18 +160,18 @@ Please provide a detailed execution plan."""
                     id=step_data.get("id", f"step_{i+1}"),
                     description=step_data.get("description", ""),
                     step_type=step_type,
-                    dependencies=step_data.get("dependencies", [])
+                    dependencies=step_data.get("dependencies") or []
                 )
                 steps.append(step)
             
-            return steps
+            return steps, False
             
         except Exception as e:
             self.logger.error(f"Failed to parse plan response: {e}")
             self.logger.debug(f"Response content: {response}")
             
             # Fallback: create single-step plan
-            return self._create_fallback_plan(task_id, response)
+            return self._create_fallback_plan(task_id, response), True
     
     def _create_fallback_plan(self, task_id: str, original_response: str) -> List[TaskStep]:
         """Create fallback plan (when parsing fails)"""
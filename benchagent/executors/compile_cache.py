@@ -0,0 +1,77 @@
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# Bump when the cached artifact format changes
+COMPILE_CACHE_VERSION = 2
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class CompileCache:
+    """Compile cache - persists compiled artifacts keyed by everything that determines the compiler output"""
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.cache_dir = Path(cache_dir) / "compile"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def make_key(self, standard_input: Dict[str, Any], solc_version: str) -> str:
+        """Hash a standard-JSON compiler input; it already carries every source the compilation reads"""
+        payload = json.dumps({
+            "version": COMPILE_CACHE_VERSION,
+            "solc_version": str(solc_version),
+            "sources": {name: _sha256(unit["content"].encode("utf-8"))
+                        for name, unit in standard_input["sources"].items()},
+            "settings": standard_input.get("settings", {})
+        }, sort_keys=True)
+        return _sha256(payload.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached contracts ({name: abi/bytecode/runtime_bytecode}) or None"""
+        cache_file = self.cache_dir / f"{key}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                contracts = json.load(f)["contracts"]
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable compile cache entry {cache_file}: {e}")
+            cache_file.unlink(missing_ok=True)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return contracts
+
+    def put(self, key: str, contracts: Dict[str, Any]) -> None:
+        """Store the artifacts of a successful compilation"""
+        cache_file = self.cache_dir / f"{key}.json"
+        try:
+            # Write then rename so parallel workers never read a partial file
+            tmp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"version": COMPILE_CACHE_VERSION, "contracts": contracts}, f)
+            tmp_file.replace(cache_file)
+            self._count("writes")
+        except Exception as e:
+            self.logger.warning(f"Failed to write compile cache {cache_file}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics for the run summary"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups * 100) if lookups else 0
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
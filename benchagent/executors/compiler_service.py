@@ -0,0 +1,168 @@
+import json
+import time
+import queue
+import logging
+import threading
+import subprocess
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+import solcx
+
+
+class CompilerError(Exception):
+    """Compilation failed; ``errors`` holds the compiler's error entries"""
+
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+class CompilerTimeoutError(CompilerError):
+    """solc did not finish within the compile timeout"""
+
+
+class CompilerBusyError(CompilerError):
+    """The compile queue stayed full for longer than the compile timeout"""
+
+
+@dataclass
+class _CompileJob:
+    standard_input: Dict[str, Any]
+    solc_version: str
+    submitted: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+
+class CompilerService:
+    """Compiler service - a bounded queue served by worker threads, each running one solc process per compile.
+
+    solc has no persistent mode: ``--standard-json`` reads its input to EOF,
+    compiles once and exits, so workers cannot be kept alive between
+    compilations. The service instead bounds how many solc processes run at
+    once, queues the rest and kills compilations that exceed the timeout.
+    Every request names its compiler version and runs that version's binary,
+    so no process-global solc version is involved and compilations for
+    different tasks, steps and speculative attempts run side by side.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 64, timeout: float = 120):
+        self.workers = workers
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._queue: "queue.Queue[Optional[_CompileJob]]" = queue.Queue(maxsize=queue_size)
+        self._executables: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._stats = {"requests": 0, "completed": 0, "failed": 0, "timeouts": 0, "rejected": 0,
+                       "busy_seconds": 0.0, "queue_wait_seconds": 0.0, "max_queue_wait_seconds": 0.0}
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"solc-worker-{number}", daemon=True)
+            for number in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def compile(self, standard_input: Dict[str, Any], solc_version: str) -> Dict[str, Any]:
+        """Compile a standard-JSON input and return the compiler output; raises CompilerError"""
+        return self.submit(standard_input, solc_version).result()
+
+    def submit(self, standard_input: Dict[str, Any], solc_version: str) -> Future:
+        """Queue a compilation; the future resolves to the compiler output"""
+        job = _CompileJob(standard_input, str(solc_version))
+        self._count("requests")
+        try:
+            self._queue.put(job, timeout=self.timeout)
+        except queue.Full:
+            self._count("rejected")
+            raise CompilerBusyError(f"Compile queue full for {self.timeout} seconds")
+        return job.future
+
+    def executable(self, solc_version: str) -> str:
+        """Path of the solc binary for a version"""
+        with self._lock:
+            if solc_version not in self._executables:
+                self._executables[solc_version] = str(solcx.get_executable(solc_version))
+            return self._executables[solc_version]
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            started = time.perf_counter()
+            waited = started - job.submitted
+            try:
+                job.future.set_result(self._run_solc(job))
+                outcome = "completed"
+            except CompilerTimeoutError as e:
+                job.future.set_exception(e)
+                outcome = "timeouts"
+            except Exception as e:
+                job.future.set_exception(e)
+                outcome = "failed"
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stats[outcome] += 1
+                self._stats["busy_seconds"] += elapsed
+                self._stats["queue_wait_seconds"] += waited
+                self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], waited)
+
+    def _run_solc(self, job: _CompileJob) -> Dict[str, Any]:
+        process = subprocess.Popen(
+            [self.executable(job.solc_version), "--standard-json"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        try:
+            stdout, stderr = process.communicate(json.dumps(job.standard_input), timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise CompilerTimeoutError(f"solc {job.solc_version} timed out after {self.timeout} seconds")
+
+        try:
+            output = json.loads(stdout)
+        except json.JSONDecodeError:
+            raise CompilerError(f"solc {job.solc_version} exited with code {process.returncode}: "
+                                f"{stderr.strip() or stdout.strip()}")
+
+        errors = [entry for entry in output.get("errors", []) if entry.get("severity") == "error"]
+        if errors:
+            raise CompilerError("\n".join(entry.get("formattedMessage", entry.get("message", ""))
+                                          for entry in errors), errors)
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool utilisation and queue-wait statistics for the run summary"""
+        with self._lock:
+            stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"] + stats["timeouts"]
+        uptime = time.perf_counter() - self._started
+        return {
+            "workers": self.workers,
+            "requests": stats["requests"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "timeouts": stats["timeouts"],
+            "rejected": stats["rejected"],
+            "queued": self._queue.qsize(),
+            "utilization": (stats["busy_seconds"] / (self.workers * uptime) * 100) if self.workers and uptime else 0,
+            "avg_queue_wait_ms": (stats["queue_wait_seconds"] / finished * 1000) if finished else 0,
+            "max_queue_wait_ms": stats["max_queue_wait_seconds"] * 1000,
+            "avg_compile_ms": (stats["busy_seconds"] / finished * 1000) if finished else 0
+        }
+
+    def close(self) -> None:
+        """Stop the workers once queued compilations are done"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,149 @@
+import json
+import logging
+import threading
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+from web3 import Web3, EthereumTesterProvider
+from web3.providers.eth_tester.middleware import request_formatters, result_formatters
+
+from core.config import BlockchainConfig
+
+CALL_METHODS = ("eth_call", "eth_estimateGas", "eth_createAccessList")
+
+# Balance given to the benchmark account from the prefunded test accounts
+MAIN_ACCOUNT_FUNDING_ETH = 10000
+
+
+class LockedEthereumTesterProvider(EthereumTesterProvider):
+    """eth-tester provider that serialises requests, since py-evm is not thread-safe"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+
+    def make_request(self, method, params):
+        with self._lock:
+            return super().make_request(method, params)
+
+
+def _to_wire(value: Any) -> Any:
+    """Encode eth-tester results the way a JSON-RPC node sends them"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return {key: _to_wire(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(item) for item in value]
+    return value
+
+
+class _RPCRequestHandler(BaseHTTPRequestHandler):
+    """JSON-RPC over HTTP for generated scripts; supports batches"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            return self._send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+
+        if isinstance(payload, list):
+            return self._send([self.server.chain.handle_rpc(request) for request in payload])
+        return self._send(self.server.chain.handle_rpc(payload))
+
+    def _send(self, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InProcessChain:
+    """In-process chain - an eth-tester/py-evm chain with instant mining and a local JSON-RPC endpoint.
+
+    The executors talk to the chain directly through its provider; generated
+    scripts reach the same chain through the JSON-RPC shim at ``rpc_url``.
+    """
+
+    def __init__(self, blockchain_config: BlockchainConfig, port: int = 0):
+        self.logger = logging.getLogger(__name__)
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+        except ImportError as e:
+            raise RuntimeError("The in-process backend needs eth-tester: pip install 'eth-tester[py-evm]'") from e
+
+        self.backend = PyEVMBackend()
+        self.provider = LockedEthereumTesterProvider(EthereumTester(self.backend))
+        self.web3 = Web3(self.provider)
+        self._default_sender = self.web3.eth.accounts[0]
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _RPCRequestHandler)
+        self._server.daemon_threads = True
+        self._server.chain = self
+        self.rpc_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="inprocess-rpc", daemon=True)
+        self._thread.start()
+
+        self.blockchain_config = self._configure_accounts(blockchain_config)
+        self.logger.info(f"In-process chain started (chain id {self.blockchain_config.chain_id}), "
+                         f"JSON-RPC at {self.rpc_url}")
+
+    def _configure_accounts(self, blockchain_config: BlockchainConfig) -> BlockchainConfig:
+        """Point the configuration at this chain and fund the benchmark account"""
+        private_key = blockchain_config.private_key or self.backend.account_keys[0].to_hex()
+        account = self.web3.eth.account.from_key(private_key)
+
+        funder = self.web3.eth.accounts[0]
+        target = Web3.to_wei(MAIN_ACCOUNT_FUNDING_ETH, "ether")
+        balance = self.web3.eth.get_balance(account.address)
+        if account.address != funder and balance < target:
+            self.web3.eth.send_transaction({"from": funder, "to": account.address, "value": target - balance})
+
+        return replace(
+            blockchain_config,
+            rpc_url=self.rpc_url,
+            private_key=private_key,
+            sender_address=account.address,
+            chain_id=self.web3.eth.chain_id
+        )
+
+    def handle_rpc(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one JSON-RPC request from the shim"""
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params", [])
+        try:
+            if method in request_formatters:
+                params = request_formatters[method](params)
+            if method in CALL_METHODS and params and "from" not in params[0]:
+                # Nodes default the sender of calls; eth-tester requires one
+                params = [{**params[0], "from": self._default_sender}, *params[1:]]
+            response = self.provider.make_request(method, params)
+            if "error" in response:
+                return {"jsonrpc": "2.0", "id": request_id, "error": response["error"]}
+            result = response.get("result")
+            if method in result_formatters:
+                result = result_formatters[method](result)
+            return {"jsonrpc": "2.0", "id": request_id, "result": _to_wire(result)}
+        except Exception as e:
+            message = str(e)
+            # Clients recognise reverts by this prefix
+            if type(e).__name__ == "TransactionFailed" and not message.startswith("execution reverted"):
+                message = f"execution reverted: {message}"
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": message}}
+
+    def close(self) -> None:
+        """Stop the JSON-RPC shim"""
+        self._server.shutdown()
+        self._server.server_close()
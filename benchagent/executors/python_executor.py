@@ -1,18 +1,59 @@
 import os
+import re
 import sys
+import queue
 import subprocess
 import tempfile
 import logging
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
+
+from .python_worker_pool import PythonWorkerPool
+
+# A 64-digit hex string that is not part of a longer one, with or without 0x
+TX_HASH_PATTERN = re.compile(r'(?<![0-9a-fA-Fx])(?:0x)?([0-9a-fA-F]{64})(?![0-9a-fA-F])')
+OUTPUT_BUFFER_CHARS = 200000    # per stream; older output is dropped first
+TRACEBACK_GRACE_SECONDS = 3     # time a script gets to exit after printing a traceback
+
+
+class OutputRingBuffer:
+    """Keeps the most recent output of a stream up to a character limit"""
+    
+    def __init__(self, max_chars: int = OUTPUT_BUFFER_CHARS):
+        self.max_chars = max_chars
+        self._lines = deque()
+        self._chars = 0
+        self.dropped_chars = 0
+    
+    def append(self, line: str) -> None:
+        self._lines.append(line)
+        self._chars += len(line)
+        while self._chars > self.max_chars and len(self._lines) > 1:
+            dropped = self._lines.popleft()
+            self._chars -= len(dropped)
+            self.dropped_chars += len(dropped)
+    
+    def text(self) -> str:
+        text = "".join(self._lines)
+        if self.dropped_chars:
+            text = f"[... {self.dropped_chars} earlier characters dropped ...]\n" + text
+        return text
 
 
 class PythonExecutor:
     """Python executor - responsible for executing Python scripts"""
     
-    def __init__(self, timeout: int = 300, task_manager=None):
+    def __init__(self, timeout: int = 300, task_manager=None, worker_pool: Optional[PythonWorkerPool] = None,
+                 idle_timeout: int = 0, kill_on_traceback: bool = False):
         self.timeout = timeout
         self.task_manager = task_manager
+        self.worker_pool = worker_pool
+        # Early termination: no output for idle_timeout seconds (0 = off), or a traceback without exit
+        self.idle_timeout = idle_timeout
+        self.kill_on_traceback = kill_on_traceback
         self.logger = logging.getLogger(__name__)
         
         # Working directory - use default directory if no task_manager
@@ -48,69 +89,75 @@ class PythonExecutor:
             if env_vars:
                 execution_env.update(env_vars)
             
-            # Execute script
+            # Execute script, in a pre-warmed interpreter when a worker pool is configured
             self.logger.info(f"Running script: {script_file}")
-            process = subprocess.Popen(
-                [sys.executable, str(script_file)],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=execution_env,
-                cwd=os.getcwd(),
-                text=True
-            )
+            if self.worker_pool:
+                process, interpreter = self.worker_pool.start(script_file, execution_env, os.getcwd())
+            else:
+                start = time.perf_counter()
+                process = subprocess.Popen(
+                    [sys.executable, str(script_file)],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=execution_env,
+                    cwd=os.getcwd(),
+                    text=True
+                )
+                interpreter = {"warm": False, "startup_ms": round((time.perf_counter() - start) * 1000, 2)}
             
-            try:
-                stdout, stderr = process.communicate(timeout=self.timeout)
-                exit_code = process.returncode
-                
-                # Record output
-                if stdout:
-                    self.logger.info(f"Script output:\n{stdout}")
-                if stderr:
-                    self.logger.warning(f"Script stderr:\n{stderr}")
-                
-                # Extract transaction hashes from stdout and stderr for debugging  
-                tx_hashes_stderr = self._extract_transaction_hashes(stderr)
-                tx_hashes_stdout = self._extract_transaction_hashes(stdout)
-                all_tx_hashes = list(set(tx_hashes_stderr + tx_hashes_stdout))
-                if all_tx_hashes:
-                    self.logger.info(f"Transaction hashes found in this attempt: {all_tx_hashes}")
-                
-                # Improved success determination logic: not only check exit_code, but also check ERROR in stderr
-                success = exit_code == 0 and not self._has_python_error(stderr)
-                
+            stdout, stderr, tx_hashes, termination = self._capture(process)
+            exit_code = -1 if termination else process.returncode
+            
+            # Record output
+            if stdout:
+                self.logger.info(f"Script output:\n{stdout}")
+            if stderr:
+                self.logger.warning(f"Script stderr:\n{stderr}")
+            
+            # Transaction hashes were collected while the output streamed in
+            all_tx_hashes = sorted(tx_hashes)
+            if all_tx_hashes:
+                self.logger.info(f"Transaction hashes found in this attempt: {all_tx_hashes}")
+            
+            if termination:
+                self.logger.error(f"Script terminated early: {termination}")
                 result = {
                     "type": "python_execution",
                     "exit_code": exit_code,
                     "stdout": stdout,
-                    "stderr": stderr,
+                    "stderr": stderr + f"\n{termination}",
+                    "error": termination,
                     "script_file": str(script_file),
-                    "success": success
+                    "interpreter": interpreter,
+                    "success": False
                 }
-                
-                # Record discovered transaction hashes
                 if all_tx_hashes:
                     result["transaction_hashes"] = all_tx_hashes
-                
-                if not success:
-                    result["error"] = f"Script exited with code {exit_code}"
-                    if stderr:
-                        result["error"] += f"\nStderr: {stderr}"
-                
-                return success, result
-                    
-            except subprocess.TimeoutExpired:
-                process.kill()
-                stdout, stderr = process.communicate()
-                self.logger.error(f"Script execution timed out after {self.timeout} seconds")
-                return False, {
-                    "type": "python_execution",
-                    "exit_code": -1,
-                    "stdout": stdout,
-                    "stderr": stderr + f"\nScript execution timed out after {self.timeout} seconds",
-                    "error": f"Script execution timed out after {self.timeout} seconds",
-                    "success": False
-                }
+                return False, result
+            
+            # Improved success determination logic: not only check exit_code, but also check ERROR in stderr
+            success = exit_code == 0 and not self._has_python_error(stderr)
+            
+            result = {
+                "type": "python_execution",
+                "exit_code": exit_code,
+                "stdout": stdout,
+                "stderr": stderr,
+                "script_file": str(script_file),
+                "interpreter": interpreter,
+                "success": success
+            }
+            
+            # Record discovered transaction hashes
+            if all_tx_hashes:
+                result["transaction_hashes"] = all_tx_hashes
+            
+            if not success:
+                result["error"] = f"Script exited with code {exit_code}"
+                if stderr:
+                    result["error"] += f"\nStderr: {stderr}"
+            
+            return success, result
                 
         except Exception as e:
             self.logger.error(f"Python execution failed: {e}")
@@ -121,28 +168,69 @@ class PythonExecutor:
                 "success": False
             }
     
+    def _capture(self, process: subprocess.Popen) -> Tuple[str, str, set, Optional[str]]:
+        """Stream the script's output until it exits or an early-termination trigger fires.
+
+        Returns stdout, stderr, the transaction hashes seen and the reason the
+        script was killed (None if it exited by itself).
+        """
+        buffers = {"stdout": OutputRingBuffer(), "stderr": OutputRingBuffer()}
+        tx_hashes = set()
+        lines = queue.Queue()
+        
+        def pump(name: str, stream):
+            for line in iter(stream.readline, ''):
+                buffers[name].append(line)
+                tx_hashes.update(self._extract_transaction_hashes(line))
+                lines.put((name, line))
+            stream.close()
+            lines.put((name, None))
+        
+        readers = [threading.Thread(target=pump, args=(name, getattr(process, name)), daemon=True)
+                   for name in buffers]
+        for reader in readers:
+            reader.start()
+        
+        start = last_output = time.time()
+        traceback_seen = None
+        open_streams = len(readers)
+        termination = None
+        while open_streams:
+            now = time.time()
+            checks = [(start + self.timeout, f"Script execution timed out after {self.timeout} seconds")]
+            if self.idle_timeout:
+                checks.append((last_output + self.idle_timeout, f"Script produced no output for {self.idle_timeout} seconds"))
+            if traceback_seen is not None:
+                checks.append((traceback_seen + TRACEBACK_GRACE_SECONDS,
+                               f"Script printed a traceback and did not exit within {TRACEBACK_GRACE_SECONDS} seconds"))
+            deadline, reason = min(checks)
+            if now >= deadline:
+                termination = reason
+                break
+            try:
+                name, line = lines.get(timeout=deadline - now)
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            last_output = time.time()
+            if (self.kill_on_traceback and traceback_seen is None and name == "stderr"
+                    and line.startswith("Traceback (most recent call last):")):
+                traceback_seen = last_output
+        
+        if termination:
+            process.kill()
+        process.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        return buffers["stdout"].text(), buffers["stderr"].text(), tx_hashes, termination
+    
     def _extract_transaction_hashes(self, text: str) -> list:
         """Extract transaction hashes from output"""
-        import re
         if not text:
             return []
-        
-        # Match common transaction hash formats
-        patterns = [
-            r'(?:TX|Tx|tx|Transaction|transaction).*?hash[:\s]+([0-9a-fA-F]{64})',
-            r'([0-9a-fA-F]{64})',  # 64-bit hexadecimal string
-            r'0x([0-9a-fA-F]{64})'  # Hash with 0x prefix
-        ]
-        
-        hashes = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                hash_value = match if match.startswith('0x') else f"0x{match}"
-                if len(hash_value) == 66:  # 0x + 64 chars
-                    hashes.append(hash_value)
-        
-        return list(set(hashes))  # Remove duplicates
+        return list({f"0x{match.lower()}" for match in TX_HASH_PATTERN.findall(text)})
     
     def _has_python_error(self, stderr: str) -> bool:
         """Check if stderr contains Python errors"""
@@ -0,0 +1,59 @@
+"""Warm interpreter for generated scripts.
+
+Started ahead of time by PythonWorkerPool: imports the common blockchain
+libraries, reports readiness on the file descriptor given as its argument,
+then reads one job ({"script", "cwd", "env"}) from stdin and runs the script
+as __main__. Output goes to this process's stdout/stderr and the exit code is
+the script's, exactly as if it had been started with `python script.py`.
+"""
+import os
+import sys
+import json
+import time
+import runpy
+import traceback
+import importlib
+
+PRELOAD_MODULES = ("web3", "eth_account", "eth_utils", "dotenv", "requests")
+
+
+def main() -> None:
+    start = time.perf_counter()
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    ready_fd = int(sys.argv[1])
+    os.write(ready_fd, f"{(time.perf_counter() - start) * 1000:.1f}\n".encode())
+    os.close(ready_fd)
+
+    line = sys.stdin.readline()
+    if not line:
+        return
+    job = json.loads(line)
+    sys.stdin.close()
+    sys.stdin = open(os.devnull)
+
+    os.chdir(job["cwd"])
+    os.environ.clear()
+    os.environ.update(job["env"])
+    script = os.path.abspath(job["script"])
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(script)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Report the traceback from the script's first frame, as `python script.py` would
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional, Set, Tuple
+
+WORKER_SCRIPT = Path(__file__).with_name("python_worker.py")
+
+
+@dataclass(eq=False)
+class _Worker:
+    process: subprocess.Popen
+    spawned: float
+    ready_fd: int
+    ready_seconds: Optional[float] = None
+
+
+class PythonWorkerPool:
+    """Python worker pool - keeps one-shot interpreters started ahead of time with web3 and friends imported.
+
+    Workers are separate ``python`` processes, not forks of a template
+    process: each runs exactly one script and exits, so every run starts from
+    a clean interpreter. The pool starts a replacement in the background as
+    soon as a worker is taken, so the startup cost is paid off the critical
+    path rather than avoided.
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self.logger = logging.getLogger(__name__)
+        self._ready: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Workers still importing, and the threads waiting for them, so close() can stop them
+        self._starting: Set[_Worker] = set()
+        self._spawn_threads: Set[threading.Thread] = set()
+        self._stats = {"warm_runs": 0, "cold_runs": 0, "spawns": 0,
+                       "spawn_seconds": 0.0, "warm_start_seconds": 0.0}
+        for _ in range(size):
+            self._spawn_async()
+
+    def start(self, script_file: Path, env: Dict[str, str], cwd: str) -> Tuple[subprocess.Popen, Dict[str, Any]]:
+        """Run a script in a worker; returns the process (stdout/stderr pipes, like Popen) and its startup timing"""
+        start = time.perf_counter()
+        worker = self._acquire()
+        warm = worker is not None
+        if warm:
+            self._spawn_async()
+        else:
+            # Pool exhausted by concurrent runs; pay the startup cost here
+            worker = self._spawn()
+            self._wait_ready(worker)
+        startup_seconds = time.perf_counter() - start
+
+        worker.process.stdin.write(json.dumps({"script": str(script_file), "cwd": cwd, "env": env}) + "\n")
+        worker.process.stdin.close()
+        # The job is sent; communicate() must not touch stdin again
+        worker.process.stdin = None
+
+        with self._lock:
+            self._stats["warm_runs" if warm else "cold_runs"] += 1
+            if warm:
+                self._stats["warm_start_seconds"] += startup_seconds
+        return worker.process, {"warm": warm, "startup_ms": round(startup_seconds * 1000, 2)}
+
+    def _acquire(self) -> Optional[_Worker]:
+        while True:
+            try:
+                worker = self._ready.get_nowait()
+            except queue.Empty:
+                return None
+            if worker.process.poll() is None:
+                return worker
+            self.logger.warning(f"Discarding dead Python worker (exit code {worker.process.returncode})")
+
+    def _spawn_async(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            thread = threading.Thread(target=self._fill, name="python-worker-spawn", daemon=True)
+            self._spawn_threads.add(thread)
+        thread.start()
+
+    def _fill(self) -> None:
+        worker = None
+        try:
+            worker = self._spawn()
+            with self._lock:
+                if self._closed:
+                    os.close(worker.ready_fd)
+                    raise RuntimeError("pool closed")
+                self._starting.add(worker)
+            self._wait_ready(worker)
+            with self._lock:
+                self._starting.discard(worker)
+                if not self._closed:
+                    self._ready.put(worker)
+                    worker = None
+        except Exception as e:
+            if not self._closed:
+                self.logger.warning(f"Failed to start Python worker: {e}")
+        finally:
+            if worker is not None:
+                self._stop(worker)
+            with self._lock:
+                self._spawn_threads.discard(threading.current_thread())
+
+    def _spawn(self) -> _Worker:
+        read_fd, write_fd = os.pipe()
+        try:
+            process = subprocess.Popen(
+                [sys.executable, str(WORKER_SCRIPT), str(write_fd)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                pass_fds=(write_fd,),
+                text=True
+            )
+        finally:
+            os.close(write_fd)
+        return _Worker(process, time.perf_counter(), read_fd)
+
+    def _wait_ready(self, worker: _Worker) -> None:
+        """Block until the worker has finished its imports and record how long that took"""
+        with os.fdopen(worker.ready_fd) as ready:
+            if not ready.readline():
+                raise RuntimeError(f"worker exited during startup (exit code {worker.process.wait()})")
+        worker.ready_seconds = time.perf_counter() - worker.spawned
+        with self._lock:
+            self._stats["spawns"] += 1
+            self._stats["spawn_seconds"] += worker.ready_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Return warm-start versus spawn timings for the run summary"""
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            "size": self.size,
+            "warm_runs": stats["warm_runs"],
+            "cold_runs": stats["cold_runs"],
+            "avg_spawn_ms": round(stats["spawn_seconds"] / stats["spawns"] * 1000, 2) if stats["spawns"] else 0,
+            "avg_warm_start_ms": round(stats["warm_start_seconds"] / stats["warm_runs"] * 1000, 2)
+            if stats["warm_runs"] else 0
+        }
+
+    def close(self) -> None:
+        """Stop idle workers and those still starting; workers already running a script are left to finish"""
+        with self._lock:
+            self._closed = True
+            starting = list(self._starting)
+            threads = list(self._spawn_threads)
+        for worker in starting:
+            # Unblocks the spawn thread waiting for the worker's readiness line
+            worker.process.kill()
+        for thread in threads:
+            thread.join()
+        while True:
+            try:
+                worker = self._ready.get_nowait()
+            except queue.Empty:
+                return
+            self._stop(worker)
+
+    @staticmethod
+    def _stop(worker: _Worker) -> None:
+        worker.process.kill()
+        worker.process.wait()
+        for stream in (worker.process.stdin, worker.process.stdout, worker.process.stderr):
+            if stream:
+                stream.close()
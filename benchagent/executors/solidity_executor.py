@@ -1,6 +1,8 @@
 import os
+import re
 import json
 import logging
+import threading
 import solcx
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
@@ -8,19 +10,33 @@ from web3 import Web3
 from web3.contract import Contract
 
 from core.config import BlockchainConfig
+from core.receipt_tracker import ReceiptTracker, TransactionStuckError
+from core.rpc_proxy import NonceManager
+from .compile_cache import CompileCache
+from .compiler_service import CompilerService, CompilerError
+from .solidity_sources import LibraryIndex, split_sources
+
+STANDARD_OUTPUT_SELECTION = {
+    "*": {"": ["ast"], "*": ["abi", "evm.bytecode.object", "evm.deployedBytecode.object"]}
+}
 
 
 class SolidityExecutor:
     """Solidity executor - responsible for compiling and deploying smart contracts"""
     
-    def __init__(self, blockchain_config: BlockchainConfig, solc_version: str = "0.8.20", task_manager=None):
+    def __init__(self, blockchain_config: BlockchainConfig, solc_version: str = "0.8.20", task_manager=None,
+                 web3: Optional[Web3] = None, compile_cache: Optional[CompileCache] = None,
+                 compiler: Optional[CompilerService] = None, nonce_manager: Optional[NonceManager] = None):
         self.config = blockchain_config
         self.solc_version = solc_version
         self.task_manager = task_manager
+        self.compile_cache = compile_cache
+        # Executors of one run share a compiler pool; a standalone executor gets a single worker
+        self.compiler = compiler or CompilerService(workers=1)
         self.logger = logging.getLogger(__name__)
         
-        # Initialize Web3
-        self.web3 = Web3(Web3.HTTPProvider(self.config.rpc_url))
+        # Initialize Web3 (an in-process chain passes its own instance)
+        self.web3 = web3 or Web3(Web3.HTTPProvider(self.config.rpc_url))
         if not self.web3.is_connected():
             raise ConnectionError("Failed to connect to blockchain network")
         
@@ -28,9 +44,18 @@ class SolidityExecutor:
         self.account = self.web3.eth.account.from_key(self.config.private_key)
         self.web3.eth.default_account = self.account.address
         
+        # Steps of one task may deploy concurrently from this account
+        self._nonce_lock = threading.Lock()
+        self._next_nonce = None
+        # Behind the RPC proxy, nonces are reserved there so scripts on this account get other ones
+        self.nonce_manager = nonce_manager
+        
         # Install and setup Solidity compiler
         self._setup_solc()
         
+        # Installed libraries are read once per process and shared by all executors
+        self.library_index = LibraryIndex.shared()
+        
         # Working directory - use default directory if no task_manager
         if task_manager is None:
             self.work_dir = Path("contracts")
@@ -44,16 +69,16 @@ class SolidityExecutor:
                 self.logger.info(f"Installing Solidity compiler version {self.solc_version}")
                 solcx.install_solc(self.solc_version)
             
-            # Set compiler version to use
-            solcx.set_solc_version(self.solc_version)
-            self.logger.info(f"Using Solidity compiler version: {solcx.get_solc_version()}")
+            # Each compilation runs this version's binary; no global version is set
+            self.logger.info(f"Using Solidity compiler: {self.compiler.executable(self.solc_version)}")
             
         except Exception as e:
             self.logger.error(f"Failed to setup Solidity compiler: {e}")
             raise
     
-    def execute(self, code: str, step_id: str, task_id: str = None, attempt: int = 1) -> Tuple[bool, Dict[str, Any]]:
-        """Execute Solidity code (compile and deploy)"""
+    def execute(self, code: str, step_id: str, task_id: str = None, attempt: int = 1,
+                description: Optional[str] = None) -> Tuple[bool, Dict[str, Any]]:
+        """Execute Solidity code (compile and deploy); contracts named in the description are the deploy targets"""
         try:
             self.logger.info(f"Executing Solidity code for step {step_id} (attempt {attempt})")
             
@@ -81,18 +106,16 @@ class SolidityExecutor:
                 return False, {"error": "Contract compilation failed"}
             
             # Deploy contracts
-            deployment_results = {}
-            all_deployments_successful = True
-            for contract_name, contract_info in compilation_result.items():
-                result = self._deploy_contract(contract_name, contract_info)
-                deployment_results[contract_name] = result
-                if not result.get("success", False):
-                    all_deployments_successful = False
+            targets, skipped = self._select_targets(compilation_result, description)
+            self.logger.info(f"Deploying {list(targets)}, skipping {len(skipped)} contracts")
+            deployment_results = self._deploy_contracts(targets)
+            all_deployments_successful = all(result.get("success", False) for result in deployment_results.values())
             
             result_data = {
                 "type": "solidity_execution",
                 "compiled_contracts": list(compilation_result.keys()),
                 "deployed_contracts": deployment_results,
+                "skipped_contracts": skipped,
                 "source_file": str(contract_file)
             }
             
@@ -107,80 +130,54 @@ class SolidityExecutor:
         try:
             self.logger.info("Compiling Solidity contract...")
             
-            # Set import paths (for dependencies like OpenZeppelin)
-            import_remappings = []
-            
-            # Check if node_modules exists
-            node_modules_path = Path("node_modules")
-            if node_modules_path.exists():
-                # OpenZeppelin
-                oz_path = node_modules_path / "@openzeppelin" / "contracts"
-                if oz_path.exists():
-                    import_remappings.append(f"@openzeppelin/contracts/={oz_path.absolute()}/")
-                    self.logger.info(f"Added OpenZeppelin remapping: {oz_path.absolute()}")
-                
-                # Solady
-                solady_path = node_modules_path / "solady" / "src"
-                if solady_path.exists():
-                    import_remappings.append(f"solady/={solady_path.absolute()}/")
-                    self.logger.info(f"Added Solady remapping: {solady_path.absolute()}")
-                
-                # Solmate
-                solmate_path = node_modules_path / "solmate" / "src"
-                if solmate_path.exists():
-                    import_remappings.append(f"solmate/={solmate_path.absolute()}/")
-                    self.logger.info(f"Added Solmate remapping: {solmate_path.absolute()}")
-                
-                # OpenZeppelin Upgradeable
-                oz_upgradeable_path = node_modules_path / "@openzeppelin" / "contracts-upgradeable"
-                if oz_upgradeable_path.exists():
-                    import_remappings.append(f"@openzeppelin/contracts-upgradeable/={oz_upgradeable_path.absolute()}/")
-                    self.logger.info(f"Added OpenZeppelin Upgradeable remapping: {oz_upgradeable_path.absolute()}")
-                
-                # Uniswap V2
-                uniswap_v2_core_path = node_modules_path / "@uniswap" / "v2-core" / "contracts"
-                if uniswap_v2_core_path.exists():
-                    import_remappings.append(f"@uniswap/v2-core/={uniswap_v2_core_path.absolute()}/")
-                    self.logger.info(f"Added Uniswap V2 Core remapping: {uniswap_v2_core_path.absolute()}")
-                
-                uniswap_v2_periphery_path = node_modules_path / "@uniswap" / "v2-periphery" / "contracts"
-                if uniswap_v2_periphery_path.exists():
-                    import_remappings.append(f"@uniswap/v2-periphery/={uniswap_v2_periphery_path.absolute()}/")
-                    self.logger.info(f"Added Uniswap V2 Periphery remapping: {uniswap_v2_periphery_path.absolute()}")
-                
-                # Chainlink (if installed in the future)
-                chainlink_path = node_modules_path / "@chainlink" / "contracts"
-                if chainlink_path.exists():
-                    import_remappings.append(f"@chainlink/contracts/={chainlink_path.absolute()}/")
-                    self.logger.info(f"Added Chainlink remapping: {chainlink_path.absolute()}")
-            
-            # Compilation parameters
-            compile_kwargs = {
-                "output_values": ["abi", "bin", "bin-runtime"],
-                "solc_version": self.solc_version,
-            }
+            # Step files plus the library sources they import, read from the in-memory index
+            sources = split_sources(code)
+            standard_input, unresolved = self.library_index.standard_input(sources, STANDARD_OUTPUT_SELECTION)
+            if unresolved:
+                self.logger.warning(f"Imports not found in node_modules: {unresolved}")
+            self.logger.info(f"Compiling {len(sources)} step files with "
+                             f"{len(standard_input['sources']) - len(sources)} library sources")
             
-            if import_remappings:
-                compile_kwargs["import_remappings"] = import_remappings
-                compile_kwargs["allow_paths"] = str(node_modules_path.absolute())
+            # Identical sources compile to identical artifacts
+            cache_key = None
+            if self.compile_cache:
+                cache_key = self.compile_cache.make_key(standard_input, self.solc_version)
+                cached = self.compile_cache.get(cache_key)
+                if cached is not None:
+                    self.logger.info(f"Compile cache hit, reusing {len(cached)} contracts: {list(cached.keys())}")
+                    return cached
             
             # Execute compilation
-            compiled = solcx.compile_source(code, **compile_kwargs)
+            compiled = self.compiler.compile(standard_input, self.solc_version)
+            for message in compiled.get("errors", []):
+                if message.get("severity") == "warning":
+                    self.logger.debug(message.get("formattedMessage", message.get("message")))
             
-            # Process compilation results
+            # Process compilation results; step files come last so their names win over library ones
+            definitions = self._contract_definitions(compiled)
+            compiled_contracts = compiled.get("contracts", {})
             contracts = {}
-            for contract_id, contract_data in compiled.items():
-                # contract_id format is '<stdin>:ContractName'
-                contract_name = contract_id.split(':')[-1]
-                contracts[contract_name] = {
-                    "abi": contract_data["abi"],
-                    "bytecode": contract_data["bin"],
-                    "runtime_bytecode": contract_data.get("bin-runtime", "")
-                }
+            for source_name in sorted(compiled_contracts, key=lambda name: name in sources):
+                for contract_name, contract_data in compiled_contracts[source_name].items():
+                    evm = contract_data.get("evm", {})
+                    kind, bases = definitions.get((source_name, contract_name), ("contract", []))
+                    contracts[contract_name] = {
+                        "abi": contract_data.get("abi", []),
+                        "bytecode": evm.get("bytecode", {}).get("object", ""),
+                        "runtime_bytecode": evm.get("deployedBytecode", {}).get("object", ""),
+                        "kind": kind,
+                        "bases": bases,
+                        "from_step": source_name in sources
+                    }
             
             self.logger.info(f"Successfully compiled {len(contracts)} contracts: {list(contracts.keys())}")
+            if cache_key:
+                self.compile_cache.put(cache_key, contracts)
             return contracts
-            
+
+        except CompilerError as e:
+            self.logger.error(f"Contract compilation failed: {e}")
+            return None
         except Exception as e:
             self.logger.error(f"Contract compilation failed: {e}")
             if hasattr(e, 'stdout') and e.stdout:
@@ -189,73 +186,167 @@ class SolidityExecutor:
                 self.logger.error(f"Compiler stderr: {e.stderr}")
             return None
     
-    def _deploy_contract(self, contract_name: str, contract_info: Dict[str, Any]) -> Dict[str, Any]:
-        """Deploy single contract"""
-        try:
-            self.logger.info(f"Deploying contract: {contract_name}")
-            
-            # Create contract object
-            contract = self.web3.eth.contract(
-                abi=contract_info["abi"],
-                bytecode=contract_info["bytecode"]
-            )
-            
-            # Estimate gas
+    @staticmethod
+    def _contract_definitions(compiled: Dict[str, Any]) -> Dict[Tuple[str, str], Tuple[str, list]]:
+        """Read each contract's kind and ancestors from the AST: {(source, name): (kind, base names)}"""
+        contract_nodes = [
+            (source_name, node)
+            for source_name, source_output in compiled.get("sources", {}).items()
+            for node in source_output.get("ast", {}).get("nodes", [])
+            if node.get("nodeType") == "ContractDefinition"
+        ]
+        # AST ids are unique across one compilation
+        names = {node["id"]: node["name"] for _, node in contract_nodes}
+        definitions = {}
+        for source_name, node in contract_nodes:
+            kind = "abstract" if node.get("abstract") else node.get("contractKind", "contract")
+            bases = [names[node_id] for node_id in node.get("linearizedBaseContracts", [])[1:] if node_id in names]
+            definitions[(source_name, node["name"])] = (kind, bases)
+        return definitions
+    
+    def _select_targets(self, contracts: Dict[str, Any],
+                        description: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Choose the contracts to deploy: concrete contracts from the step's own files that no other
+        step contract inherits, or only those named in the step description"""
+        targets, skipped = {}, {}
+        inherited = {base for info in contracts.values() if info.get("from_step", True)
+                     for base in info.get("bases", [])}
+        for name, info in contracts.items():
+            if not info.get("from_step", True):
+                skipped[name] = "imported"
+            elif info.get("kind", "contract") != "contract" or not info["bytecode"]:
+                skipped[name] = info.get("kind", "abstract")
+            elif name in inherited:
+                skipped[name] = "base contract"
+            else:
+                targets[name] = info
+        
+        # An explicit contract name in the step narrows the targets
+        if description:
+            named = {name: info for name, info in contracts.items()
+                     if info.get("from_step", True) and info["bytecode"] and info.get("kind", "contract") == "contract"
+                     and re.search(rf"\b{re.escape(name)}\b", description)}
+            if named:
+                for name in targets:
+                    if name not in named:
+                        skipped[name] = "not named in step"
+                for name in named:
+                    skipped.pop(name, None)
+                targets = named
+        return targets, skipped
+    
+    def _reserve_nonces(self, count: int = 1) -> list:
+        """Hand out consecutive nonces for this account, never the same one twice"""
+        with self._nonce_lock:
+            nonce = self.web3.eth.get_transaction_count(self.account.address, "pending")
+            if self.nonce_manager is not None:
+                return self.nonce_manager.reserve(self.account.address.lower(), nonce, count)
+            if self._next_nonce is not None:
+                nonce = max(nonce, self._next_nonce)
+            self._next_nonce = nonce + count
+            return list(range(nonce, nonce + count))
+    
+    def _release_nonces(self, nonces: list) -> None:
+        """Give back reserved nonces that were not sent"""
+        if self.nonce_manager is not None and nonces:
+            self.nonce_manager.release(self.account.address.lower(), nonces)
+    
+    def reset_nonce(self):
+        """Resynchronise with the chain after a transaction could not be sent"""
+        with self._nonce_lock:
+            self._next_nonce = None
+    
+    def _deploy_contracts(self, targets: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Deploy contracts: sign with consecutive nonces, send back to back, then await all receipts"""
+        results = {}
+        if not targets:
+            return results
+        
+        # Get current gas price
+        gas_price = int(self.web3.eth.gas_price * self.config.gas_price_multiplier)
+        nonces = self._reserve_nonces(len(targets))
+        
+        sent = {}
+        for (contract_name, contract_info), nonce in zip(targets.items(), nonces):
             try:
-                gas_estimate = contract.constructor().estimate_gas()
-                gas_limit = int(gas_estimate * 1.2)  # Add 20% margin
-            except Exception:
-                gas_limit = self.config.gas_limit
-                self.logger.warning(f"Failed to estimate gas, using default: {gas_limit}")
-            
-            # Get current gas price
-            gas_price = int(self.web3.eth.gas_price * self.config.gas_price_multiplier)
-            
-            # Get nonce
-            nonce = self.web3.eth.get_transaction_count(self.account.address)
-            
-            # Build deployment transaction
-            deploy_txn = contract.constructor().build_transaction({
-                'from': self.account.address,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'nonce': nonce,
-                'chainId': self.config.chain_id
-            })
-            
-            # Sign transaction
-            signed_txn = self.account.sign_transaction(deploy_txn)
-            
-            # Send transaction
-            tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            self.logger.info(f"Deployment transaction sent: {tx_hash.hex()}")
-            
-            # Wait for transaction confirmation
-            tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
-            
-            if tx_receipt.status == 1:
+                self.logger.info(f"Deploying contract: {contract_name}")
+                signed_txn = self._sign_deployment(contract_info, gas_price, nonce)
+                sent[contract_name] = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                self.logger.info(f"Deployment transaction sent: {sent[contract_name].hex()}")
+            except Exception as e:
+                # Later nonces would wait forever behind the gap, so stop sending
+                self.reset_nonce()
+                self.logger.error(f"Contract deployment failed: {e}")
+                results[contract_name] = {"success": False, "error": str(e), "error_type": type(e).__name__}
+                break
+        self._release_nonces(nonces[len(sent):])
+        for contract_name in targets:
+            if contract_name not in sent and contract_name not in results:
+                results[contract_name] = {"success": False, "error": "Not sent: an earlier deployment failed"}
+        
+        receipts = self._wait_for_receipts(list(sent.values()), timeout=300)
+        for contract_name, tx_hash in sent.items():
+            tx_receipt = receipts.get(tx_hash)
+            if isinstance(tx_receipt, TransactionStuckError):
+                self.logger.error(f"Contract {contract_name} deployment is stuck: {tx_receipt.reason}")
+                results[contract_name] = {
+                    "success": False,
+                    "error": str(tx_receipt),
+                    "error_type": "TransactionStuckError",
+                    "transaction_hash": tx_hash.hex()
+                }
+            elif tx_receipt is None:
+                self.logger.error(f"Contract {contract_name} deployment was not mined in time")
+                results[contract_name] = {
+                    "success": False,
+                    "error": "Transaction not mined within 300 seconds",
+                    "transaction_hash": tx_hash.hex()
+                }
+            elif tx_receipt.status == 1:
                 contract_address = tx_receipt.contractAddress
                 self.logger.info(f"Contract {contract_name} deployed successfully at: {contract_address}")
-                
-                return {
+                results[contract_name] = {
                     "success": True,
                     "address": contract_address,
                     "transaction_hash": tx_hash.hex(),
                     "gas_used": tx_receipt.gasUsed,
-                    "abi": contract_info["abi"]
+                    "abi": targets[contract_name]["abi"]
                 }
             else:
                 self.logger.error(f"Contract deployment failed: transaction reverted")
-                return {
+                results[contract_name] = {
                     "success": False,
                     "error": "Transaction reverted",
                     "transaction_hash": tx_hash.hex()
                 }
-                
-        except Exception as e:
-            self.logger.error(f"Contract deployment failed: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "error_type": type(e).__name__
-            }
\ No newline at end of file
+        return {contract_name: results[contract_name] for contract_name in targets}
+    
+    def _sign_deployment(self, contract_info: Dict[str, Any], gas_price: int, nonce: int):
+        """Build and sign a deployment transaction"""
+        contract = self.web3.eth.contract(
+            abi=contract_info["abi"],
+            bytecode=contract_info["bytecode"]
+        )
+        
+        # Estimate gas
+        try:
+            gas_estimate = contract.constructor().estimate_gas()
+            gas_limit = int(gas_estimate * 1.2)  # Add 20% margin
+        except Exception:
+            gas_limit = self.config.gas_limit
+            self.logger.warning(f"Failed to estimate gas, using default: {gas_limit}")
+        
+        deploy_txn = contract.constructor().build_transaction({
+            'from': self.account.address,
+            'gas': gas_limit,
+            'gasPrice': gas_price,
+            'nonce': nonce,
+            'chainId': self.config.chain_id
+        })
+        return self.account.sign_transaction(deploy_txn)
+    
+    def _wait_for_receipts(self, tx_hashes: list, timeout: float) -> Dict[Any, Any]:
+        """Wait for several receipts at once on the chain's shared receipt tracker"""
+        tracker = ReceiptTracker.for_chain(self.web3, self.config.rpc_url, self.config.receipt_stuck_blocks,
+                                           self.config.receipt_stuck_seconds)
+        return tracker.wait(tx_hashes, timeout)
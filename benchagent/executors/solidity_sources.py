@@ -0,0 +1,133 @@
+import re
+import hashlib
+import logging
+import posixpath
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:[^;]*?\bfrom\s+)?["\']([^"\']+)["\'](?:\s+as\s+\w+)?\s*;', re.MULTILINE)
+FILE_MARKER_PATTERN = re.compile(r'^[ \t]*//[ \t]*File:[ \t]*(\S+\.sol)[ \t]*$', re.MULTILINE)
+
+# Import prefix -> directory under node_modules
+LIBRARY_ROOTS = {
+    "@openzeppelin/contracts/": "@openzeppelin/contracts",
+    "@openzeppelin/contracts-upgradeable/": "@openzeppelin/contracts-upgradeable",
+    "solady/": "solady/src",
+    "solmate/": "solmate/src",
+    "@uniswap/v2-core/": "@uniswap/v2-core/contracts",
+    "@uniswap/v2-periphery/": "@uniswap/v2-periphery/contracts",
+    "@chainlink/contracts/": "@chainlink/contracts",
+}
+
+
+@dataclass
+class SourceFile:
+    """One library source file, addressed by its import path"""
+    content: str
+    sha256: str
+    imports: List[str] = field(default_factory=list)
+
+
+def split_sources(code: str, default_name: str = "Contract.sol") -> Dict[str, str]:
+    """Split generated code into files on `// File: Name.sol` lines.
+
+    Code without markers is a single file; text before the first marker goes
+    into the first file.
+    """
+    markers = list(FILE_MARKER_PATTERN.finditer(code))
+    if not markers:
+        return {default_name: code}
+
+    sources = {}
+    for number, marker in enumerate(markers):
+        end = markers[number + 1].start() if number + 1 < len(markers) else len(code)
+        start = 0 if number == 0 else marker.start()
+        name = posixpath.normpath(marker.group(1).lstrip("./"))
+        sources[name] = code[start:end].strip() + "\n"
+    return sources
+
+
+def resolve_import(import_path: str, importer: str) -> str:
+    """Resolve an import to a source unit name; relative imports are relative to the importer"""
+    if import_path.startswith("."):
+        return posixpath.normpath(posixpath.join(posixpath.dirname(importer), import_path))
+    return import_path
+
+
+class LibraryIndex:
+    """Library index - the installed Solidity libraries, read once and kept in memory.
+
+    Files are keyed by the import path contracts use (e.g.
+    ``@openzeppelin/contracts/token/ERC20/ERC20.sol``) together with their hash
+    and resolved imports, so compilations get their sources without touching
+    the filesystem.
+    """
+
+    _shared: Dict[str, 'LibraryIndex'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, node_modules: str = "node_modules"):
+        self.node_modules = Path(node_modules)
+        self.logger = logging.getLogger(__name__)
+        self.files: Dict[str, SourceFile] = {}
+        self.libraries: Dict[str, Path] = {}
+        self._build()
+
+    @classmethod
+    def shared(cls, node_modules: str = "node_modules") -> 'LibraryIndex':
+        """Return the process-wide index for a node_modules directory, building it on first use"""
+        key = str(Path(node_modules).absolute())
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(node_modules)
+            return cls._shared[key]
+
+    def _build(self) -> None:
+        for prefix, relative_root in LIBRARY_ROOTS.items():
+            root = self.node_modules / relative_root
+            if not root.is_dir():
+                continue
+            self.libraries[prefix] = root
+            for file_path in root.rglob("*.sol"):
+                name = prefix + file_path.relative_to(root).as_posix()
+                content = file_path.read_text(encoding="utf-8", errors="replace")
+                self.files[name] = SourceFile(
+                    content=content,
+                    sha256=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                    imports=[resolve_import(path, name) for path in IMPORT_PATTERN.findall(content)]
+                )
+        self.logger.info(f"Indexed {len(self.files)} library sources from {list(self.libraries)}")
+
+    def standard_input(self, sources: Dict[str, str],
+                       output_selection: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Build solc standard-JSON input for the given files plus every library file they need.
+
+        Returns the input and the imports that could not be resolved (solc reports those).
+        """
+        units = {name: {"content": content} for name, content in sources.items()}
+        unresolved = []
+        pending = [resolve_import(path, name) for name, content in sources.items()
+                   for path in IMPORT_PATTERN.findall(content)]
+        while pending:
+            name = pending.pop()
+            if name in units:
+                continue
+            library_file = self.files.get(name)
+            if library_file is None:
+                unresolved.append(name)
+                continue
+            units[name] = {"content": library_file.content}
+            pending.extend(library_file.imports)
+
+        standard_input = {
+            "language": "Solidity",
+            "sources": units,
+            "settings": {"outputSelection": output_selection}
+        }
+        return standard_input, sorted(set(unresolved))
+
+    def source_hash(self, name: str) -> Optional[str]:
+        library_file = self.files.get(name)
+        return library_file.sha256 if library_file else None
@@ -92,6 +92,31 @@ def main():
         help="Log level (default: INFO)"
     )
     
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of tasks to run in parallel, each with its own worker account (overrides max_workers)"
+    )
+    
+    parser.add_argument(
+        "--backend",
+        choices=["rpc", "inprocess"],
+        help="Chain backend: a node at rpc_url, or an embedded eth-tester chain (overrides blockchain.backend)"
+    )
+    
+    parser.add_argument(
+        "--replan",
+        action="store_true",
+        help="Ignore cached task plans and plan every task again (fresh plans are still cached)"
+    )
+    
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="RUN_ID",
+        help="Serve LLM responses recorded in a previous run (run id under the output dir, or its path)"
+    )
+    
     parser.add_argument(
         "--dry-run", 
         action="store_true",
@@ -100,6 +125,7 @@ def main():
     
     args = parser.parse_args()
     
+    agent = None
     try:
         # Load environment variables (if .env file exists)
         if Path(".env").exists():
@@ -113,8 +139,15 @@ def main():
             print(f"Loading configuration from: {args.config}")
             config = BenchmarkConfig.from_file(args.config)
         
+        if args.workers is not None:
+            config.max_workers = args.workers
+        if args.backend:
+            config.blockchain.backend = args.backend
+        if args.replay:
+            config.replay_run = args.replay
+        
         # Create benchmark agent (this creates timestamped output directory)
-        agent = BenchmarkAgent(config)
+        agent = BenchmarkAgent(config, replan=args.replan)
         
         # Setup logging (use actual output directory created by agent)
         logger = setup_logging(str(agent.task_manager.output_dir), args.log_level)
@@ -165,6 +198,9 @@ def main():
             import traceback
             traceback.print_exc()
         return 1
+    finally:
+        if agent is not None:
+            agent.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+from dataclasses import replace
+
+import pytest
+
+from core.account_pool import AccountPool
+from core.config import BlockchainConfig
+
+MNEMONIC = "test test test test test test test test test test test junk"
+# First two accounts of the mnemonic above (the Hardhat/Anvil defaults)
+MNEMONIC_ADDRESSES = ["0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266", "0x70997970C51812dc3A010C7d01b50e0d17dc79C8"]
+KEYS = ["0x" + "11" * 32, "0x" + "22" * 32, "0x" + "33" * 32]
+
+
+def test_accounts_are_derived_from_the_mnemonic():
+    pool = AccountPool(BlockchainConfig(mnemonic=MNEMONIC), 2)
+    assert [account.address for account in pool.accounts] == MNEMONIC_ADDRESSES
+
+
+def test_explicit_keys_take_precedence_over_the_mnemonic():
+    pool = AccountPool(BlockchainConfig(mnemonic=MNEMONIC, worker_private_keys=KEYS), 2)
+    assert len(pool) == 2
+    assert [config.private_key for config in pool.worker_configs()] == KEYS[:2]
+
+
+def test_worker_configs_use_distinct_accounts():
+    base = BlockchainConfig(rpc_url="http://node", private_key=KEYS[0], chain_id=5)
+    configs = AccountPool(replace(base, worker_private_keys=KEYS), 3).worker_configs()
+    assert len({config.sender_address for config in configs}) == 3
+    assert all(config.rpc_url == "http://node" and config.chain_id == 5 for config in configs)
+
+
+def test_missing_accounts_shrink_the_pool():
+    assert len(AccountPool(BlockchainConfig(worker_private_keys=KEYS[:1]), 3)) == 1
+    assert len(AccountPool(BlockchainConfig(), 3)) == 0
+
+
+def test_workers_are_funded_up_to_the_target():
+    pytest.importorskip("eth_tester")
+    from executors.evm_backend import InProcessChain
+
+    chain = InProcessChain(BlockchainConfig(backend="inprocess"))
+    try:
+        config = replace(chain.blockchain_config, worker_private_keys=KEYS[:2], worker_funding_eth=2)
+        pool = AccountPool(config, 2)
+        pool.fund_workers(chain.web3)
+        pool.fund_workers(chain.web3)
+        target = chain.web3.to_wei(2, "ether")
+        assert [chain.web3.eth.get_balance(account.address) for account in pool.accounts] == [target, target]
+    finally:
+        chain.close()
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from core.chain_snapshot import ChainSnapshots
+
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = []
+        self._next_id = 0
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        if method == "evm_snapshot":
+            self._next_id += 1
+            return {"result": hex(self._next_id)}
+        return {"result": True}
+
+
+def make_snapshots():
+    provider = FakeProvider()
+    return ChainSnapshots(SimpleNamespace(provider=provider)), provider
+
+
+def test_failed_attempt_alone_is_reverted():
+    snapshots, provider = make_snapshots()
+    timings = snapshots.release(snapshots.take(), revert=True)
+    assert timings["reverted"] is True
+    assert provider.calls == ["evm_snapshot", "evm_revert"]
+
+
+def test_successful_attempt_is_kept():
+    snapshots, provider = make_snapshots()
+    timings = snapshots.release(snapshots.take(), revert=False)
+    assert timings["reverted"] is False
+    assert "evm_revert" not in provider.calls
+
+
+def test_no_revert_while_another_attempt_runs():
+    snapshots, provider = make_snapshots()
+    first = snapshots.take()
+    second = snapshots.take()
+    assert snapshots.release(first, revert=True)["revert_skipped"]
+    snapshots.release(second, revert=False)
+    assert "evm_revert" not in provider.calls
+
+
+def test_no_revert_over_an_attempt_that_committed_during_the_window():
+    snapshots, provider = make_snapshots()
+    # B is in flight when A takes its snapshot, B succeeds, then A fails
+    b = snapshots.take()
+    a = snapshots.take()
+    snapshots.release(b, revert=False)
+    timings = snapshots.release(a, revert=True)
+    assert timings["reverted"] is False
+    assert timings["revert_skipped"]
+    assert "evm_revert" not in provider.calls
+
+
+def test_no_revert_when_a_later_attempt_started_and_finished():
+    snapshots, provider = make_snapshots()
+    a = snapshots.take()
+    snapshots.release(snapshots.take(), revert=True)
+    assert snapshots.release(a, revert=True)["revert_skipped"]
+    assert provider.calls.count("evm_revert") == 0
+
+
+def test_failed_snapshot_runs_without_one():
+    snapshots, provider = make_snapshots()
+    provider.make_request = lambda method, params: {"error": {"message": "unsupported"}}
+    assert snapshots.take() is None
+    assert snapshots.release(None, revert=True) == {"snapshot": False}
+    assert snapshots._active == 0
@@ -0,0 +1,43 @@
+from core.llm_client import CodeFenceParser
+
+
+def feed_chunks(parser, text, size):
+    for start in range(0, len(text), size):
+        if parser.feed(text[start:start + size]):
+            return True
+    return False
+
+
+def test_completes_at_the_first_closed_block_across_chunk_boundaries():
+    text = "Here:\n```python\nprint('a')\n```\nSome prose\n```python\nprint('b')\n```\n"
+    for size in (1, 2, 3, 7, len(text)):
+        parser = CodeFenceParser("python")
+        assert feed_chunks(parser, text, size)
+        assert parser.finish() == "Here:\n```python\nprint('a')\n```\n"
+
+
+def test_blocks_in_other_languages_are_ignored():
+    parser = CodeFenceParser("solidity")
+    assert not parser.feed("```json\n{}\n```\n")
+    assert parser.feed("```solidity\ncontract A {}\n```\n")
+    assert parser.finish().endswith("```solidity\ncontract A {}\n```\n")
+
+
+def test_closing_fence_needs_a_terminated_line():
+    parser = CodeFenceParser("python")
+    assert not parser.feed("```python\nx = 1\n```")
+    assert not parser.complete
+    assert parser.feed("\n")
+
+
+def test_stop_sequence_closes_an_open_block():
+    parser = CodeFenceParser("python")
+    parser.feed("```python\nx = 1")
+    assert parser.finish(stopped=True) == "```python\nx = 1\n```\n"
+
+
+def test_unfinished_block_is_returned_as_is():
+    parser = CodeFenceParser("python")
+    parser.feed("```python\nx = 1")
+    assert parser.finish() == "```python\nx = 1"
+    assert not parser.complete
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from core.config import LLMConfig
+from core.llm_client import CodeFenceParser, LLMClient
+
+
+def chunk(content=None, finish_reason=None):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=None)
+
+
+def usage_chunk():
+    usage = SimpleNamespace(completion_tokens=5, prompt_tokens=7, total_tokens=12)
+    return SimpleNamespace(choices=[], usage=usage)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.chunks:
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+class StreamingOpenAI:
+    """Stands in for openai.AsyncOpenAI: replays a reply, honouring stop sequences like the API does"""
+
+    def __init__(self, reply, rejects_stream_options=False):
+        self.reply = reply
+        self.rejects_stream_options = rejects_stream_options
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.requests.append(request)
+        if self.rejects_stream_options and "stream_options" in request:
+            error = openai.BadRequestError.__new__(openai.BadRequestError)
+            Exception.__init__(error, "Unrecognized request argument supplied: stream_options")
+            raise error
+        text = self.reply
+        for stop in request.get("stop") or []:
+            if stop in text:
+                text = text[:text.index(stop)]
+        chunks = [chunk(text[start:start + 5]) for start in range(0, len(text), 5)]
+        chunks.append(chunk(finish_reason="stop"))
+        if "stream_options" in request:
+            chunks.append(usage_chunk())
+        return FakeStream(chunks)
+
+    async def close(self):
+        pass
+
+
+def generate(reply, language="python", **config):
+    client = LLMClient(LLMConfig(model="test", api_key="test", **config))
+    client.client = StreamingOpenAI(reply)
+    try:
+        content = client.chat_completion([{"role": "user", "content": "write code"}], code_language=language)
+        return content, client.client.requests
+    finally:
+        client.close()
+
+
+def test_stop_sequence_ends_the_reply_at_the_first_block():
+    content, requests = generate("Here:\n```python\nprint(1)\n```\nAnd an explanation.")
+    assert content == "Here:\n```python\nprint(1)\n```\n"
+    assert len(requests) == 1
+    assert requests[0]["stop"] == [CodeFenceParser.STOP_SEQUENCE]
+
+
+def test_unlabelled_opening_fence_is_retried_without_the_stop_sequence():
+    reply = "Here is the script:\n```\nprint(1)\n```\n"
+    content, requests = generate(reply)
+    assert [("stop" in request) for request in requests] == [True, False]
+    assert content == reply
+
+
+def test_block_of_another_language_is_retried_without_the_stop_sequence():
+    reply = "Config:\n```json\n{}\n```\nScript:\n```python\nprint(1)\n```\n"
+    content, requests = generate(reply)
+    assert len(requests) == 2
+    assert content == reply
+
+
+def test_stream_options_are_dropped_once_rejected():
+    client = LLMClient(LLMConfig(model="test", api_key="test"))
+    client.client = StreamingOpenAI("```python\nprint(1)\n```\n", rejects_stream_options=True)
+    try:
+        for _ in range(2):
+            assert client.chat_completion([{"role": "user", "content": "x"}], code_language="python").startswith("```python")
+        assert ["stream_options" in request for request in client.client.requests] == [True, False, False]
+    finally:
+        client.close()
+
+
+def test_stream_usage_can_be_turned_off():
+    content, requests = generate("```python\nprint(1)\n```\n", stream_usage=False)
+    assert "stream_options" not in requests[0]
+
+
+@pytest.mark.parametrize("stop_at_fence", [True, False])
+def test_usage_is_recorded_from_the_final_chunk(stop_at_fence):
+    records = []
+    client = LLMClient(LLMConfig(model="test", api_key="test", stop_at_fence=stop_at_fence),
+                       task_manager=SimpleNamespace(save_llm_interaction=records.append))
+    client.client = StreamingOpenAI("```python\nprint(1)\n```\n")
+    client.chat_completion([{"role": "user", "content": "x"}], code_language="python")
+    client.close()
+    usage = records[0]["response"]["usage"]
+    # Without the stop sequence the stream is closed at the fence, before the usage chunk
+    assert usage["total_tokens"] == (12 if stop_at_fence else None)
+    assert usage["stopped_at_fence"]
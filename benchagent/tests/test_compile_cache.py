@@ -0,0 +1,45 @@
+import pytest
+
+from executors.compile_cache import CompileCache
+
+SETTINGS = {"optimizer": {"enabled": False}, "outputSelection": {"*": {"*": ["abi"]}}}
+
+
+def standard_input(sources, settings=SETTINGS):
+    return {"language": "Solidity", "sources": {name: {"content": content} for name, content in sources.items()},
+            "settings": settings}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompileCache(str(tmp_path))
+
+
+def test_key_covers_sources_imports_version_and_settings(cache):
+    base = {"main.sol": "contract A {}", "@openzeppelin/Ownable.sol": "contract Ownable {}"}
+    key = cache.make_key(standard_input(base), "0.8.20")
+    assert key == cache.make_key(standard_input(dict(reversed(list(base.items())))), "0.8.20")
+    changed = [
+        cache.make_key(standard_input({**base, "main.sol": "contract B {}"}), "0.8.20"),
+        cache.make_key(standard_input({**base, "@openzeppelin/Ownable.sol": "contract Owned {}"}), "0.8.20"),
+        cache.make_key(standard_input({**base, "other.sol": "contract C {}"}), "0.8.20"),
+        cache.make_key(standard_input(base), "0.8.21"),
+        cache.make_key(standard_input(base, {**SETTINGS, "optimizer": {"enabled": True}}), "0.8.20"),
+    ]
+    assert len({key, *changed}) == 6
+
+
+def test_artifacts_round_trip(cache):
+    contracts = {"A": {"abi": [], "bytecode": "0x00", "runtime_bytecode": "0x"}}
+    assert cache.get("key") is None
+    cache.put("key", contracts)
+    assert cache.get("key") == contracts
+    assert not list(cache.cache_dir.glob("*.tmp"))
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["hit_rate"]) == (1, 1, 1, 50)
+
+
+def test_unreadable_entries_are_discarded(cache):
+    (cache.cache_dir / "broken.json").write_text("{", encoding="utf-8")
+    assert cache.get("broken") is None
+    assert not (cache.cache_dir / "broken.json").exists()
@@ -0,0 +1,84 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+from executors.compiler_service import CompilerBusyError, CompilerError, CompilerService, CompilerTimeoutError
+
+# Stands in for solc --standard-json: reports its version, or fails/hangs when the source asks for it
+FAKE_SOLC = textwrap.dedent("""\
+    import json, sys, time
+    source = json.load(sys.stdin)["sources"]["Main.sol"]["content"]
+    if "hang" in source:
+        time.sleep(30)
+    if "broken" in source:
+        print(json.dumps({"errors": [{"severity": "error", "formattedMessage": "ParserError: broken"}]}))
+    elif "crash" in source:
+        sys.exit("segfault")
+    else:
+        print(json.dumps({"errors": [{"severity": "warning", "message": "unused"}], "version": sys.argv[1]}))
+""")
+VERSIONS = ("0.8.20", "0.8.24")
+
+
+def standard_input(source="contract A {}"):
+    return {"language": "Solidity", "sources": {"Main.sol": {"content": source}}, "settings": {}}
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    script = tmp_path / "fake_solc.py"
+    script.write_text(FAKE_SOLC, encoding="utf-8")
+    binaries = {}
+    for version in VERSIONS:
+        binary = tmp_path / f"solc-{version}"
+        binary.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {version}\n', encoding="utf-8")
+        os.chmod(binary, 0o755)
+        binaries[version] = str(binary)
+    services = []
+
+    def make(**options):
+        service = CompilerService(**options)
+        service._executables.update(binaries)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+
+def test_each_request_runs_its_own_version(make_service):
+    service = make_service(workers=2)
+    futures = [service.submit(standard_input(), version) for version in VERSIONS * 2]
+    assert [future.result(timeout=30)["version"] for future in futures] == list(VERSIONS * 2)
+    stats = service.stats()
+    assert (stats["requests"], stats["completed"], stats["failed"]) == (4, 4, 0)
+
+
+def test_compiler_errors_carry_the_error_entries(make_service):
+    service = make_service(workers=1)
+    with pytest.raises(CompilerError, match="ParserError: broken") as error:
+        service.compile(standard_input("broken"), "0.8.20")
+    assert error.value.errors[0]["severity"] == "error"
+    with pytest.raises(CompilerError, match="segfault"):
+        service.compile(standard_input("crash"), "0.8.20")
+    assert service.stats()["failed"] == 2
+
+
+def test_slow_compilations_are_killed(make_service):
+    service = make_service(workers=1, timeout=0.5)
+    with pytest.raises(CompilerTimeoutError):
+        service.compile(standard_input("hang"), "0.8.20")
+    assert service.stats()["timeouts"] == 1
+
+
+def test_full_queue_rejects_new_requests(make_service):
+    # Without workers nothing drains the queue
+    service = make_service(workers=0, queue_size=1, timeout=0.2)
+    queued = service.submit(standard_input(), "0.8.20")
+    with pytest.raises(CompilerBusyError):
+        service.submit(standard_input(), "0.8.20")
+    assert not queued.done()
+    assert service.stats()["rejected"] == 1
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from core.code_generator import CodeGenerator, estimate_tokens, format_abi_signature
+from core.types import StepType, TaskStep
+
+
+def function(name, inputs=(), outputs=(), mutability="nonpayable"):
+    return {"type": "function", "name": name, "stateMutability": mutability,
+            "inputs": [{"type": t, "name": n} for t, n in inputs],
+            "outputs": [{"type": t, "name": n} for t, n in outputs]}
+
+
+def contract(step_id, names):
+    return {"address": "0x" + step_id.encode().hex().ljust(40, "0"), "step_id": step_id,
+            "abi": [function(name, [("address", "to"), ("uint256", "amount")], [("bool", "")]) for name in names]}
+
+
+def context(contracts=3, functions=15, outputs=3):
+    return {
+        "deployed_contracts": {f"Token{i}": contract(f"step_{i}", [f"call{i}_{j}" for j in range(functions)])
+                               for i in range(contracts)},
+        "previous_outputs": {f"step_{i}": "x" * 300 for i in range(outputs)},
+    }
+
+
+def render(budget, step=None, ctx=None):
+    generator = CodeGenerator.__new__(CodeGenerator)
+    generator.context_token_budget = budget
+    generator.logger = logging.getLogger("test")
+    return generator._format_context(ctx or context(), step)[0]
+
+
+def test_signatures_are_rendered_like_solidity():
+    assert format_abi_signature(function("transfer", [("address", "to"), ("uint256", "value")], [("bool", "")])) \
+        == "function transfer(address to, uint256 value) returns (bool)"
+
+
+@pytest.mark.parametrize("budget", [0, 40, 60, 80, 120, 200, 400, 800])
+def test_rendered_context_never_exceeds_the_budget(budget):
+    text = render(budget)
+    if budget:
+        assert estimate_tokens(text) <= budget
+    else:
+        assert text.count("  function ") == 45
+
+
+def test_contracts_are_kept_or_dropped_whole():
+    text = render(120)
+    assert any(f"Contract: Token{i} " not in text for i in range(3))
+    for i in range(3):
+        if f"Contract: Token{i} " not in text:
+            assert f"call{i}_" not in text
+    assert "lower-priority context entries omitted" in text
+
+
+def test_relevant_contracts_come_first():
+    step = TaskStep("step_9", "Call call2_7 on Token2", StepType.PYTHON, dependencies=["step_1"])
+    text = render(160, step)
+    assert "Contract: Token2 " in text and "function call2_7(" in text
+    assert "Contract: Token0 " not in text
+
+
+def test_omitted_abi_entries_are_noted_under_their_contract():
+    text = render(200, ctx=context(contracts=1, functions=40, outputs=0))
+    assert "Contract: Token0 " in text
+    assert "more ABI entries omitted" in text
+    assert estimate_tokens(text) <= 200
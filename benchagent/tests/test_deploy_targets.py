@@ -0,0 +1,90 @@
+import logging
+
+from executors.solidity_executor import SolidityExecutor
+from executors.solidity_sources import LibraryIndex
+
+STEP_CODE = """// File: Token.sol
+import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+interface IVault {}
+abstract contract Base is ERC20 {}
+contract Token is Base {}
+contract Vault is IVault {}
+"""
+LIBRARY_SOURCE = "@openzeppelin/contracts/token/ERC20/ERC20.sol"
+
+
+def definition(node_id, name, kind="contract", bases=(), abstract=False):
+    return {"nodeType": "ContractDefinition", "id": node_id, "name": name, "contractKind": kind,
+            "abstract": abstract, "linearizedBaseContracts": [node_id, *bases]}
+
+
+def artifact(bytecode="6080"):
+    return {"abi": [], "evm": {"bytecode": {"object": bytecode}, "deployedBytecode": {"object": bytecode}}}
+
+
+# What solc reports for STEP_CODE: ERC20 comes from the imported library
+COMPILER_OUTPUT = {
+    "sources": {
+        LIBRARY_SOURCE: {"ast": {"nodes": [definition(1, "ERC20")]}},
+        "Token.sol": {"ast": {"nodes": [
+            definition(2, "IVault", kind="interface"),
+            definition(3, "Base", bases=[1], abstract=True),
+            definition(4, "Token", bases=[3, 1]),
+            definition(5, "Vault", bases=[2]),
+        ]}},
+    },
+    "contracts": {
+        LIBRARY_SOURCE: {"ERC20": artifact()},
+        "Token.sol": {"IVault": artifact(""), "Base": artifact(""), "Token": artifact(), "Vault": artifact()},
+    },
+}
+
+
+class FixedCompiler:
+    def compile(self, standard_input, solc_version):
+        assert set(standard_input["sources"]) == {"Token.sol"}
+        return COMPILER_OUTPUT
+
+
+def make_executor(tmp_path):
+    executor = SolidityExecutor.__new__(SolidityExecutor)
+    executor.logger = logging.getLogger("test")
+    executor.compile_cache = None
+    executor.compiler = FixedCompiler()
+    executor.solc_version = "0.8.20"
+    executor.library_index = LibraryIndex(str(tmp_path))
+    return executor
+
+
+def test_contracts_record_kind_ancestors_and_origin(tmp_path):
+    contracts = make_executor(tmp_path)._compile_contract(STEP_CODE)
+    assert contracts["Token"]["bases"] == ["Base", "ERC20"]
+    assert contracts["Base"]["kind"] == "abstract"
+    assert contracts["IVault"]["kind"] == "interface"
+    assert not contracts["ERC20"]["from_step"] and contracts["Vault"]["from_step"]
+
+
+def test_only_concrete_leaf_contracts_of_the_step_are_deployed(tmp_path):
+    executor = make_executor(tmp_path)
+    targets, skipped = executor._select_targets(executor._compile_contract(STEP_CODE))
+    assert set(targets) == {"Token", "Vault"}
+    assert skipped == {"ERC20": "imported", "IVault": "interface", "Base": "abstract"}
+
+
+def test_base_contracts_with_bytecode_are_not_deployed(tmp_path):
+    executor = make_executor(tmp_path)
+    contracts = {"Parent": {"bytecode": "6080", "bases": []},
+                 "Child": {"bytecode": "6080", "bases": ["Parent"]}}
+    targets, skipped = executor._select_targets(contracts)
+    assert list(targets) == ["Child"] and skipped == {"Parent": "base contract"}
+
+
+def test_contracts_named_in_the_step_narrow_the_targets(tmp_path):
+    executor = make_executor(tmp_path)
+    contracts = executor._compile_contract(STEP_CODE)
+    targets, skipped = executor._select_targets(contracts, "Deploy the Vault contract")
+    assert list(targets) == ["Vault"]
+    assert skipped["Token"] == "not named in step"
+    # Names of imported, abstract or unrelated contracts do not narrow anything
+    targets, _ = executor._select_targets(contracts, "Deploy an ERC20 token with a Base fee")
+    assert set(targets) == {"Token", "Vault"}
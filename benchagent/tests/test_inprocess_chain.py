@@ -0,0 +1,73 @@
+import json
+import urllib.request
+
+import pytest
+
+pytest.importorskip("eth_tester")
+
+from core.config import BlockchainConfig
+from executors.evm_backend import InProcessChain, _to_wire
+
+# Init code that deploys PUSH1 0 PUSH1 0 REVERT, so every call to it reverts
+REVERTING_CONTRACT = "0x6005600c60003960056000f360006000fd"
+
+
+@pytest.fixture(scope="module")
+def chain():
+    chain = InProcessChain(BlockchainConfig(backend="inprocess"))
+    yield chain
+    chain.close()
+
+
+def rpc(chain, method, *params):
+    return chain.handle_rpc({"jsonrpc": "2.0", "id": 7, "method": method, "params": list(params)})
+
+
+def post(chain, payload):
+    request = urllib.request.Request(chain.rpc_url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_results_are_encoded_like_a_node():
+    assert _to_wire({"number": 10, "hash": b"\x01\x02", "logs": [{"removed": False}], "to": None}) \
+        == {"number": "0xa", "hash": "0x0102", "logs": [{"removed": False}], "to": None}
+
+
+def test_configuration_points_at_the_chain_and_funds_the_account(chain):
+    config = chain.blockchain_config
+    assert config.rpc_url == chain.rpc_url
+    assert rpc(chain, "eth_chainId") == {"jsonrpc": "2.0", "id": 7, "result": hex(config.chain_id)}
+    balance = rpc(chain, "eth_getBalance", config.sender_address, "latest")["result"]
+    assert int(balance, 16) > 0
+
+
+def test_calls_without_a_sender_get_a_default(chain):
+    config = chain.blockchain_config
+    response = rpc(chain, "eth_call", {"to": config.sender_address, "data": "0x"}, "latest")
+    assert response["result"] == "0x"
+
+
+def test_reverts_carry_the_prefix_clients_look_for(chain):
+    web3 = chain.web3
+    tx_hash = web3.eth.send_transaction({"from": web3.eth.accounts[0], "data": REVERTING_CONTRACT})
+    address = web3.eth.get_transaction_receipt(tx_hash)["contractAddress"]
+    response = rpc(chain, "eth_call", {"to": address, "data": "0x"}, "latest")
+    assert response["error"]["message"].startswith("execution reverted")
+
+
+def test_unknown_methods_are_errors_not_crashes(chain):
+    response = rpc(chain, "eth_noSuchMethod")
+    assert response["id"] == 7 and "error" in response
+
+
+def test_http_batches_and_parse_errors(chain):
+    responses = post(chain, [{"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []},
+                             {"jsonrpc": "2.0", "id": 2, "method": "eth_chainId", "params": []}])
+    assert [response["id"] for response in responses] == [1, 2]
+    assert all(response["result"].startswith("0x") for response in responses)
+
+    request = urllib.request.Request(chain.rpc_url, data=b"{", headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        assert json.loads(response.read())["error"]["code"] == -32700
@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import LLMConfig
+from core.llm_cassette import LLMCassette, LLMReplayMissError
+from core.llm_client import LLMClient
+from core.task_manager import TaskManager
+
+ADDRESS_A = "0x" + "a" * 40
+ADDRESS_B = "0x" + "b" * 40
+
+
+class CountingOpenAI:
+    """Stands in for openai.AsyncOpenAI; numbers its answers so replays can be told apart"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.calls += 1
+        await asyncio.sleep(0)
+        message = SimpleNamespace(content=f"answer {self.calls} to {request['messages'][-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    async def close(self):
+        pass
+
+
+def ask(content):
+    return [{"role": "user", "content": content}]
+
+
+@pytest.fixture
+def recorded_run(tmp_path):
+    task_manager = TaskManager(str(tmp_path))
+    client = LLMClient(LLMConfig(model="test", api_key="test"), task_manager=task_manager)
+    client.client = CountingOpenAI()
+    try:
+        for content in ("plan", "retry", "retry", f"call {ADDRESS_A}"):
+            client.chat_completion(ask(content))
+    finally:
+        client.close()
+    return task_manager
+
+
+def replay_client(run_dir, **config):
+    return LLMClient(LLMConfig(model="test", api_key="test", **config), cassette=LLMCassette(str(run_dir)))
+
+
+def test_requests_are_answered_from_the_recording_in_order(recorded_run):
+    client = replay_client(recorded_run.output_dir)
+    try:
+        assert client.client is None
+        assert client.chat_completion(ask("retry")) == "answer 2 to retry"
+        assert client.chat_completion(ask("retry")) == "answer 3 to retry"
+        assert client.chat_completion(ask("plan")) == "answer 1 to plan"
+    finally:
+        client.close()
+
+
+def test_addresses_and_hashes_are_ignored_by_the_loose_match(recorded_run):
+    cassette = LLMCassette(str(recorded_run.output_dir))
+    entry = cassette.match(ask(f"call {ADDRESS_B}"))
+    assert entry["record"]["response"]["content"] == f"answer 4 to call {ADDRESS_A}"
+    assert cassette.match(ask(f"call {ADDRESS_A}")) is None
+    assert (cassette.stats()["served_loose"], cassette.stats()["unmatched"]) == (1, 1)
+
+
+def test_unrecorded_requests_fail_unless_falling_through(recorded_run):
+    client = replay_client(recorded_run.output_dir)
+    try:
+        with pytest.raises(LLMReplayMissError):
+            client.chat_completion(ask("new"))
+    finally:
+        client.close()
+
+    client = replay_client(recorded_run.output_dir, replay_fallthrough=True)
+    client.client = CountingOpenAI()
+    try:
+        assert client.chat_completion(ask("new")) == "answer 1 to new"
+        assert client.chat_completion(ask("plan")) == "answer 1 to plan"
+    finally:
+        client.close()
+
+
+def test_failed_interactions_are_not_replayed(tmp_path):
+    task_manager = TaskManager(str(tmp_path))
+    task_manager.save_llm_interaction({"timestamp": "2025-01-01T00:00:00", "success": False,
+                                       "request": {"messages": ask("plan")},
+                                       "response": {"content": None, "error": "timeout"}})
+    assert LLMCassette.from_run_id(task_manager.run_id, str(tmp_path)).stats()["recorded"] == 0
+    with pytest.raises(FileNotFoundError):
+        LLMCassette.from_run_id("run_missing", str(tmp_path))
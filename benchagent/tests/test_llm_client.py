@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import LLMConfig
+from core.llm_client import CancellationToken, LLMCancelledError, LLMClient
+
+
+class FakeOpenAI:
+    """Stands in for openai.AsyncOpenAI; each completion sleeps, then echoes the last message"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.closed = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        message = SimpleNamespace(content=f"echo: {request['messages'][-1]['content']}")
+        usage = SimpleNamespace(completion_tokens=1, prompt_tokens=2, total_tokens=3)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    async def close(self):
+        self.closed = True
+
+
+class RecordingTaskManager:
+    def __init__(self):
+        self.records = []
+        self.threads = set()
+
+    def save_llm_interaction(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.records.append(record)
+
+
+def make_client(delay=0.0, **config):
+    task_manager = RecordingTaskManager()
+    client = LLMClient(LLMConfig(model="test", api_key="test", **config), task_manager=task_manager)
+    client.client = FakeOpenAI(delay)
+    return client, task_manager
+
+
+def ask(content):
+    return [{"role": "user", "content": content}]
+
+
+def test_concurrent_calls_share_a_bounded_pool():
+    client, _ = make_client(delay=0.05, max_connections=2)
+    try:
+        futures = [client.submit(ask(str(i))) for i in range(6)]
+        assert [future.result(timeout=5) for future in futures] == [f"echo: {i}" for i in range(6)]
+        assert client.client.max_running == 2
+    finally:
+        client.close()
+
+
+def test_async_callers_on_another_loop_are_served():
+    client, _ = make_client()
+    try:
+        assert asyncio.run(client.achat_completion(ask("hi"))) == "echo: hi"
+    finally:
+        client.close()
+
+
+def test_cancellation_stops_an_in_flight_call():
+    client, task_manager = make_client(delay=10)
+    token = CancellationToken()
+    try:
+        future = client.submit(ask("slow"), cancel_token=token)
+        time.sleep(0.1)
+        started = time.monotonic()
+        token.cancel()
+        with pytest.raises(LLMCancelledError):
+            future.result(timeout=5)
+        assert time.monotonic() - started < 1
+        with pytest.raises(LLMCancelledError, match="before it started"):
+            client.chat_completion(ask("late"), cancel_token=token)
+    finally:
+        client.close()
+    assert task_manager.records[-1]["response"]["error"] == "cancelled"
+
+
+def test_deadline_covers_the_whole_call():
+    client, task_manager = make_client(delay=10, deadline=0.1)
+    try:
+        with pytest.raises(TimeoutError, match="deadline of 0.1 seconds"):
+            client.chat_completion(ask("slow"))
+    finally:
+        client.close()
+    assert task_manager.records[-1]["success"] is False
+
+
+def test_history_is_written_off_the_loop_and_flushed_on_close():
+    client, task_manager = make_client()
+    fake = client.client
+    client.chat_completion(ask("hi"))
+    client.close()
+    client.close()
+    assert fake.closed
+    assert [record["response"]["content"] for record in task_manager.records] == ["echo: hi"]
+    assert task_manager.records[0]["response"]["usage"]["total_tokens"] == 3
+    assert all(name.startswith("llm-history") for name in task_manager.threads)
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+from eth_account import Account
+
+from core.rpc_proxy import NonceManager, RPCProxy
+
+
+def test_concurrent_readers_get_distinct_leases():
+    nonces = NonceManager()
+    assert nonces.assign("0xa", 5) == 5
+    assert nonces.assign("0xa", 5) == 6
+
+
+def test_released_and_expired_leases_are_handed_out_again():
+    nonces = NonceManager()
+    nonces.assign("0xa", 5)
+    # A script that skipped 5 and sent 6 must not leave 5 unusable once it is released
+    nonces.confirm("0xa", 6)
+    nonces.release("0xa", [5])
+    assert nonces.assign("0xa", 5) == 5
+    nonces.confirm("0xa", 5)
+    assert nonces.assign("0xa", 5) == 7
+
+    nonces = NonceManager(lease_seconds=0)
+    nonces.assign("0xa", 0)
+    assert nonces.assign("0xa", 0) == 0
+
+
+def test_reservations_are_skipped_until_released():
+    nonces = NonceManager()
+    assert nonces.reserve("0xa", 3, 3) == [3, 4, 5]
+    assert nonces.assign("0xa", 3) == 6
+    nonces.confirm("0xa", 3)
+    nonces.release("0xa", [4, 5])
+    assert nonces.assign("0xa", 3) == 4
+
+
+def test_reservation_takes_the_lowest_consecutive_block():
+    nonces = NonceManager()
+    nonces.reserve("0xa", 0, 1)
+    nonces.confirm("0xa", 2)
+    assert nonces.reserve("0xa", 0, 2) == [3, 4]
+    assert nonces.reserve("0xa", 0, 1) == [1]
+
+
+def test_reservations_expire():
+    nonces = NonceManager(reservation_seconds=0)
+    nonces.reserve("0xa", 0, 2)
+    assert nonces.assign("0xa", 0) == 0
+
+
+def test_chain_count_supersedes_local_state():
+    nonces = NonceManager()
+    nonces.confirm("0xa", 0)
+    nonces.reserve("0xa", 0, 2)
+    assert nonces.assign("0xa", 10) == 10
+
+
+def test_resync_forgets_only_the_rejected_nonce():
+    nonces = NonceManager()
+    nonces.reserve("0xa", 0, 3)
+    nonces.confirm("0xa", 0)
+    nonces.resync("0xa", 1)
+    assert nonces.assign("0xa", 0) == 1
+    assert nonces.assign("0xa", 0) == 3
+
+
+def test_senders_are_independent_and_reset_clears_state():
+    nonces = NonceManager()
+    nonces.reserve("0xa", 0, 2)
+    assert nonces.assign("0xb", 0) == 0
+    nonces.reset("0xa")
+    assert nonces.assign("0xa", 0) == 0
+
+
+def test_concurrent_leases_and_reservations_never_overlap():
+    nonces = NonceManager()
+    handed_out = []
+    lock = threading.Lock()
+
+    def take(index):
+        block = nonces.reserve("0xa", 0, 3) if index % 2 else [nonces.assign("0xa", 0)]
+        with lock:
+            handed_out.extend(block)
+
+    threads = [threading.Thread(target=take, args=(index,)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(handed_out) == list(range(40))
+
+
+class FakeUpstream:
+    """Stands in for the node behind the proxy"""
+
+    def __init__(self):
+        self.block_number = 1
+        self.pending = 5
+        self.calls = []
+        self.send_error = None
+
+    def call(self, method, params):
+        self.calls.append(method)
+        if method == "eth_blockNumber":
+            return {"result": hex(self.block_number)}
+        if method == "eth_getTransactionCount":
+            return {"result": hex(self.pending)}
+        if method == "eth_sendRawTransaction":
+            return {"error": {"code": -32000, "message": self.send_error}} if self.send_error else {"result": "0x01"}
+        return {"result": "0x3b9aca00"}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def proxy():
+    proxy = RPCProxy("http://127.0.0.1:9")
+    proxy._upstream.close()
+    proxy._upstream = FakeUpstream()
+    yield proxy
+    proxy.close()
+
+
+def rpc(proxy, method, *params):
+    return proxy.handle_rpc({"jsonrpc": "2.0", "id": 1, "method": method, "params": list(params)})
+
+
+def wait_for_block(proxy, number):
+    deadline = time.time() + 5
+    while proxy._block_number != number:
+        assert time.time() < deadline, "block watcher did not see the block"
+        time.sleep(0.01)
+
+
+def test_per_block_results_last_until_a_new_block(proxy):
+    upstream = proxy._upstream
+    wait_for_block(proxy, 1)
+    rpc(proxy, "eth_gasPrice")
+    rpc(proxy, "eth_gasPrice")
+    assert upstream.calls.count("eth_gasPrice") == 1
+
+    upstream.block_number = 2
+    wait_for_block(proxy, 2)
+    rpc(proxy, "eth_gasPrice")
+    assert upstream.calls.count("eth_gasPrice") == 2
+
+
+def test_nonce_errors_resync_only_the_rejected_nonce(proxy):
+    upstream = proxy._upstream
+    account = Account.create()
+    sender = account.address
+    assert [int(rpc(proxy, "eth_getTransactionCount", sender, "pending")["result"], 16)
+            for _ in range(2)] == [5, 6]
+
+    signed = account.sign_transaction({"nonce": 6, "gas": 21000, "gasPrice": 1, "to": sender,
+                                       "value": 0, "chainId": 1})
+    raw = "0x" + bytes(getattr(signed, "raw_transaction", None) or signed.rawTransaction).hex()
+    upstream.send_error = "nonce too low"
+    assert "error" in rpc(proxy, "eth_sendRawTransaction", raw)
+    # 5 is still leased to the first reader; only 6 is given out again
+    assert int(rpc(proxy, "eth_getTransactionCount", sender, "pending")["result"], 16) == 6
@@ -0,0 +1,93 @@
+import pytest
+
+from core.config import LLMConfig
+from core.llm_client import LLMClient
+from core.plan_cache import PlanCache
+from core.task_planner import TaskPlanner
+from core.types import BenchmarkTask, StepType, TaskStep
+
+PLAN_RESPONSE = """```json
+{"steps": [{"id": "step_1", "description": "deploy", "step_type": "solidity", "dependencies": []},
+           {"id": "step_2", "description": "call", "step_type": "python", "dependencies": ["step_1"]}]}
+```"""
+
+
+class PlanningLLM:
+    """Answers every planning request with a fixed response and counts the calls"""
+
+    def __init__(self, response=PLAN_RESPONSE, model="test", temperature=0.1):
+        self.config = LLMConfig(model=model, api_key="test", temperature=temperature)
+        self.response = response
+        self.calls = 0
+
+    extract_json_blocks = LLMClient.extract_json_blocks
+
+    def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        return self.response
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PlanCache(str(tmp_path))
+
+
+def task(description="Deploy a token and call it"):
+    return BenchmarkTask(id="t1", description=description, type="solidity")
+
+
+def test_key_covers_every_planning_input():
+    base = ("gpt-4", 0.1, "system", "user")
+    keys = {PlanCache.make_key(*base)}
+    for index, value in enumerate(("gpt-4o", 0.2, "system2", "user2")):
+        changed = list(base)
+        changed[index] = value
+        keys.add(PlanCache.make_key(*changed))
+    assert len(keys) == 5
+    assert PlanCache.make_key(*base) == PlanCache.make_key(*base)
+
+
+def test_steps_round_trip(cache):
+    steps = [TaskStep("a", "deploy", StepType.SOLIDITY), TaskStep("b", "call", StepType.PYTHON, ["a"])]
+    cache.put("key", steps)
+    assert cache.get("key") == steps
+    assert cache.get("other") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"], cache.stats()["writes"]) == (1, 1, 1)
+
+
+def test_entries_failing_validation_are_discarded(cache):
+    cache.put("key", [TaskStep("a", "deploy", StepType.SOLIDITY)])
+
+    def reject(steps):
+        raise ValueError("stale")
+
+    assert cache.get("key", validate=reject) is None
+    assert not (cache.cache_dir / "key.json").exists()
+    (cache.cache_dir / "broken.json").write_text("{", encoding="utf-8")
+    assert cache.get("broken") is None
+    assert cache.stats()["invalid"] == 2
+
+
+def test_planner_reuses_cached_plans(cache):
+    llm = PlanningLLM()
+    first = TaskPlanner(llm, cache).plan_task(task())
+    second = TaskPlanner(llm, cache).plan_task(task())
+    assert llm.calls == 1
+    assert second.steps == first.steps
+    TaskPlanner(llm, cache).plan_task(task("Something else"))
+    TaskPlanner(PlanningLLM(model="other"), cache).plan_task(task())
+    assert len(list(cache.cache_dir.glob("*.json"))) == 3
+
+
+def test_replan_bypasses_and_refreshes_the_cache(cache):
+    llm = PlanningLLM()
+    TaskPlanner(llm, cache).plan_task(task())
+    TaskPlanner(llm, cache, replan=True).plan_task(task())
+    assert llm.calls == 2
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_fallback_plans_are_not_cached(cache):
+    llm = PlanningLLM(response="I cannot produce JSON today")
+    TaskPlanner(llm, cache).plan_task(task())
+    assert list(cache.cache_dir.glob("*.json")) == []
@@ -0,0 +1,128 @@
+from pathlib import Path
+
+import pytest
+
+from core.preflight import PreflightChecker
+from core.types import StepType
+from executors.compiler_service import CompilerError
+
+GOOD_SCRIPT = """
+import os
+import sys
+from web3 import Web3
+
+w3 = Web3(Web3.HTTPProvider(os.environ["RPC_URL"]))
+try:
+    signed = w3.eth.account.sign_transaction({}, os.getenv("PRIVATE_KEY"))
+    w3.eth.send_raw_transaction(signed.raw_transaction)
+except Exception as e:
+    print(e)
+    sys.exit(1)
+"""
+
+
+class FakeCompiler:
+    """Accepts any source except one containing 'oops'"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def compile(self, standard_input, solc_version):
+        self.inputs.append(standard_input)
+        if any("oops" in source["content"] for source in standard_input["sources"].values()):
+            raise CompilerError("ParserError: Expected ';'", [])
+        return {}
+
+
+def rules(violations):
+    return [violation.split(":", 1)[0] for violation in violations]
+
+
+def test_clean_script_passes():
+    assert PreflightChecker().check(StepType.PYTHON, GOOD_SCRIPT) == []
+
+
+def test_syntax_error():
+    assert rules(PreflightChecker().check_python("def f(:\n")) == ["Syntax error"]
+
+
+def test_removed_web3_apis():
+    code = GOOD_SCRIPT.replace("w3.eth.send_raw_transaction", "w3.eth.sendRawTransaction") + \
+        "from web3.middleware import geth_poa_middleware\nw3.isConnected()\nWeb3.toWei(1, 'ether')\n"
+    violations = PreflightChecker().check_python(code)
+    assert rules(violations) == ["Removed web3.py API"] * 4
+    assert any("`.send_raw_transaction`" in violation for violation in violations)
+
+
+@pytest.mark.parametrize("line", [
+    "c.functions.getBalance().call()",
+    "w3.eth.contract(address=a, abi=abi).functions.getBalance(a).call()",
+    "c.caller.isConnected()",
+    "vault.toWei(1)",
+])
+def test_contract_functions_keep_their_solidity_names(line):
+    assert PreflightChecker().check_python(GOOD_SCRIPT + line + "\n") == []
+
+
+def test_node_url_must_come_from_the_environment():
+    code = GOOD_SCRIPT.replace('os.environ["RPC_URL"]', '"http://localhost:8545"')
+    assert rules(PreflightChecker().check_python(code)) == ["Missing environment read"]
+
+
+def test_scripts_without_a_provider_need_no_rpc_url():
+    assert PreflightChecker().check_python('import json\nprint(json.dumps({"a": 1}))\n') == []
+
+
+def test_signing_key_must_come_from_the_environment():
+    code = GOOD_SCRIPT.replace('os.getenv("PRIVATE_KEY")', '"0x" + "11" * 32')
+    violations = PreflightChecker().check_python(code)
+    assert rules(violations) == ["Missing environment read"]
+    assert "PRIVATE_KEY" in violations[0]
+
+
+@pytest.mark.parametrize("handler, allowed", [
+    ("print(e)", False),
+    ("sys.exit(0)", False),
+    ("sys.exit(1)", True),
+    ("sys.exit(str(e))", True),
+    ("raise", True),
+])
+def test_caught_errors_need_a_failure_exit(handler, allowed):
+    code = GOOD_SCRIPT.replace("    print(e)\n    sys.exit(1)\n", f"    {handler}\n")
+    violations = PreflightChecker().check_python(code)
+    assert (violations == []) == allowed
+
+
+def test_solidity_parse_errors_are_reported_from_a_parse_only_run():
+    compiler = FakeCompiler()
+    preflight = PreflightChecker(compiler)
+    assert preflight.check(StepType.SOLIDITY, "contract A {}") == []
+    assert rules(preflight.check(StepType.SOLIDITY, "contract A { oops }")) == ["Solidity parse error"]
+    assert compiler.inputs[0]["settings"]["stopAfter"] == "parsing"
+
+
+def test_unavailable_compiler_does_not_reject_code():
+    class BrokenCompiler:
+        def compile(self, standard_input, solc_version):
+            raise RuntimeError("solc not installed")
+
+    assert PreflightChecker(BrokenCompiler()).check(StepType.SOLIDITY, "contract A { oops }") == []
+
+
+def test_ownable_needs_an_initial_owner(monkeypatch):
+    monkeypatch.chdir(Path(__file__).resolve().parent.parent)
+    if not Path("node_modules/@openzeppelin/contracts/access/Ownable.sol").exists():
+        pytest.skip("OpenZeppelin is not installed")
+    source = 'import "@openzeppelin/contracts/access/Ownable.sol";\ncontract A is Ownable {\n    constructor()%s {}\n}\n'
+    preflight = PreflightChecker()
+    assert rules(preflight.check_solidity(source % "")) == ["Ownable constructor"]
+    assert preflight.check_solidity(source % " Ownable(msg.sender)") == []
+
+
+def test_stats_count_avoided_executions():
+    preflight = PreflightChecker()
+    preflight.check(StepType.PYTHON, GOOD_SCRIPT)
+    preflight.check(StepType.PYTHON, "def f(:\n")
+    stats = preflight.stats()
+    assert (stats["checked"], stats["rejected"], stats["executions_avoided"]) == (2, 1, 1)
+    assert stats["rules"] == {"Syntax error": 1}
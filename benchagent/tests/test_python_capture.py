@@ -0,0 +1,72 @@
+import sys
+import time
+import subprocess
+
+import pytest
+
+import executors.python_executor as python_executor
+from executors.python_executor import PythonExecutor, OutputRingBuffer
+
+TX_HASH = "0x" + "ab" * 32
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    # Without a task manager the executor creates ./scripts
+    monkeypatch.chdir(tmp_path)
+
+    def run(code, **options):
+        executor = PythonExecutor(**options)
+        process = subprocess.Popen([sys.executable, "-u", "-c", code],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        start = time.time()
+        stdout, stderr, tx_hashes, termination = executor._capture(process)
+        return stdout, stderr, tx_hashes, termination, time.time() - start, process.returncode
+
+    return run
+
+
+def test_collects_output_and_transaction_hashes(run):
+    stdout, stderr, tx_hashes, termination, _, returncode = run(
+        f"import sys\nprint('sent {TX_HASH}')\nprint('oops', file=sys.stderr)\n")
+    assert stdout == f"sent {TX_HASH}\n"
+    assert stderr == "oops\n"
+    assert tx_hashes == {TX_HASH}
+    assert termination is None and returncode == 0
+
+
+def test_script_hanging_after_a_traceback_is_killed(run, monkeypatch):
+    monkeypatch.setattr(python_executor, "TRACEBACK_GRACE_SECONDS", 0.5)
+    code = ("import time, traceback\ntry:\n    1 / 0\nexcept Exception:\n    traceback.print_exc()\n"
+            "time.sleep(30)\n")
+    _, stderr, _, termination, elapsed, _ = run(code, kill_on_traceback=True)
+    assert "ZeroDivisionError" in stderr
+    assert termination.startswith("Script printed a traceback")
+    assert elapsed < 10
+
+
+def test_traceback_is_ignored_unless_enabled(run):
+    code = "import traceback\ntry:\n    1 / 0\nexcept Exception:\n    traceback.print_exc()\n"
+    *_, termination, _, returncode = run(code)
+    assert termination is None and returncode == 0
+
+
+def test_idle_script_is_killed(run):
+    *_, termination, elapsed, _ = run("print('start')\nimport time\ntime.sleep(30)\n", idle_timeout=1)
+    assert termination == "Script produced no output for 1 seconds"
+    assert elapsed < 10
+
+
+def test_timeout_kills_a_script_that_keeps_printing(run):
+    code = "import time\nwhile True:\n    print('tick')\n    time.sleep(0.1)\n"
+    stdout, *_, termination, elapsed, _ = run(code, timeout=1, idle_timeout=5)
+    assert termination == "Script execution timed out after 1 seconds"
+    assert stdout.startswith("tick\n")
+    assert elapsed < 10
+
+
+def test_ring_buffer_keeps_the_most_recent_output():
+    buffer = OutputRingBuffer(max_chars=10)
+    for line in ("aaaa\n", "bbbb\n", "cccc\n"):
+        buffer.append(line)
+    assert buffer.text() == "[... 5 earlier characters dropped ...]\nbbbb\ncccc\n"
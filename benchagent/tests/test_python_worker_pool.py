@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+from executors.python_worker_pool import PythonWorkerPool
+
+
+@pytest.fixture
+def script(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text("import os, sys\nprint(os.environ['GREETING'], os.getcwd())\nsys.exit(3)\n", encoding="utf-8")
+    return script
+
+
+def wait_until_ready(pool, count):
+    deadline = time.time() + 60
+    while pool._ready.qsize() < count:
+        assert time.time() < deadline, "workers did not become ready"
+        time.sleep(0.05)
+
+
+def run(pool, script, tmp_path):
+    env = {**os.environ, "GREETING": "hello"}
+    process, timing = pool.start(script, env, str(tmp_path))
+    stdout, stderr = process.communicate(timeout=60)
+    return process.returncode, stdout, timing
+
+
+def test_scripts_run_in_a_warm_worker_like_a_fresh_interpreter(script, tmp_path):
+    pool = PythonWorkerPool(size=1)
+    try:
+        wait_until_ready(pool, 1)
+        exit_code, stdout, timing = run(pool, script, tmp_path)
+        assert (exit_code, stdout.split()) == (3, ["hello", str(tmp_path)])
+        assert timing["warm"]
+        # A replacement is started for the worker that was used
+        wait_until_ready(pool, 1)
+    finally:
+        pool.close()
+    assert pool.stats()["warm_runs"] == 1
+
+
+def test_an_empty_pool_starts_a_worker_on_demand(script, tmp_path):
+    pool = PythonWorkerPool(size=0)
+    try:
+        exit_code, _, timing = run(pool, script, tmp_path)
+    finally:
+        pool.close()
+    assert exit_code == 3 and not timing["warm"]
+    assert pool.stats()["cold_runs"] == 1
+
+
+def test_close_stops_workers_that_are_still_starting(monkeypatch):
+    processes = []
+    spawn = PythonWorkerPool._spawn
+
+    def record(pool):
+        worker = spawn(pool)
+        processes.append(worker.process)
+        return worker
+
+    monkeypatch.setattr(PythonWorkerPool, "_spawn", record)
+    pool = PythonWorkerPool(size=3)
+    pool.close()
+    assert not pool._spawn_threads and pool._ready.empty()
+    assert all(process.poll() is not None for process in processes)
+    pool._spawn_async()
+    assert not pool._spawn_threads
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytest.importorskip("eth_tester")
+
+from core.config import BlockchainConfig
+from core.receipt_tracker import ReceiptTracker, TransactionStuckError
+from executors.evm_backend import InProcessChain
+
+
+@pytest.fixture
+def chain():
+    chain = InProcessChain(BlockchainConfig(backend="inprocess", chain_id=1))
+    yield chain
+    chain.close()
+
+
+def transfer(chain, nonce):
+    account = chain.web3.eth.account.from_key(chain.blockchain_config.private_key)
+    signed = account.sign_transaction({
+        "to": "0x000000000000000000000000000000000000dEaD", "value": 1, "gas": 21000,
+        "gasPrice": chain.web3.eth.gas_price, "nonce": nonce, "chainId": chain.web3.eth.chain_id
+    })
+    return chain.web3.eth.send_raw_transaction(signed.raw_transaction)
+
+
+def test_waits_for_several_receipts_together(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.05)
+    start = chain.web3.eth.get_transaction_count(chain.blockchain_config.sender_address)
+    tx_hashes = [transfer(chain, start + i) for i in range(3)]
+    receipts = tracker.wait(tx_hashes, timeout=10)
+    assert [receipts[tx_hash].status for tx_hash in tx_hashes] == [1, 1, 1]
+    assert tracker.stats()["mined"] == 3
+    assert tracker.stats()["pending"] == 0
+
+
+def test_unknown_transaction_fails_as_stuck_after_new_blocks(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.05, stuck_blocks=2, stuck_seconds=0)
+    future = tracker.track(os.urandom(32))
+    start = chain.web3.eth.get_transaction_count(chain.blockchain_config.sender_address)
+    for i in range(3):
+        tracker.wait([transfer(chain, start + i)], timeout=10)
+    with pytest.raises(TransactionStuckError) as error:
+        future.result(timeout=10)
+    assert error.value.reason == "dropped by the node"
+    assert tracker.stats()["stuck"] == 1
+
+
+def test_zero_thresholds_never_mark_transactions_stuck(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.05, stuck_blocks=0, stuck_seconds=0)
+    tx_hash = os.urandom(32)
+    start = chain.web3.eth.get_transaction_count(chain.blockchain_config.sender_address)
+    for i in range(3):
+        tracker.wait([transfer(chain, start + i)], timeout=10)
+    assert tracker.wait([tx_hash], timeout=0.5)[tx_hash] is None
@@ -0,0 +1,73 @@
+import pytest
+
+from executors.solidity_sources import LibraryIndex, resolve_import, split_sources
+
+LIBRARY = {
+    "token/ERC20/ERC20.sol": 'import "./IERC20.sol";\nimport {Context} from "../../utils/Context.sol";\ncontract ERC20 {}',
+    "token/ERC20/IERC20.sol": "interface IERC20 {}",
+    "utils/Context.sol": "abstract contract Context {}",
+    "access/Ownable.sol": 'import "../utils/Context.sol" as Ctx;\ncontract Ownable {}',
+    "utils/Strings.sol": 'import * as Math from "./math/Math.sol";\nlibrary Strings {}',
+    "utils/math/Math.sol": "library Math {}",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    root = tmp_path / "@openzeppelin" / "contracts"
+    for name, content in LIBRARY.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return LibraryIndex(str(tmp_path))
+
+
+def closure(index, code):
+    standard_input, unresolved = index.standard_input({"Main.sol": code}, {"*": {"*": ["abi"]}})
+    return set(standard_input["sources"]) - {"Main.sol"}, unresolved
+
+
+def test_library_files_are_indexed_by_import_path(index):
+    assert len(index.files) == len(LIBRARY)
+    assert index.files["@openzeppelin/contracts/token/ERC20/ERC20.sol"].imports == [
+        "@openzeppelin/contracts/token/ERC20/IERC20.sol", "@openzeppelin/contracts/utils/Context.sol"]
+    assert index.source_hash("@openzeppelin/contracts/utils/Context.sol")
+    assert index.source_hash("missing.sol") is None
+
+
+def test_closure_follows_transitive_imports_only(index):
+    sources, unresolved = closure(index, 'import "@openzeppelin/contracts/token/ERC20/ERC20.sol";')
+    assert sources == {"@openzeppelin/contracts/token/ERC20/ERC20.sol",
+                       "@openzeppelin/contracts/token/ERC20/IERC20.sol",
+                       "@openzeppelin/contracts/utils/Context.sol"}
+    assert unresolved == []
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ('import "@openzeppelin/contracts/access/Ownable.sol" as O;', "@openzeppelin/contracts/access/Ownable.sol"),
+    ('import * as S from "@openzeppelin/contracts/utils/Strings.sol";', "@openzeppelin/contracts/utils/math/Math.sol"),
+    ("import {Context} from '@openzeppelin/contracts/utils/Context.sol';", "@openzeppelin/contracts/utils/Context.sol"),
+])
+def test_every_import_form_is_followed(index, statement, expected):
+    sources, _ = closure(index, statement)
+    assert expected in sources
+
+
+def test_unknown_imports_are_reported(index):
+    sources, unresolved = closure(index, 'import "forge-std/Test.sol";\nimport "forge-std/Test.sol";')
+    assert sources == set()
+    assert unresolved == ["forge-std/Test.sol"]
+
+
+def test_generated_files_import_each_other_without_the_index(index):
+    code = "// File: Token.sol\ncontract Token {}\n// File: ./src/Vault.sol\nimport \"../Token.sol\";\ncontract Vault {}\n"
+    sources = split_sources(code)
+    assert list(sources) == ["Token.sol", "src/Vault.sol"]
+    standard_input, unresolved = index.standard_input(sources, {})
+    assert set(standard_input["sources"]) == {"Token.sol", "src/Vault.sol"} and unresolved == []
+
+
+def test_code_without_markers_is_one_file():
+    assert split_sources("contract A {}", "Main.sol") == {"Main.sol": "contract A {}"}
+    assert split_sources("// SPDX\n// File: A.sol\ncontract A {}")["A.sol"].startswith("// SPDX")
+    assert resolve_import("./B.sol", "lib/A.sol") == "lib/B.sol"
@@ -0,0 +1,84 @@
+import logging
+import threading
+from types import SimpleNamespace
+
+import core.step_executor as step_executor
+from core.step_executor import StepExecutor
+from core.types import StepType, TaskStep
+
+
+class FakeFork:
+    """Stands in for ChainFork; records which forks were stopped"""
+
+    instances = []
+
+    def __init__(self, rpc_url, anvil_path):
+        self.url = f"fork-{len(FakeFork.instances)}"
+        self.stopped = threading.Event()
+        FakeFork.instances.append(self)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.stopped.set()
+
+
+class CandidateGenerator:
+    """Answers each temperature with a fixed program"""
+
+    def __init__(self, programs):
+        self.programs = programs
+        self.llm_client = SimpleNamespace(config=SimpleNamespace(temperature=0.0))
+
+    def generate_code(self, step, context, previous_error=None, temperature=None, cancel_token=None):
+        return self.programs[round(temperature, 1)]
+
+
+def make_executor(monkeypatch, programs):
+    monkeypatch.setattr(step_executor, "ChainFork", FakeFork)
+    FakeFork.instances = []
+    executor = StepExecutor.__new__(StepExecutor)
+    executor.code_generator = CandidateGenerator(programs)
+    executor.solidity_executor = SimpleNamespace(config=SimpleNamespace(rpc_url="http://chain"))
+    executor.max_retries = 3
+    executor.task_manager = None
+    executor.speculative_attempts = 2
+    executor.speculative_temperature_step = 0.5
+    executor.logger = logging.getLogger("test")
+    executor.runs = []
+
+    def execute_code(step, code, task_id, attempt, rpc_url=None):
+        executor.runs.append((code, rpc_url))
+        if code == "hang":
+            # A losing candidate only ends when its fork is taken away
+            fork = next(fork for fork in FakeFork.instances if fork.url == rpc_url)
+            assert fork.stopped.wait(timeout=5)
+            raise ConnectionError("fork is gone")
+        return code == "good", {"output": code}
+
+    executor._execute_code = execute_code
+    return executor
+
+
+def test_losing_forks_are_stopped_and_the_winner_is_rerun(monkeypatch):
+    executor = make_executor(monkeypatch, {0.0: "hang", 0.5: "good"})
+    step = TaskStep("step_1", "deploy", StepType.PYTHON)
+    result, feedback, attempts_used = executor._execute_speculative(step, "t1", {}, "anvil")
+    assert result.success and feedback is None
+    assert attempts_used == 3
+    assert all(fork.stopped.wait(timeout=5) for fork in FakeFork.instances)
+    assert executor.runs[-1] == ("good", None)
+    speculative = result.error_details["speculative"]
+    assert speculative["candidate"] == 2
+    assert "fork_ms" in speculative and "commit_ms" in speculative
+
+
+def test_failures_feed_back_the_lowest_temperature_error(monkeypatch):
+    executor = make_executor(monkeypatch, {0.0: "bad", 0.5: "worse"})
+    executor._format_error_message = lambda result: f"failed: {result['output']}"
+    step = TaskStep("step_1", "deploy", StepType.PYTHON)
+    result, feedback, attempts_used = executor._execute_speculative(step, "t1", {}, "anvil")
+    assert result is None
+    assert feedback == "failed: bad"
+    assert attempts_used == 2
@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from core.benchmark_agent import BenchmarkAgent
+from core.config import BenchmarkConfig, BlockchainConfig, LLMConfig
+from core.task_manager import TaskManager
+from core.types import ExecutionResult, StepType, TaskPlan, TaskStep
+
+
+class RecordingStepExecutor:
+    """Runs steps by sleeping; records start order and the most steps running at once"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def execute_step(self, step, task_id, context):
+        with self._lock:
+            self.started.append(step.id)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return ExecutionResult(success=step.id not in self.failing, step_id=step.id, output=f"{step.id} done")
+
+
+@pytest.fixture
+def agent(tmp_path):
+    # Only the scheduler is exercised, so skip the LLM client, executors and chain setup
+    agent = BenchmarkAgent.__new__(BenchmarkAgent)
+    agent.config = BenchmarkConfig(llm=LLMConfig(model="test", api_key="test"), blockchain=BlockchainConfig(),
+                                   max_parallel_steps=4)
+    agent.logger = logging.getLogger("test")
+    agent.task_manager = TaskManager(str(tmp_path))
+    return agent
+
+
+def plan(*steps):
+    return TaskPlan("task", "description", [TaskStep(step_id, step_id, StepType.PYTHON, deps)
+                                            for step_id, deps in steps])
+
+
+def context():
+    return {"previous_outputs": {}, "deployed_contracts": {}}
+
+
+def test_independent_steps_run_in_parallel(agent):
+    executor = RecordingStepExecutor()
+    shared = context()
+    results = agent._run_step_graph(plan(("a", []), ("b", []), ("c", []), ("d", ["a", "b", "c"])),
+                                    "task", shared, executor)
+    assert all(result.success for result in results.values())
+    assert executor.max_running == 3
+    assert executor.started[-1] == "d"
+    assert shared["previous_outputs"] == {step: f"{step} done" for step in "abcd"}
+
+
+def test_failed_dependencies_skip_only_their_dependents(agent):
+    executor = RecordingStepExecutor(failing={"a"})
+    results = agent._run_step_graph(plan(("a", []), ("b", ["a"]), ("c", ["b"]), ("d", [])),
+                                    "task", context(), executor)
+    assert sorted(executor.started) == ["a", "d"]
+    assert [results[step].error for step in "bc"] == ["Dependencies not satisfied"] * 2
+    assert results["d"].success
+
+
+def test_unrunnable_steps_raise_instead_of_spinning(agent):
+    with pytest.raises(ValueError, match="can never run"):
+        agent._run_step_graph(plan(("a", ["missing"])), "task", context(), RecordingStepExecutor())
@@ -0,0 +1,48 @@
+import pytest
+
+from core.config import LLMConfig
+from core.llm_client import LLMClient
+from core.task_planner import TaskPlanner
+from core.types import TaskPlan, TaskStep, StepType
+
+
+def plan(*steps):
+    return TaskPlan("task", "description", [TaskStep(step_id, step_id, StepType.PYTHON, deps)
+                                            for step_id, deps in steps])
+
+
+@pytest.fixture
+def planner():
+    llm_client = LLMClient(LLMConfig(model="test", api_key="test"))
+    yield TaskPlanner(llm_client)
+    llm_client.close()
+
+
+def test_valid_dag_passes(planner):
+    planner.validate_plan(plan(("a", []), ("b", ["a"]), ("c", ["a"]), ("d", ["b", "c"])))
+
+
+def test_duplicate_step_ids_are_rejected(planner):
+    with pytest.raises(ValueError, match="duplicate step ids"):
+        planner.validate_plan(plan(("a", []), ("a", [])))
+
+
+def test_unknown_dependencies_are_rejected(planner):
+    with pytest.raises(ValueError, match="unknown steps"):
+        planner.validate_plan(plan(("a", ["missing"])))
+
+
+def test_cycles_are_rejected(planner):
+    with pytest.raises(ValueError, match="cycle between steps: \\['b', 'c'\\]"):
+        planner.validate_plan(plan(("a", []), ("b", ["a", "c"]), ("c", ["b"])))
+
+
+def test_null_dependencies_parse_as_none(planner):
+    response = """```json
+{"steps": [{"id": "step_1", "description": "deploy", "step_type": "solidity", "dependencies": null},
+           {"id": "step_2", "description": "call", "step_type": "python", "dependencies": ["step_1"]}]}
+```"""
+    steps, is_fallback = planner._parse_plan_response(response, "task")
+    assert not is_fallback
+    assert [step.dependencies for step in steps] == [[], ["step_1"]]
+    planner.validate_plan(TaskPlan("task", "description", steps))
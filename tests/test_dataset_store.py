@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from DatasetStore import DatasetStore, compile_store, load_question_slice
+
+TASKS = [
+    {"id": "t1", "question": "Write an ERC20", "code": "contract A {}", "answer": "a1",
+     "category": "coding", "topic": ["Token", "ERC20"]},
+    {"id": "t2", "question": "Audit the vault", "code": "", "answer": "a2",
+     "category": "auditing", "topic": ["DeFi"]},
+]
+MULTICHOICE = [
+    {"id": "m1", "question": "What is a nonce?", "answer": "A", "categories": ["Knowledge", "Beginner", "Ethereum"]},
+    {"id": "m2", "question": "Which AMM formula?", "answer": "B", "categories": ["Calculation", "Advanced", "DeFi"]},
+]
+
+
+def write(path, records):
+    path.write_text(json.dumps(records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return {"tasks": write(tmp_path / "tasks.json", TASKS), "multichoice": write(tmp_path / "mc.json", MULTICHOICE)}
+
+
+@pytest.fixture
+def store(tmp_path, sources):
+    store = DatasetStore(str(tmp_path / "store.sqlite"), sources)
+    yield store
+    store.close()
+
+
+def ids(records):
+    return [record.id for record in records]
+
+
+def test_filters_match_case_insensitively(store):
+    assert ids(store.select(category="CODING")) == ["t1"]
+    assert ids(store.select(topic="defi")) == ["m2", "t2"]
+    assert ids(store.select(difficulty=["beginner", "ADVANCED"])) == ["m1", "m2"]
+    assert ids(store.select(source="tasks", topic=["DeFi", "Token"])) == ["t1", "t2"]
+
+
+def test_multichoice_labels_are_split_into_columns(store):
+    record = store.get("multichoice", "m2")
+    assert (record.category, record.difficulty, record.topics) == ("calculation", "Advanced", ["DeFi"])
+    assert record.to_dict() == MULTICHOICE[1]
+
+
+def test_payloads_are_loaded_lazily_and_in_batches(store):
+    records = store.select(source="tasks")
+    assert all(record._payload is None for record in records)
+    store.load_payloads(records)
+    assert [record.to_dict() for record in records] == TASKS
+
+
+def test_ids_accept_plain_ids_and_source_pairs(store):
+    assert ids(store.select(ids=["t2", ("multichoice", "m1")])) == ["m1", "t2"]
+    assert store.select(ids=[]) == []
+
+
+def test_manifest_excludes_dropped_questions(store, tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"dropped": [{"source": "tasks", "id": "t1"}]}), encoding="utf-8")
+    assert ids(store.select(manifest=str(manifest))) == ["m1", "m2", "t2"]
+
+
+def test_unchanged_sources_are_not_recompiled(tmp_path, sources):
+    store_file = str(tmp_path / "store.sqlite")
+    assert compile_store(store_file, sources) == ["tasks", "multichoice"]
+    assert compile_store(store_file, sources) == []
+    write(tmp_path / "tasks.json", TASKS[:1])
+    assert compile_store(store_file, sources) == ["tasks"]
+
+
+def test_invalid_records_are_rejected(tmp_path, sources):
+    write(tmp_path / "tasks.json", [{**TASKS[0], "topic": "Token"}])
+    with pytest.raises(ValueError, match="field 'topic' should be list"):
+        compile_store(str(tmp_path / "store.sqlite"), sources)
+
+
+def test_unregistered_files_are_filtered_in_python(tmp_path):
+    path = write(tmp_path / "slice.json", TASKS + MULTICHOICE)
+    assert [question["id"] for question in load_question_slice(path, topic="defi")] == ["t2", "m2"]
+    assert [question["id"] for question in load_question_slice(path, category="auditing")] == ["t2"]
+    with pytest.raises(ValueError, match="only available for registered dataset files"):
+        load_question_slice(path, kg_node="1.1")
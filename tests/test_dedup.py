@@ -0,0 +1,54 @@
+import numpy as np
+
+import Dedup
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def reference_signature(shingles, num_perm, seed):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    if not len(shingles):
+        return [(1 << 32) - 1] * num_perm
+    return [min(((int(a[k]) * int(x) + int(b[k])) % MERSENNE_PRIME) & 0xFFFFFFFF for x in shingles)
+            for k in range(num_perm)]
+
+
+def test_signatures_match_exact_integer_arithmetic():
+    rng = np.random.RandomState(0)
+    shingle_sets = [np.unique(rng.randint(0, 1 << 32, size=size, dtype=np.uint64)) for size in (1, 40, 300)]
+    shingle_sets.append(np.array([], dtype=np.uint64))
+    # A chunk size that splits documents across blocks
+    signatures = Dedup.minhash_signatures(shingle_sets, 16, 1, 37)
+    expected = np.array([reference_signature(s, 16, 1) for s in shingle_sets], dtype=np.uint64)
+    assert np.array_equal(signatures, expected)
+
+
+def test_signature_agreement_estimates_jaccard():
+    words = [f"w{i}" for i in range(400)]
+    left = Dedup.shingle_hashes(" ".join(words), 3)
+    right = Dedup.shingle_hashes(" ".join(words[:300] + [f"x{i}" for i in range(100)]), 3)
+    signatures = Dedup.minhash_signatures([left, right], 256, 1, 1 << 16)
+    estimate = np.mean(signatures[0] == signatures[1])
+    assert abs(estimate - Dedup.jaccard(left, right)) < 0.1
+
+
+def test_lsh_pairs_every_document_sharing_a_band():
+    base = np.arange(8, dtype=np.uint64)
+    other = base.copy()
+    other[4:] += 100
+    signatures = np.vstack([base, base, other, base + 1000, other])
+    # Band 0 (columns 0-3) matches rows 0, 1, 2 and 4; band 1 matches rows 0, 1 and rows 2, 4
+    assert Dedup.lsh_candidates(signatures, 2, 4) == {(0, 1), (0, 2), (0, 4), (1, 2), (1, 4), (2, 4)}
+
+
+def test_choose_bands_divides_the_signature():
+    bands, rows = Dedup.choose_bands(128, 0.8)
+    assert bands * rows == 128
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+def test_jaccard():
+    assert Dedup.jaccard(np.array([1, 2, 3]), np.array([2, 3, 4])) == 0.5
+    assert Dedup.jaccard(np.array([]), np.array([])) == 1.0
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import KnowledgeGraph
+from DatasetStore import DatasetStore
+from KnowledgeGraph import AhoCorasick, compute_coverage, label_terms, map_questions, normalize_text, \
+    parse_knowledge_file
+
+KNOWLEDGE = """# Test graph
+
+1. [Foundational Technologies]
+    - [1.1 Cryptography]
+        - Hash Functions
+            - Merkle Trees
+        - ECC (Elliptic Curve Cryptography)
+    - [1.2 Consensus]
+        - Proof of Stake
+2. [Applications]
+    - [2.1 DeFi]
+        - Automated Market Makers (AMM)
+"""
+
+
+class Record:
+    def __init__(self, qid, question, source="tasks"):
+        self.qid, self.question, self.source = qid, question, source
+        self.answer, self.topics = "", []
+
+
+@pytest.fixture
+def knowledge_file(tmp_path):
+    path = tmp_path / "knowledge.md"
+    path.write_text(KNOWLEDGE, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def graph(knowledge_file):
+    return parse_knowledge_file(knowledge_file)
+
+
+def test_nodes_get_explicit_or_derived_codes(graph):
+    assert graph.codes == ["1", "1.1", "1.1.1", "1.1.1.1", "1.1.2", "1.2", "1.2.1", "2", "2.1", "2.1.1"]
+    assert graph.path(graph.find("1.1.1.1")) == "Foundational Technologies > Cryptography > Hash Functions > Merkle Trees"
+    with pytest.raises(KeyError):
+        graph.find("3")
+
+
+def test_subtrees_are_contiguous_ranges(graph):
+    assert [graph.codes[node] for node in graph.subtree(graph.find("1.1"))] == ["1.1", "1.1.1", "1.1.1.1", "1.1.2"]
+    assert [graph.codes[node] for node in graph.children(graph.find("1"))] == ["1.1", "1.2"]
+    assert graph.domain_of(graph.find("2.1.1")) == graph.find("2")
+
+
+def test_parenthesised_acronyms_and_names_become_aliases():
+    assert label_terms("ECC (Elliptic Curve Cryptography)") == ["ECC  ", "Elliptic Curve Cryptography"]
+    assert label_terms("Gas (e.g., fees)") == ["Gas  "]
+
+
+def test_matcher_reports_overlapping_occurrences():
+    matcher = AhoCorasick({" he ": "he", " she ": "she", " she sell ": "sells"})
+    assert sorted(matcher.search(" she sell she ")) == ["sells", "she", "she"]
+    assert list(matcher.search(" shell ")) == []
+
+
+def test_normalisation_stems_plurals_on_word_boundaries():
+    assert normalize_text("Merkle Trees, AMMs and gas") == " merkle tree amm and gas "
+
+
+def test_questions_are_mapped_to_every_matching_node(graph):
+    mapping = map_questions(graph, [Record(1, "Build Merkle trees over ECC keys"), Record(2, "Nothing here")])
+    assert {graph.codes[node]: hits for node, hits in mapping[1].items()} == {"1.1.1.1": 1, "1.1.2": 1}
+    assert mapping[2] == {}
+
+
+def test_coverage_counts_questions_in_subtrees(tmp_path, knowledge_file, monkeypatch):
+    tasks = [{"id": f"t{i}", "question": question, "code": "", "answer": "", "category": "knowledge", "topic": []}
+             for i, question in enumerate(["Proof of stake rewards", "AMM pricing", "Merkle tree proofs"])]
+    (tmp_path / "tasks.json").write_text(json.dumps(tasks), encoding="utf-8")
+    monkeypatch.setitem(KnowledgeGraph.CONFIG, "KNOWLEDGE_FILE", knowledge_file)
+    store = DatasetStore(str(tmp_path / "store.sqlite"), {"tasks": str(tmp_path / "tasks.json")})
+    try:
+        rows = {row["code"]: row for row in compute_coverage(parse_knowledge_file(knowledge_file), store)}
+    finally:
+        store.close()
+    assert [rows[code]["subtree_questions"] for code in ("1", "1.1", "1.2", "2", "2.1.1")] == [2, 1, 1, 1, 1]
+    assert rows["1.1.1.1"]["direct_questions"] == 1
+    assert rows["1.1"]["direct_questions"] == 0
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from KnowledgeGraph import parse_knowledge_file
+from KnowledgeRollup import ResultsMatrix, heatmap_rows, load_long_results, membership_matrix, rollup_scores, \
+    weakest_subtrees
+
+KNOWLEDGE = """1. [Foundations]
+    - [1.1 Cryptography]
+        - Hash Functions
+    - [1.2 Consensus]
+2. [Applications]
+"""
+
+
+@pytest.fixture
+def graph(tmp_path):
+    path = tmp_path / "knowledge.md"
+    path.write_text(KNOWLEDGE, encoding="utf-8")
+    return parse_knowledge_file(str(path))
+
+
+def test_repeated_runs_are_averaged_and_gaps_stay_nan():
+    results = ResultsMatrix.from_entries([("a", 1, 50.0), ("a", 1, 100.0), ("a", 2, 0.0), ("b", 2, 40.0)])
+    assert results.models == ["a", "b"] and results.qids == [1, 2]
+    assert results.scores[0].tolist() == [75.0, 0.0]
+    assert np.isnan(results.scores[1, 0]) and results.scores[1, 1] == 40.0
+
+
+def test_questions_belong_to_every_ancestor(graph):
+    hash_functions, consensus = graph.find("1.1.1"), graph.find("1.2")
+    membership = membership_matrix(graph, [10, 20, 30], {10: [hash_functions], 20: [consensus, hash_functions]})
+    codes = np.array(graph.codes)
+    assert codes[membership[0] == 1].tolist() == ["1", "1.1", "1.1.1"]
+    assert codes[membership[1] == 1].tolist() == ["1", "1.1", "1.1.1", "1.2"]
+    assert not membership[2].any()
+
+
+def test_rollup_matches_a_per_node_mean(graph):
+    rng = np.random.default_rng(0)
+    qids = list(range(40))
+    leaves = [graph.find(code) for code in ("1.1.1", "1.2", "2")]
+    question_map = {qid: [leaves[qid % 3]] for qid in qids if qid % 7}
+    entries = [(model, qid, float(rng.integers(0, 100))) for model in ("a", "b") for qid in qids if rng.random() > 0.2]
+    results = ResultsMatrix.from_entries(entries)
+
+    means, counts = rollup_scores(results, membership_matrix(graph, results.qids, question_map))
+
+    for m, model in enumerate(results.models):
+        for node in range(len(graph)):
+            scores = [score for name, qid, score in entries if name == model and qid in question_map
+                      and any(node in graph.ancestors(leaf) for leaf in question_map[qid])]
+            assert counts[m, node] == len(scores)
+            if scores:
+                assert means[m, node] == pytest.approx(np.mean(scores))
+
+
+def test_small_nodes_are_left_blank_and_not_ranked(graph):
+    results = ResultsMatrix.from_entries([("a", qid, 10.0) for qid in range(3)] +
+                                         [("b", qid, 90.0) for qid in range(3)] + [("a", 9, 50.0), ("b", 9, 50.0)])
+    question_map = {0: [graph.find("1.1.1")], 1: [graph.find("1.1.1")], 2: [graph.find("1.1.1")],
+                    9: [graph.find("1.2")]}
+    means, counts = rollup_scores(results, membership_matrix(graph, results.qids, question_map))
+
+    rows = {row["code"]: row for row in heatmap_rows(graph, results, means, counts, 1, 2)}
+    assert (rows["1.1"]["a"], rows["1.1"]["b"]) == ("10.00", "90.00")
+    assert rows["1.2"]["a"] == "" and rows["1.2"]["questions"] == 1
+    assert "1.1.1" not in rows
+
+    weakest = weakest_subtrees(graph, results, means, counts, 2, 2, 5)
+    assert {(row["model"], row["code"]) for row in weakest} == {(model, code) for model in "ab" for code in ("1.1", "1.1.1")}
+
+
+def test_long_results_are_put_on_one_scale(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("Model,Question Number,Question File,Score\n"
+                    "a,7,MultichoiceQuestions.json,1\n"
+                    "a,8,MultichoiceQuestions.json,\n"
+                    "a,9,MultichoiceQuestions.json,0\n", encoding="utf-8")
+    lookup = {("multichoice", "7"): 1, ("multichoice", "8"): 2}
+    assert load_long_results(str(path), lookup) == [("a", 1, 100.0)]
@@ -0,0 +1,63 @@
+import csv
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def scoring(tmp_path_factory):
+    pytest.importorskip("anthropic")
+    # Scoring.py opens its log file in the working directory on import
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("logs"))
+    try:
+        return importlib.import_module("Scoring")
+    finally:
+        os.chdir(cwd)
+
+
+def answer(scoring, **fields):
+    data = {"Question ID": "q1", "Model": "m", "Category": "coding", "Question": "Q", "Code": "",
+            "Standard Answer": "S", "LLM Answer": "A", "Fingerprint": "f", **fields}
+    data["Score Fingerprint"] = scoring.score_fingerprint(data)
+    return data
+
+
+def previous_row(data, score, justification):
+    return {("q1", "m"): {"Question ID": "q1", "Model": "m", "Score": score, "Justification": justification,
+                          "Score Fingerprint": data["Score Fingerprint"]}}
+
+
+def test_numeric_scores_with_matching_fingerprints_are_carried(scoring):
+    data = answer(scoring)
+    assert scoring.carry_over_score(data, previous_row(data, "85", "Total Score: 85/100"))
+    assert (data["Score"], data["Justification"]) == ("85", "Total Score: 85/100")
+
+
+@pytest.mark.parametrize("score, justification", [
+    ("", "Scoring timed out"),
+    ("n/a", "Total Score: 85/100"),
+    ("0", "Failed to score due to API error"),
+])
+def test_failed_or_missing_scores_are_scored_again(scoring, score, justification):
+    data = answer(scoring)
+    assert not scoring.carry_over_score(data, previous_row(data, score, justification))
+
+
+def test_changed_answers_are_scored_again(scoring):
+    data = answer(scoring)
+    previous = previous_row(data, "85", "ok")
+    assert not scoring.carry_over_score(answer(scoring, **{"LLM Answer": "B"}), previous)
+
+
+def test_carried_justifications_are_written_unchanged(scoring, tmp_path):
+    text = 'Uses a literal "\\n" & <b>tags</b>\nTotal Score: 85/100'
+    data = answer(scoring)
+    scoring.carry_over_score(data, previous_row(data, "85", text))
+    path = tmp_path / "scored.csv"
+    scoring.save_results_to_csv([data], str(path))
+    with open(path, newline="", encoding="utf-8") as file:
+        row = next(csv.DictReader(file))
+    assert row["Justification"] == text
+    assert "Carried Over" not in row
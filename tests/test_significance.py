@@ -0,0 +1,52 @@
+import numpy as np
+
+import Significance
+
+
+def test_paired_differences_skip_questions_either_model_missed():
+    scores = np.array([[1.0, 0.0, np.nan, 1.0],
+                       [0.0, 0.0, 1.0, np.nan],
+                       [1.0, 1.0, 1.0, 1.0]])
+    diffs, mask = Significance.paired_differences(scores)
+    # Pairs in triu order: (0, 1), (0, 2), (1, 2)
+    assert mask[:, 0].tolist() == [1, 1, 0, 0]
+    assert diffs[:, 0].tolist() == [1, 0, 0, 0]
+    assert diffs[:, 1].tolist() == [0, -1, 0, 0]
+    assert mask[:, 2].tolist() == [1, 1, 1, 0]
+
+
+def test_fdr_adjust_matches_benjamini_hochberg():
+    pvalues = np.array([0.01, 0.04, 0.03, 0.20])
+    # Sorted: 0.01*4/1, 0.03*4/2, 0.04*4/3, 0.20*4/4 with a running minimum from the top
+    expected = np.array([0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.20])
+    assert np.allclose(Significance.fdr_adjust(pvalues), expected)
+
+
+def test_holm_adjust():
+    pvalues = np.array([0.01, 0.04, 0.03, 0.5])
+    expected = np.array([0.04, 0.09, 0.09, 0.5])
+    assert np.allclose(Significance.holm_adjust(pvalues), expected)
+    assert Significance.holm_adjust(np.array([0.6, 0.7])).max() == 1.0
+
+
+def test_permutation_test_separates_different_models_from_identical_ones():
+    rng = np.random.default_rng(0)
+    strong = (rng.random(200) < 0.9).astype(float)
+    weak = (rng.random(200) < 0.4).astype(float)
+    diffs, mask = Significance.paired_differences(np.vstack([strong, weak, strong]))
+    pvalues = Significance.permutation_pairs(diffs, mask, 2000, np.random.default_rng(1), 300)
+    assert pvalues[0] < 0.01                    # strong vs weak
+    assert pvalues[2] < 0.01                    # weak vs strong copy
+    assert pvalues[1] == 1.0                    # identical answers never differ
+
+
+def test_bootstrap_is_centred_on_the_observed_difference():
+    rng = np.random.default_rng(0)
+    scores = (rng.random((2, 300)) < np.array([[0.8], [0.5]])).astype(float)
+    diffs, mask = Significance.paired_differences(scores)
+    samples = Significance.bootstrap_pairs(diffs, mask, 2000, np.random.default_rng(1), 300)
+    observed = diffs[:, 0].sum() / mask[:, 0].sum()
+    assert samples.shape == (2000, 1)
+    assert abs(samples.mean() - observed) < 0.01
+    low, high = np.percentile(samples, [2.5, 97.5])
+    assert low < observed < high and low > 0